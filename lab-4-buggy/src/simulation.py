@@ -1,6 +1,6 @@
 import random
 import logging
-from typing import List, Callable
+from typing import List, Callable, Optional
 from src.models import Library, Book
 from src.constants import BOOK_TITLES as TITLES, AUTHORS, GENRES
 
@@ -84,7 +84,9 @@ class LibrarySimulator:
         return f"Search by genre '{genre}': found {len(results)} book(s)"
 
 
-def run_simulation(steps: int = 20, seed: int = None) -> None:
+def run_simulation(steps: int = 20, seed: int = None, sink: Optional[object] = None) -> None:
+    # sink — приёмник вывода с методами write_step(record) и flush()
+    # (например, src.sinks из lab-4); без него шаги печатаются в stdout
     if seed is not None:
         random.seed(seed)
     
@@ -103,10 +105,22 @@ def run_simulation(steps: int = 20, seed: int = None) -> None:
     logger.info(f"Simulation started with seed={seed}")
     
     # Запустить симуляцию
-    for _ in range(steps):
+    lines = []
+    for step in range(1, steps + 1):
         result = sim.run_step()
-        print(result)
-        logger.info(result)
+        logger.debug(result)
+        if sink is not None:
+            sink.write_step({"step": step, "message": result})
+        else:
+            lines.append(result)
+            if len(lines) >= 1000:
+                print("\n".join(lines))
+                lines = []
+    # Шаги печатаются пачками, а не отдельным print на каждом шаге
+    if sink is not None:
+        sink.flush()
+    elif lines:
+        print("\n".join(lines))
     
     # Финальная статистика
     stats = lib.get_statistics()
@@ -349,4 +349,30 @@ class TestIntegration:
         assert library.search_by_isbn("ISBN-001") is None
     
     def test_simulation_full_run(self):
-        run_simulation(steps=5, seed=42)
\ No newline at end of file
+        run_simulation(steps=5, seed=42)
+    
+    def test_simulation_writes_steps_to_sink(self, capsys):
+        class RecordingSink:
+            def __init__(self):
+                self.records = []
+                self.flushes = 0
+            
+            def write_step(self, record):
+                self.records.append(record)
+            
+            def flush(self):
+                self.flushes += 1
+        
+        run_simulation(steps=5, seed=42)
+        printed = [line for line in capsys.readouterr().out.splitlines() if line.startswith("[Step")]
+        
+        sink = RecordingSink()
+        run_simulation(steps=5, seed=42, sink=sink)
+        output = capsys.readouterr().out
+        
+        # Те же шаги уходят в приёмник, а не в stdout
+        assert [record["step"] for record in sink.records] == [1, 2, 3, 4, 5]
+        assert [record["message"] for record in sink.records] == printed
+        assert sink.flushes == 1
+        assert "[Step" not in output
+        assert "FINAL STATISTICS" in output
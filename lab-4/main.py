@@ -1,7 +1,18 @@
 import sys
 import logging
+import tempfile
 from src.logger_config import setup_logging
 from src.simulation import run_simulation
+from src.profiling import PROFILE_MODES, profile_call
+from src.models import Library
+from src.trace import TraceReplayer
+from src.sinks import DEFAULT_FLUSH_INTERVAL, open_sink
+from src.batch import format_summary, load_catalog, run_query_file
+from src.generator import CatalogGenerator, write_catalog
+from src.columnar import (CODECS, benchmark_formats, export_columnar, format_benchmark,
+                          import_columnar, is_columnar, read_books)
+
+SUBCOMMANDS = ('load', 'query', 'bench', 'export', 'formats', 'generate')
 
 
 def main():
@@ -15,28 +26,201 @@ def main():
     steps = 20
     seed = None
     
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        run_command(sys.argv[1], sys.argv[2:])
+        return
+    
+    try:
+        args, profile_mode = extract_option(sys.argv[1:], '--profile')
+        args, trace_path = extract_option(args, '--trace')
+        args, replay_path = extract_option(args, '--replay')
+        args, duration = extract_option(args, '--duration')
+        args, catalog_size = extract_option(args, '--catalog')
+        args, sink_spec = extract_option(args, '--sink')
+        args, flush_interval = extract_option(args, '--flush-interval')
+        catalog_size = int(catalog_size) if catalog_size is not None else 0
+        if catalog_size < 0:
+            raise ValueError("--catalog не может быть отрицательным")
+        if duration is not None:
+            duration = float(duration)
+            if duration <= 0:
+                raise ValueError("--duration должна быть положительной")
+        if flush_interval is not None:
+            flush_interval = float(flush_interval)
+            if flush_interval <= 0:
+                raise ValueError("--flush-interval должен быть положительным")
+        if profile_mode is not None and profile_mode not in PROFILE_MODES:
+            raise ValueError(f"неизвестный режим профилирования '{profile_mode}' "
+                             f"(допустимо: {'|'.join(PROFILE_MODES)})")
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        print_help()
+        return
+    
+    if len(args) > 0:
         try:
-            if sys.argv[1] in ['-h', '--help']:
+            if args[0] in ['-h', '--help']:
                 print_help()
                 return
  
-            steps = int(sys.argv[1])
+            steps = int(args[0])
 
-            if len(sys.argv) > 2:
-                seed = int(sys.argv[2])
+            if len(args) > 1:
+                seed = int(args[1])
         except ValueError:
             print("Ошибка: аргументы должны быть целыми числами")
             print_help()
             return
     
+    if replay_path:
+        replay_trace(replay_path)
+        return
+    
+    sink = None
+    if sink_spec is not None or flush_interval is not None:
+        try:
+            sink = open_sink(sink_spec or "stdout",
+                             flush_interval=flush_interval or DEFAULT_FLUSH_INTERVAL)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка: {e}")
+            print_help()
+            return
+    
     # Запуск симуляции
     try:
-        run_simulation(steps=steps, seed=seed)
+        if profile_mode:
+            logger.info(f"Profiling enabled: {profile_mode}")
+            reports = profile_call(run_simulation, profile_mode,
+                                   steps=steps, seed=seed, trace_path=trace_path,
+                                   duration=duration, catalog_size=catalog_size, sink=sink)
+            for path in reports:
+                print(f"Profile report: {path}")
+        else:
+            run_simulation(steps=steps, seed=seed, trace_path=trace_path, duration=duration,
+                           catalog_size=catalog_size, sink=sink)
         logger.info("Simulation completed successfully")
     except Exception as e:
         logger.error(f"Simulation failed: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        if sink is not None:
+            sink.close()
+
+
+def extract_option(args, name):
+    # Поддерживаются формы "--name value" и "--name=value"
+    rest = []
+    value = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == name:
+            if i + 1 >= len(args):
+                raise ValueError(f"{name} требует значение")
+            value = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith(name + '='):
+            value = arg.split('=', 1)[1]
+        else:
+            rest.append(arg)
+        i += 1
+    return rest, value
+
+
+def run_command(command, args):
+    logger = logging.getLogger(__name__)
+    try:
+        args, output_path = extract_option(args, '--output')
+        args, repeat = extract_option(args, '--repeat')
+        args, codec = extract_option(args, '--codec')
+        args, seed = extract_option(args, '--seed')
+        seed = int(seed) if seed is not None else 0
+        repeat = int(repeat) if repeat is not None else 1
+        codec = codec or 'zlib'
+        expected = 1 if command in ('load', 'formats') else 2
+        if command == 'generate':
+            count = int(args[0]) if args else -1
+            if count < 0:
+                raise ValueError("число книг должно быть неотрицательным")
+        if len(args) != expected or repeat <= 0:
+            raise ValueError(f"неверные аргументы команды '{command}'")
+        if codec not in CODECS:
+            raise ValueError(f"неизвестный кодек '{codec}' (допустимо: {'|'.join(CODECS)})")
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        print_help()
+        sys.exit(2)
+    
+    # Логирование каждой книги и запроса исказило бы замер
+    logging.getLogger('src.models').setLevel(logging.WARNING)
+    library = Library("Batch Library")
+    try:
+        if command == 'generate':
+            result = write_catalog(args[1], count, CatalogGenerator(seed=seed), codec)
+            print(f"Generated {result['books']} book(s) into {args[1]} in {result['elapsed']:.3f}s "
+                  f"({result['books_per_sec']:.0f} books/s)")
+            return
+        if command == 'export':
+            result = export_columnar(read_books(args[0]), args[1], codec)
+            print(f"Exported {result['books']} book(s) to {args[1]}: {result['bytes']} bytes "
+                  f"in {result['blocks']} block(s), {result['elapsed']:.3f}s")
+            return
+        if command == 'formats':
+            books = list(read_books(args[0]))
+            with tempfile.TemporaryDirectory() as directory:
+                print(format_benchmark(benchmark_formats(books, directory)))
+            return
+        
+        # Формат каталога определяется по сигнатуре файла
+        loader = import_columnar if is_columnar(args[0]) else load_catalog
+        loaded = loader(args[0], library)
+        print(f"Loaded {loaded['books']} book(s) in {loaded['elapsed']:.3f}s "
+              f"({loaded['books_per_sec']:.0f} books/s, "
+              f"{loaded['duplicates']} duplicate(s) skipped)", file=sys.stderr)
+        if command == 'load':
+            stats = library.get_statistics()
+            print(f"Total books: {stats['total_books']}")
+            print(f"Unique authors: {stats['unique_authors']}")
+            if stats['year_range']:
+                print(f"Year range: {stats['year_range'][0]} - {stats['year_range'][1]}")
+            print(f"Genres: {', '.join(stats['genres'])}")
+            return
+        
+        # Префиксный индекс для suggest строится один раз после загрузки,
+        # вне замера запросов
+        library.enable_completions()
+        if command == 'query':
+            # Результаты — JSONL в файл или stdout, сводка — в stderr
+            if output_path:
+                with open(output_path, "w", encoding="utf-8") as out:
+                    summary = run_query_file(args[1], library, out)
+            else:
+                summary = run_query_file(args[1], library, sys.stdout)
+            print(format_summary(summary), file=sys.stderr)
+        else:
+            for run in range(1, repeat + 1):
+                summary = run_query_file(args[1], library)
+                print(f"[run {run}/{repeat}] {format_summary(summary)}")
+    except (OSError, ValueError) as e:
+        logger.error(f"Command '{command}' failed: {e}")
+        sys.exit(1)
+
+
+def replay_trace(path):
+    logger = logging.getLogger(__name__)
+    try:
+        replayer = TraceReplayer(path)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: не удалось загрузить трассу: {e}")
+        sys.exit(1)
+    
+    # Логирование каждой операции исказило бы замер
+    logging.getLogger('src.models').setLevel(logging.WARNING)
+    result = replayer.replay(Library("Replay Library"))
+    print(f"Replayed {result['operations']} operation(s) in {result['elapsed']:.4f}s "
+          f"({result['ops_per_sec']:.0f} ops/s)")
+    logger.info(f"Replay of {path} completed")
 
 
 def print_help():
@@ -44,17 +228,64 @@ def print_help():
 Library Management System - Simulation
 
 ИСПОЛЬЗОВАНИЕ:
-    python main.py [steps] [seed]
+    python main.py [steps] [seed] [--profile cpu|memory|both] [--trace FILE]
+    python main.py 0 [seed] --duration DAYS
+    python main.py [steps] [seed] --sink stdout|null|file:F|jsonl:F|rotate:F [--flush-interval SEC]
+    python main.py --replay FILE
+    python main.py load CATALOG.jsonl
+    python main.py query CATALOG.jsonl QUERIES.jsonl [--output RESULTS.jsonl]
+    python main.py bench CATALOG.jsonl QUERIES.jsonl [--repeat N]
+    python main.py export CATALOG.jsonl OUT.lcol [--codec zlib|lzma]
+    python main.py formats CATALOG.jsonl
+    python main.py generate N OUT.jsonl|OUT.lcol [--seed S] [--codec zlib|lzma]
 
 АРГУМЕНТЫ:
     steps    - количество шагов симуляции (по умолчанию: 20)
     seed     - seed для воспроизводимости (по умолчанию: случайный)
+    --profile - запустить симуляцию под профилировщиком:
+                cpu    - cProfile (profile_cpu.txt, profile.pstats)
+                memory - tracemalloc (profile_memory.txt)
+                both   - оба режима
+    --trace  - записать все операции над библиотекой в бинарную трассу
+    --replay - воспроизвести трассу на новой библиотеке и замерить скорость
+    --duration - дискретно-событийная симуляция на DAYS модельных дней:
+                 события каждого типа приходят пуассоновским потоком
+    --catalog N - начать симуляцию с синтетического каталога из N книг
+    --sink   - куда писать шаги симуляции (буферизованно):
+                stdout      - консоль (по умолчанию)
+                null        - никуда (замеры без затрат на вывод)
+                file:F      - текстовый файл
+                jsonl:F     - файл JSONL: step, event, message
+                rotate:F    - файл с ротацией по 10 МБ (JSONL, если F — .jsonl)
+    --flush-interval - максимум секунд между сбросами буфера (по умолчанию: 1)
     -h, --help - показать эту справку
 
+КОМАНДЫ:
+    load   - загрузить каталог (JSONL: title, author, year, genre, isbn)
+    query  - выполнить запросы из JSONL и записать результаты с временем
+             каждого запроса; сводка пропускной способности — в stderr
+    bench  - прогнать запросы без вывода результатов (--repeat N раз)
+    export - сохранить каталог в сжатом столбцовом формате (.lcol)
+    formats - сравнить размер и скорость JSONL и столбцового формата
+    generate - сгенерировать каталог из N книг (авторы по закону Ципфа,
+               новые годы чаще старых, уникальные ISBN-13), детерминированно по seed
+    Каталог для load/query/bench/export может быть JSONL или .lcol
+    Формат запроса: {"op": "isbn|author|year|genre|fuzzy_author|fuzzy_title|suggest",
+                     "value": ..., "limit": N, "id": ...}
+    Пакетный запрос: {"op": "isbns|authors|years", "value": [ключ, ...]}
+
 ПРИМЕРЫ:
     python main.py                  # Запустить 20 шагов со случайным seed
     python main.py 50               # Запустить 50 шагов
     python main.py 30 42            # Запустить 30 шагов с seed=42
+    python main.py 1000 42 --profile cpu   # Профилирование CPU
+    python main.py 1000 42 --trace run.trace  # Записать трассу
+    python main.py --replay run.trace       # Воспроизвести трассу
+    python main.py 0 42 --duration 30       # 30 модельных дней
+    python main.py 100 42 --catalog 100000  # Симуляция на большом каталоге
+    python main.py 100000 42 --sink jsonl:steps.jsonl  # Шаги в JSONL
+    python main.py generate 1000000 books.lcol --seed 7
+    python main.py query books.jsonl queries.jsonl --output out.jsonl
     python main.py --help           # Показать эту справку
 
 СОБЫТИЯ СИМУЛЯЦИИ:
@@ -62,6 +293,7 @@ Library Management System - Simulation
     - Удаление случайной книги
     - Поиск по автору/году/жанру
     - Попытка получить несуществующую книгу
+    - Выдача, возврат, продление, резервирование, смена дня
 
 ТЕСТЫ:
     pytest tests/test.py            # Запустить все тесты
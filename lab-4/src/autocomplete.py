@@ -0,0 +1,148 @@
+import sys
+from typing import Dict, List, Optional, Tuple
+from src.fuzzy import normalize
+
+DEFAULT_TOP_K = 20
+
+
+def _rank(item: Tuple[str, int]):
+    # Больше книг — выше; при равенстве — по алфавиту
+    return (-item[1], item[0])
+
+
+class _Node:
+
+    __slots__ = ('children', 'terms', 'top')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.terms: Dict[str, int] = {}     # Термы, чей ключ заканчивается в этом узле
+        self.top: List[Tuple[str, int]] = []
+
+
+class PrefixIndex:
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self._root = _Node()
+        self._counts: Dict[str, int] = {}   # Терм -> число книг
+        self._display: Dict[str, str] = {}  # Терм -> исходное написание
+
+    @staticmethod
+    def _keys(term: str) -> List[str]:
+        # Терм доступен по началу каждого слова: "isaac asimov" -> "asimov"
+        words = term.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _path(self, key: str, create: bool) -> Optional[List[_Node]]:
+        node = self._root
+        path = [node]
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[ch] = _Node()
+            node = child
+            path.append(node)
+        return path
+
+    def _upsert(self, node: _Node, term: str, count: int) -> bool:
+        top = node.top
+        rank = (-count, term)
+        # Счётчик терма только растёт, поэтому если он не проходит в топ сейчас,
+        # то его не было в топе и раньше
+        if len(top) >= self.top_k and rank > _rank(top[-1]):
+            return False
+        for i, (existing, _) in enumerate(top):
+            if existing == term:
+                del top[i]
+                break
+        position = len(top)
+        for i, item in enumerate(top):
+            if rank < _rank(item):
+                position = i
+                break
+        top.insert(position, (term, count))
+        del top[self.top_k:]
+        return True
+
+    def _recompute(self, node: _Node) -> None:
+        candidates = dict(node.terms)
+        for child in node.children.values():
+            for term, count in child.top:
+                candidates[term] = count
+        node.top = sorted(candidates.items(), key=_rank)[:self.top_k]
+
+    def add(self, text: str) -> None:
+        term = normalize(text)
+        if not term:
+            return
+        count = self._counts.get(term, 0) + 1
+        self._counts[term] = count
+        self._display.setdefault(term, text)
+
+        for key in self._keys(term):
+            path = self._path(key, create=True)
+            path[-1].terms[term] = count
+            # Кандидаты узла — подмножество кандидатов предка: терм, не вошедший
+            # в топ узла, не войдёт и в топ предков, подъём к корню прекращается
+            for node in reversed(path):
+                if not self._upsert(node, term, count):
+                    break
+
+    def remove(self, text: str) -> bool:
+        term = normalize(text)
+        count = self._counts.get(term)
+        if count is None:
+            return False
+        count -= 1
+        if count:
+            self._counts[term] = count
+        else:
+            del self._counts[term]
+            del self._display[term]
+
+        for key in self._keys(term):
+            path = self._path(key, create=False)
+            leaf = path[-1]
+            if count:
+                leaf.terms[term] = count
+            else:
+                del leaf.terms[term]
+            # Снизу вверх: удалить пустые узлы и пересчитать те, где терм был в топе;
+            # если терма нет в топе узла, его нет и в топах предков
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                if depth > 0 and not node.terms and not node.children:
+                    del path[depth - 1].children[key[depth - 1]]
+                    continue
+                if not any(existing == term for existing, _ in node.top):
+                    break
+                self._recompute(node)
+        return True
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        key = normalize(prefix)
+        if not key:
+            return []
+        path = self._path(key, create=False)
+        if path is None:
+            return []
+        return [(self._display[term], count) for term, count in path[-1].top[:limit]]
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._counts) + sys.getsizeof(self._display)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            size += (sys.getsizeof(node) + sys.getsizeof(node.children)
+                     + sys.getsizeof(node.terms) + sys.getsizeof(node.top))
+            stack.extend(node.children.values())
+        return size
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __repr__(self) -> str:
+        return f"PrefixIndex(terms={len(self._counts)}, top_k={self.top_k})"
@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+from array import array
+from typing import IO, Iterable, Iterator, List, Optional
+from src.models import Book, Library
+
+logger = logging.getLogger(__name__)
+
+BOOK_FIELDS = ("title", "author", "year", "genre", "isbn")
+
+# Операция запроса -> метод Library
+QUERY_OPS = {
+    "isbn": "search_by_isbn",
+    "author": "search_by_author",
+    "year": "search_by_year",
+    "genre": "search_by_genre",
+    "fuzzy_author": "fuzzy_search_author",
+    "fuzzy_title": "fuzzy_search_title",
+    "suggest": "suggest",
+    # Пакетные операции: value — список ключей, один запрос вместо многих
+    "isbns": "search_many_isbn",
+    "authors": "search_many_authors",
+    "years": "search_many_years",
+}
+BATCH_OPS = ("isbns", "authors", "years")
+
+
+def book_from_record(record: dict) -> Book:
+    missing = [field for field in BOOK_FIELDS if field not in record]
+    if missing:
+        raise ValueError(f"В записи нет полей: {', '.join(missing)}")
+    return Book(record["title"], record["author"], int(record["year"]),
+                record["genre"], record["isbn"])
+
+
+def book_to_record(book: Book) -> dict:
+    return {field: getattr(book, field) for field in BOOK_FIELDS}
+
+
+def iter_jsonl(stream: IO[str]) -> Iterator[dict]:
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Строка {line_no}: некорректный JSON ({e})") from e
+
+
+def load_catalog(path: str, library: Library) -> dict:
+    start = time.perf_counter()
+    count = 0
+    duplicates = 0
+    seen = set()    # Книги из файла: Book хешируется по ISBN
+    # Весь файл применяется одной транзакцией: индексы обновляются пакетно
+    with open(path, encoding="utf-8") as f, library.transaction():
+        for record in iter_jsonl(f):
+            book = book_from_record(record)
+            # Повтор внутри файла или книга, уже имеющаяся в каталоге: O(1)
+            if book in seen or book in library.books:
+                duplicates += 1
+                continue
+            seen.add(book)
+            library.add_book(book)
+            count += 1
+    elapsed = time.perf_counter() - start
+    if duplicates:
+        logger.warning(f"Skipped {duplicates} duplicate ISBN(s) while loading {path}")
+    logger.info(f"Loaded {count} book(s) from {path} in {elapsed:.3f}s")
+    return {
+        'books': count,
+        'duplicates': duplicates,
+        'elapsed': elapsed,
+        'books_per_sec': count / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def execute_query(library: Library, query: dict) -> dict:
+    if not isinstance(query, dict):
+        raise ValueError("Запрос должен быть JSON-объектом")
+    op = query.get("op")
+    method = QUERY_OPS.get(op)
+    if method is None:
+        raise ValueError(f"Неизвестная операция: {op!r}")
+    if "value" not in query:
+        raise ValueError("В запросе нет поля 'value'")
+
+    args = [query["value"]]
+    if op in BATCH_OPS and not isinstance(args[0], list):
+        raise ValueError(f"Для операции '{op}' значение должно быть списком")
+    if "limit" in query and op in ("fuzzy_author", "fuzzy_title", "suggest"):
+        args.append(int(query["limit"]))
+    result = getattr(library, method)(*args)
+
+    if op == "suggest":
+        return {"count": len(result), "suggestions": [list(item) for item in result]}
+    if op in BATCH_OPS:
+        results = {}
+        for key, found in result.items():
+            if op == "isbns":
+                found = [] if found is None else [found]
+            # Ключи JSON-объекта — строки, поэтому годы приводятся к str
+            results[str(key)] = [book.isbn for book in found]
+        return {"count": sum(map(len, results.values())), "results": results}
+    if op == "isbn":
+        books = [] if result is None else [result]
+    else:
+        books = result
+    return {"count": len(books), "isbns": [book.isbn for book in books]}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_queries(library: Library, queries: Iterable[dict],
+                output: Optional[IO[str]] = None) -> dict:
+    # queries читаются по одному: поток из файла не загружается в память целиком,
+    # а время чтения и разбора запросов не входит в замер
+    latencies = array('d')
+    errors = 0
+    start = resumed = time.perf_counter()
+    reading = 0.0
+
+    for number, query in enumerate(queries, 1):
+        query_start = time.perf_counter()
+        reading += query_start - resumed
+        try:
+            record = execute_query(library, query)
+        except (ValueError, TypeError) as e:
+            record = {"error": str(e)}
+            errors += 1
+        elapsed = time.perf_counter() - query_start
+        latencies.append(elapsed)
+
+        if output is not None:
+            record["query"] = query.get("id", number) if isinstance(query, dict) else number
+            record["elapsed_us"] = round(elapsed * 1e6, 1)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        resumed = time.perf_counter()
+
+    total = time.perf_counter() - start - reading
+    latencies = sorted(latencies)
+    return {
+        'queries': len(latencies),
+        'errors': errors,
+        'elapsed': total,
+        'queries_per_sec': len(latencies) / total if total > 0 else float('inf'),
+        'p50_us': _percentile(latencies, 0.50) * 1e6,
+        'p99_us': _percentile(latencies, 0.99) * 1e6,
+        'max_us': (latencies[-1] if latencies else 0.0) * 1e6,
+    }
+
+
+def run_query_file(path: str, library: Library, output: Optional[IO[str]] = None) -> dict:
+    # Запросы читаются из файла по мере выполнения, без списка в памяти
+    with open(path, encoding="utf-8") as f:
+        return run_queries(library, iter_jsonl(f), output)
+
+
+def format_summary(summary: dict) -> str:
+    return (f"Queries: {summary['queries']} ({summary['errors']} error(s)) "
+            f"in {summary['elapsed']:.3f}s -> {summary['queries_per_sec']:.0f} q/s; "
+            f"latency p50={summary['p50_us']:.1f}us p99={summary['p99_us']:.1f}us "
+            f"max={summary['max_us']:.1f}us")
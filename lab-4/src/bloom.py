@@ -0,0 +1,123 @@
+import math
+from typing import Iterable, Iterator
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+
+_MASK64 = (1 << 64) - 1
+_MIX1 = 0x9E3779B97F4A7C15
+_MIX2 = 0xC2B2AE3D27D4EB4F
+_MAX_COUNT = 255
+
+
+class CountingBloomFilter:
+    # Счётчики вместо битов: фильтр поддерживает удаление.
+    # Отрицательный ответ точен, положительный — «возможно есть»
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        if capacity <= 0:
+            raise ValueError("capacity должна быть положительной")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate должна быть в диапазоне (0, 1)")
+        self.false_positive_rate = false_positive_rate
+        self._allocate(capacity)
+        # Статистика проверок; ложные срабатывания отмечает владелец
+        # фильтра после проверки по индексу
+        self.lookups = 0
+        self.negatives = 0
+        self.false_positives = 0
+
+    def _allocate(self, capacity: int) -> None:
+        self.capacity = capacity
+        # Оптимальные размеры: m = -n·ln p / ln²2, k = m/n·ln 2
+        self.size = max(8, math.ceil(-capacity * math.log(self.false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._counters = bytearray(self.size)
+        self._items = 0
+
+    def _positions(self, key) -> Iterator[int]:
+        # Двойное хеширование: k позиций из двух перемешанных 64-битных значений
+        h = hash(key) & _MASK64
+        h1 = (h * _MIX1) & _MASK64
+        h2 = (((h ^ (h >> 29)) * _MIX2) & _MASK64) | 1
+        size = self.size
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % size
+
+    def add(self, key) -> None:
+        counters = self._counters
+        for position in self._positions(key):
+            if counters[position] < _MAX_COUNT:
+                counters[position] += 1
+        self._items += 1
+
+    def remove(self, key) -> None:
+        # Вызывать только для ключей, добавленных ранее
+        counters = self._counters
+        for position in self._positions(key):
+            # Насыщенный счётчик не уменьшается: иначе возможен ложный промах
+            if 0 < counters[position] < _MAX_COUNT:
+                counters[position] -= 1
+        self._items -= 1
+
+    def might_contain(self, key) -> bool:
+        # Горячий путь: позиции считаются на месте, без генератора
+        self.lookups += 1
+        h = hash(key) & _MASK64
+        position = ((h * _MIX1) & _MASK64) % self.size
+        step = ((((h ^ (h >> 29)) * _MIX2) & _MASK64) | 1) % self.size
+        counters = self._counters
+        size = self.size
+        for _ in range(self.hash_count):
+            if not counters[position]:
+                self.negatives += 1
+                return False
+            position += step
+            if position >= size:
+                position -= size
+        return True
+
+    def __contains__(self, key) -> bool:
+        return self.might_contain(key)
+
+    @property
+    def overloaded(self) -> bool:
+        return self._items > self.capacity
+
+    def rebuild(self, keys: Iterable, capacity: int) -> None:
+        # Пересоздание под новую ёмкость; статистика проверок сохраняется
+        self._allocate(capacity)
+        for key in keys:
+            self.add(key)
+
+    def expected_false_positive_rate(self) -> float:
+        # (1 - e^(-k·n/m))^k для текущего числа элементов
+        if not self._items:
+            return 0.0
+        return (1 - math.exp(-self.hash_count * self._items / self.size)) ** self.hash_count
+
+    def get_statistics(self) -> dict:
+        return {
+            'items': self._items,
+            'capacity': self.capacity,
+            'counters': self.size,
+            'hash_count': self.hash_count,
+            'lookups': self.lookups,
+            'probes_saved': self.negatives,
+            'false_positives': self.false_positives,
+            # Доля отсутствующих ключей, которые фильтр всё же пропустил
+            'observed_false_positive_rate': (self.false_positives / (self.negatives + self.false_positives)
+                                             if self.negatives + self.false_positives else 0.0),
+            'expected_false_positive_rate': self.expected_false_positive_rate(),
+        }
+
+    def memory_usage(self) -> int:
+        return len(self._counters)
+
+    def __len__(self) -> int:
+        return self._items
+
+    def __repr__(self) -> str:
+        return (f"CountingBloomFilter(items={self._items}, capacity={self.capacity}, "
+                f"size={self.size}, hashes={self.hash_count})")
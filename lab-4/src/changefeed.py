@@ -0,0 +1,180 @@
+import logging
+import queue
+import threading
+from typing import Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION = 100_000
+DEFAULT_BATCH_SIZE = 100
+
+_STOP = object()
+
+
+class Change(NamedTuple):
+    seq: int
+    action: str
+    book: object
+
+
+class Subscription:
+
+    def __init__(self, feed: 'ChangeFeed', callback: Callable[[List[Change]], None],
+                 batch_size: int, background: bool):
+        self.feed = feed
+        self.callback = callback
+        self.batch_size = batch_size
+        self.background = background
+        self.last_seq = 0               # Последний доставленный номер
+        self._pending: List[Change] = []
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self.active = True
+        if background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="change-feed-subscriber")
+            self._thread.start()
+
+    def _enqueue(self, change: Change) -> None:
+        if self._queue is not None:
+            self._queue.put(change)
+        else:
+            self._pending.append(change)
+
+    def _push(self, change: Change) -> None:
+        self._enqueue(change)
+        if self._queue is None and len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _deliver(self, batch: List[Change]) -> None:
+        try:
+            self.callback(batch)
+        except Exception:
+            logger.exception("Change feed subscriber failed")
+        self.last_seq = batch[-1].seq
+
+    def flush(self) -> None:
+        if self._queue is not None:
+            # Дождаться, пока фоновый поток разберёт очередь
+            self._queue.join()
+            return
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.batch_size):
+            self._deliver(pending[start:start + self.batch_size])
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            # Забрать всё, что уже накопилось, но не больше batch_size
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._deliver(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def close(self) -> None:
+        if not self.active:
+            return
+        self.flush()
+        self.active = False
+        self.feed._unsubscribe(self)
+        if self._queue is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def __repr__(self) -> str:
+        mode = "background" if self.background else "sync"
+        return f"Subscription(mode={mode}, last_seq={self.last_seq})"
+
+
+class ChangeFeed:
+
+    def __init__(self, library, retention: int = DEFAULT_RETENTION):
+        self.library = library
+        self.retention = retention
+        self._log: List[Change] = []
+        self._first_seq = 1             # Номер первой записи в _log
+        self._next_seq = 1
+        self._subscribers: List[Subscription] = []
+        # RLock: синхронный подписчик может сам менять библиотеку
+        self._lock = threading.RLock()
+        library.add_listener(self._record)
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def _record(self, action: str, book) -> None:
+        with self._lock:
+            change = Change(self._next_seq, action, book)
+            self._next_seq += 1
+            self._log.append(change)
+            # Усечение журнала раз в retention записей: амортизированно O(1)
+            if len(self._log) >= 2 * self.retention:
+                drop = len(self._log) - self.retention
+                del self._log[:drop]
+                self._first_seq += drop
+            for subscription in list(self._subscribers):
+                subscription._push(change)
+
+    def changes_since(self, seq: int, limit: Optional[int] = None) -> List[Change]:
+        with self._lock:
+            if seq + 1 < self._first_seq:
+                raise ValueError(f"Изменения до #{self._first_seq} уже удалены из журнала")
+            start = max(seq + 1 - self._first_seq, 0)
+            end = len(self._log) if limit is None else start + limit
+            return self._log[start:end]
+
+    def subscribe(self, callback: Callable[[List[Change]], None], since: Optional[int] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE, background: bool = False) -> Subscription:
+        if batch_size <= 0:
+            raise ValueError("batch_size должен быть положительным")
+        # Сначала пропущенное из журнала, затем новые изменения — под одной
+        # блокировкой, чтобы порядок номеров не нарушился
+        with self._lock:
+            if since is not None and since + 1 < self._first_seq:
+                raise ValueError(f"Изменения до #{self._first_seq} уже удалены из журнала")
+            subscription = Subscription(self, callback, batch_size, background)
+            if since is not None:
+                for change in self._log[max(since + 1 - self._first_seq, 0):]:
+                    subscription._enqueue(change)
+            self._subscribers.append(subscription)
+        if not background and len(subscription._pending) >= batch_size:
+            subscription.flush()
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def flush(self) -> None:
+        for subscription in list(self._subscribers):
+            subscription.flush()
+
+    def close(self) -> None:
+        for subscription in list(self._subscribers):
+            subscription.close()
+        self.library.remove_listener(self._record)
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __repr__(self) -> str:
+        return (f"ChangeFeed(last_seq={self.last_seq}, retained={len(self._log)}, "
+                f"subscribers={len(self._subscribers)})")
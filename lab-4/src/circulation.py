@@ -0,0 +1,205 @@
+import heapq
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from src.isbn import isbn_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOAN_DAYS = 14
+DEFAULT_RENEW_DAYS = 14
+MAX_RENEWALS = 2
+HOLD_PICKUP_DAYS = 3
+
+
+class Loan:
+
+    __slots__ = ('book', 'patron', 'due', 'renewals', 'overdue')
+
+    def __init__(self, book, patron: str, due: int):
+        self.book = book
+        self.patron = patron
+        self.due = due
+        self.renewals = 0
+        self.overdue = False
+
+    def __repr__(self) -> str:
+        return f"Loan('{self.book.isbn}', patron='{self.patron}', due={self.due})"
+
+
+class Circulation:
+
+    def __init__(self, library, today: int = 0):
+        self.library = library
+        self.today = today                      # Текущий день (целое число)
+        self._loans: Dict = {}                  # Ключ ISBN -> Loan
+        self._overdue: Dict = {}                # Ключ ISBN -> Loan (уже просроченные)
+        self._holds: Dict[object, Deque[str]] = {}      # Ключ ISBN -> очередь читателей
+        self._ready: Dict = {}                  # Ключ ISBN -> (читатель, срок выдачи)
+        # Кучи (срок, порядковый номер, ключ): просроченное извлекается
+        # с вершины без просмотра всех выдач. Записи не удаляются при возврате
+        # или продлении — устаревшие отбрасываются при извлечении по сроку
+        self._due_heap: List[tuple] = []
+        self._pickup_heap: List[tuple] = []
+        self._counter = 0
+
+    def _push(self, heap: List[tuple], deadline: int, key) -> None:
+        self._counter += 1
+        heapq.heappush(heap, (deadline, self._counter, key))
+
+    def _find(self, isbn: str):
+        book = self.library.search_by_isbn(isbn)
+        if book is None:
+            raise ValueError(f"Книга с ISBN '{isbn}' не найдена")
+        return book
+
+    def is_available(self, isbn: str) -> bool:
+        key = isbn_key(isbn)
+        return key not in self._loans and key not in self._ready
+
+    def get_loan(self, isbn: str) -> Optional[Loan]:
+        return self._loans.get(isbn_key(isbn))
+
+    def checkout(self, isbn: str, patron: str, days: int = DEFAULT_LOAN_DAYS) -> Loan:
+        book = self._find(isbn)
+        key = book.isbn_key
+        if key in self._loans:
+            raise ValueError(f"Книга '{isbn}' уже выдана")
+        reserved = self._ready.get(key)
+        if reserved is not None:
+            if reserved[0] != patron:
+                raise ValueError(f"Книга '{isbn}' отложена для другого читателя")
+            del self._ready[key]
+        elif self._holds.get(key):
+            raise ValueError(f"На книгу '{isbn}' есть очередь резервирования")
+
+        loan = Loan(book, patron, self.today + days)
+        self._loans[key] = loan
+        self._push(self._due_heap, loan.due, key)
+        logger.info(f"Book checked out: {book.isbn} -> {patron} (due day {loan.due})")
+        return loan
+
+    def return_book(self, isbn: str) -> Optional[str]:
+        key = isbn_key(isbn)
+        loan = self._loans.pop(key, None)
+        if loan is None:
+            raise ValueError(f"Книга '{isbn}' не выдана")
+        self._overdue.pop(key, None)
+        logger.info(f"Book returned: {loan.book.isbn} by {loan.patron}")
+        return self._promote(key)
+
+    def renew(self, isbn: str, days: int = DEFAULT_RENEW_DAYS) -> int:
+        key = isbn_key(isbn)
+        loan = self._loans.get(key)
+        if loan is None:
+            raise ValueError(f"Книга '{isbn}' не выдана")
+        if self._holds.get(key):
+            raise ValueError(f"Книгу '{isbn}' нельзя продлить: есть очередь резервирования")
+        if loan.renewals >= MAX_RENEWALS:
+            raise ValueError(f"Книгу '{isbn}' нельзя продлить больше {MAX_RENEWALS} раз")
+        loan.renewals += 1
+        loan.due = max(loan.due, self.today) + days
+        loan.overdue = False
+        self._overdue.pop(key, None)
+        self._push(self._due_heap, loan.due, key)
+        return loan.due
+
+    def place_hold(self, isbn: str, patron: str) -> int:
+        key = self._find(isbn).isbn_key
+        if key not in self._loans and key not in self._ready:
+            # Книга на полке: сразу отложить для читателя
+            self._reserve(key, patron)
+            return 0
+        queue = self._holds.setdefault(key, deque())
+        if patron in queue:
+            raise ValueError(f"Читатель '{patron}' уже в очереди на '{isbn}'")
+        queue.append(patron)
+        return len(queue)
+
+    def cancel_hold(self, isbn: str, patron: str) -> bool:
+        key = isbn_key(isbn)
+        reserved = self._ready.get(key)
+        if reserved is not None and reserved[0] == patron:
+            del self._ready[key]
+            self._promote(key)
+            return True
+        queue = self._holds.get(key)
+        if not queue or patron not in queue:
+            return False
+        queue.remove(patron)
+        if not queue:
+            del self._holds[key]
+        return True
+
+    def _reserve(self, key, patron: str) -> None:
+        deadline = self.today + HOLD_PICKUP_DAYS
+        self._ready[key] = (patron, deadline)
+        self._push(self._pickup_heap, deadline, key)
+
+    def _promote(self, key) -> Optional[str]:
+        # Следующий читатель из очереди получает книгу на полку выдачи
+        queue = self._holds.get(key)
+        if not queue:
+            return None
+        patron = queue.popleft()
+        if not queue:
+            del self._holds[key]
+        self._reserve(key, patron)
+        return patron
+
+    def advance(self, days: int = 1) -> dict:
+        if days < 0:
+            raise ValueError("Время не может идти назад")
+        self.today += days
+
+        # Новые просрочки: только записи со сроком раньше сегодняшнего дня
+        new_overdue = []
+        heap = self._due_heap
+        while heap and heap[0][0] < self.today:
+            due, _, key = heapq.heappop(heap)
+            loan = self._loans.get(key)
+            if loan is None or loan.due != due or loan.overdue:
+                continue
+            loan.overdue = True
+            self._overdue[key] = loan
+            new_overdue.append(loan)
+
+        # Истёкшие резервы: книга переходит следующему в очереди
+        expired = 0
+        heap = self._pickup_heap
+        while heap and heap[0][0] < self.today:
+            deadline, _, key = heapq.heappop(heap)
+            reserved = self._ready.get(key)
+            if reserved is None or reserved[1] != deadline:
+                continue
+            del self._ready[key]
+            expired += 1
+            self._promote(key)
+
+        return {'day': self.today, 'new_overdue': new_overdue, 'expired_holds': expired}
+
+    def overdue(self) -> List[Loan]:
+        return list(self._overdue.values())
+
+    def forget(self, key) -> None:
+        # Книга удалена из каталога: выдача и очередь теряют смысл
+        self._loans.pop(key, None)
+        self._overdue.pop(key, None)
+        self._holds.pop(key, None)
+        self._ready.pop(key, None)
+
+    def get_statistics(self) -> dict:
+        return {
+            'day': self.today,
+            'active_loans': len(self._loans),
+            'overdue_loans': len(self._overdue),
+            'waiting_holds': sum(len(queue) for queue in self._holds.values()),
+            'ready_for_pickup': len(self._ready),
+        }
+
+    def __len__(self) -> int:
+        return len(self._loans)
+
+    def __repr__(self) -> str:
+        return (f"Circulation(day={self.today}, loans={len(self._loans)}, "
+                f"overdue={len(self._overdue)}, holds={len(self._holds)})")
@@ -0,0 +1,297 @@
+import json
+import logging
+import lzma
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.batch import book_from_record, book_to_record, iter_jsonl
+from src.models import Book, Library
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LCOL"
+VERSION = 1
+DEFAULT_BLOCK_SIZE = 65536
+
+# Кодек сжатия блоков: имя -> (код в заголовке, сжатие, распаковка)
+CODECS = {
+    "zlib": (0, lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (1, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+_CODEC_BY_ID = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+_FILE_HEADER = struct.Struct("<4sBB")
+_BLOCK_HEADER = struct.Struct("<III")   # строк, байт до сжатия, байт после
+_META_LENGTH = struct.Struct("<I")
+
+# "ISBN-001042" -> префикс "ISBN-", номер 1042, ширина 6.
+# Только ASCII-цифры и совпадение со всей строкой: "ISBN-١٢٣" или "ISBN-1\n"
+# через int() восстановились бы другой строкой, поэтому пишутся как есть
+_ISBN_RE = re.compile(r"(.*?)([0-9]{1,18})", re.DOTALL)
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(typecode: str, data: bytes, offset: int, count: int) -> Tuple[array, int]:
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    column.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+class _Dictionary:
+    # Словарное кодирование: значение -> номер в порядке первого появления
+
+    def __init__(self):
+        self.ids: Dict = {}
+        self.values: List = []
+
+    def encode(self, value) -> int:
+        code = self.ids.get(value)
+        if code is None:
+            code = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _split_isbn(isbn: str) -> Tuple[str, int, int]:
+    # (префикс, ширина, номер); ширина -1 — ISBN без числового хвоста
+    match = _ISBN_RE.fullmatch(isbn)
+    if match is None:
+        return isbn, -1, 0
+    prefix, digits = match.groups()
+    return prefix, len(digits), int(digits)
+
+
+def _encode_block(books: List[Book]) -> bytes:
+    titles, authors, genres, formats = _Dictionary(), _Dictionary(), _Dictionary(), _Dictionary()
+    title_ids, author_ids, genre_ids, format_ids = [], [], [], []
+    year_deltas = array("i")
+    number_deltas = array("q")
+    previous_year = 0
+    previous_number = 0
+
+    for book in books:
+        title_ids.append(titles.encode(book.title))
+        author_ids.append(authors.encode(book.author))
+        genre_ids.append(genres.encode(book.genre))
+        # Годы и номера ISBN хранятся разностями с предыдущей строкой:
+        # для последовательных ISBN это столбец единиц, который хорошо сжимается
+        year_deltas.append(book.year - previous_year)
+        previous_year = book.year
+        prefix, width, number = _split_isbn(book.isbn)
+        format_ids.append(formats.encode((prefix, width)))
+        number_deltas.append(number - previous_number)
+        previous_number = number
+
+    columns = [titles, authors, genres, formats]
+    typecodes = ["H" if len(d.values) <= 0xFFFF else "I" for d in columns]
+    meta = json.dumps({
+        "titles": titles.values,
+        "authors": authors.values,
+        "genres": genres.values,
+        "isbn_formats": formats.values,
+        "typecodes": typecodes,
+    }, ensure_ascii=False).encode("utf-8")
+
+    parts = [_META_LENGTH.pack(len(meta)), meta]
+    for typecode, ids in zip(typecodes, (title_ids, author_ids, genre_ids, format_ids)):
+        parts.append(_little_endian(array(typecode, ids)))
+    parts.append(_little_endian(year_deltas))
+    parts.append(_little_endian(number_deltas))
+    return b"".join(parts)
+
+
+def _decode_block(raw: bytes, count: int) -> List[Book]:
+    (meta_length,) = _META_LENGTH.unpack_from(raw, 0)
+    offset = _META_LENGTH.size
+    meta = json.loads(raw[offset:offset + meta_length].decode("utf-8"))
+    offset += meta_length
+
+    ids = []
+    for typecode in meta["typecodes"]:
+        column, offset = _read_column(typecode, raw, offset, count)
+        ids.append(column)
+    year_deltas, offset = _read_column("i", raw, offset, count)
+    number_deltas, offset = _read_column("q", raw, offset, count)
+    if offset != len(raw):
+        raise ValueError("Повреждённый блок каталога: неверная длина столбцов")
+
+    titles, authors, genres = meta["titles"], meta["authors"], meta["genres"]
+    formats = [(prefix, width) for prefix, width in meta["isbn_formats"]]
+    books = []
+    year = 0
+    number = 0
+    for i in range(count):
+        year += year_deltas[i]
+        number += number_deltas[i]
+        prefix, width = formats[ids[3][i]]
+        isbn = prefix if width < 0 else f"{prefix}{number:0{width}d}"
+        books.append(Book(titles[ids[0][i]], authors[ids[1][i]], year, genres[ids[2][i]], isbn))
+    return books
+
+
+def export_columnar(books: Iterable[Book], path: str, codec: str = "zlib",
+                    block_size: int = DEFAULT_BLOCK_SIZE) -> dict:
+    if codec not in CODECS:
+        raise ValueError(f"Неизвестный кодек '{codec}' (допустимо: {', '.join(CODECS)})")
+    if block_size <= 0:
+        raise ValueError("block_size должен быть положительным")
+    codec_id, compress, _ = CODECS[codec]
+
+    start = time.perf_counter()
+    count = 0
+    blocks = 0
+    with open(path, "wb") as f:
+        f.write(_FILE_HEADER.pack(MAGIC, VERSION, codec_id))
+
+        def flush(block: List[Book]) -> None:
+            raw = _encode_block(block)
+            payload = compress(raw)
+            f.write(_BLOCK_HEADER.pack(len(block), len(raw), len(payload)))
+            f.write(payload)
+
+        block: List[Book] = []
+        for book in books:
+            block.append(book)
+            if len(block) == block_size:
+                flush(block)
+                count += len(block)
+                blocks += 1
+                block = []
+        if block:
+            flush(block)
+            count += len(block)
+            blocks += 1
+
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    logger.info(f"Exported {count} book(s) to {path} ({size} bytes, {blocks} block(s), {codec})")
+    return {'books': count, 'blocks': blocks, 'bytes': size, 'elapsed': elapsed}
+
+
+def is_columnar(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_columnar(path: str) -> Iterator[List[Book]]:
+    # Файл читается и распаковывается по одному блоку
+    with open(path, "rb") as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) != _FILE_HEADER.size:
+            raise ValueError(f"Файл '{path}' не является столбцовым каталогом")
+        magic, version, codec_id = _FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Файл '{path}' не является столбцовым каталогом")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия каталога: {version}")
+        if codec_id not in _CODEC_BY_ID:
+            raise ValueError(f"Неизвестный кодек в каталоге: {codec_id}")
+        decompress = CODECS[_CODEC_BY_ID[codec_id]][2]
+
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if not header:
+                return
+            if len(header) != _BLOCK_HEADER.size:
+                raise ValueError("Повреждённый каталог: неполный заголовок блока")
+            count, raw_length, payload_length = _BLOCK_HEADER.unpack(header)
+            payload = f.read(payload_length)
+            if len(payload) != payload_length:
+                raise ValueError("Повреждённый каталог: неполный блок")
+            try:
+                raw = decompress(payload)
+            except (zlib.error, lzma.LZMAError) as e:
+                raise ValueError(f"Повреждённый каталог: {e}") from e
+            if len(raw) != raw_length:
+                raise ValueError("Повреждённый каталог: неверный размер блока")
+            yield _decode_block(raw, count)
+
+
+def import_columnar(path: str, library: Library) -> dict:
+    start = time.perf_counter()
+    count = 0
+    duplicates = 0
+    seen = set()
+    # Каждый блок применяется отдельной транзакцией
+    for block in iter_columnar(path):
+        with library.transaction():
+            for book in block:
+                if book in seen or book in library.books:
+                    duplicates += 1
+                    continue
+                seen.add(book)
+                library.add_book(book)
+                count += 1
+    elapsed = time.perf_counter() - start
+    if duplicates:
+        logger.warning(f"Skipped {duplicates} duplicate ISBN(s) while importing {path}")
+    logger.info(f"Imported {count} book(s) from {path} in {elapsed:.3f}s")
+    return {
+        'books': count,
+        'duplicates': duplicates,
+        'elapsed': elapsed,
+        'books_per_sec': count / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def read_books(path: str) -> Iterator[Book]:
+    # Книги из каталога любого формата: столбцового или JSONL
+    if is_columnar(path):
+        for block in iter_columnar(path):
+            yield from block
+        return
+    with open(path, encoding="utf-8") as f:
+        for record in iter_jsonl(f):
+            yield book_from_record(record)
+
+
+def benchmark_formats(books: List[Book], directory: str,
+                      codecs: Optional[List[str]] = None) -> List[dict]:
+    # Размер и скорость записи/чтения: JSONL против столбцового формата
+    results = []
+    path = os.path.join(directory, "catalog.jsonl")
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        for book in books:
+            f.write(json.dumps(book_to_record(book), ensure_ascii=False) + "\n")
+    write_time = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(path, encoding="utf-8") as f:
+        loaded = sum(1 for record in iter_jsonl(f) if book_from_record(record))
+    read_time = time.perf_counter() - start
+    results.append({'format': 'jsonl', 'bytes': os.path.getsize(path), 'books': loaded,
+                    'write_time': write_time, 'read_time': read_time})
+
+    for codec in codecs or list(CODECS):
+        path = os.path.join(directory, f"catalog.{codec}.lcol")
+        write_time = export_columnar(books, path, codec)['elapsed']
+        start = time.perf_counter()
+        loaded = sum(len(block) for block in iter_columnar(path))
+        read_time = time.perf_counter() - start
+        results.append({'format': f'columnar+{codec}', 'bytes': os.path.getsize(path),
+                        'books': loaded, 'write_time': write_time, 'read_time': read_time})
+    return results
+
+
+def format_benchmark(results: List[dict]) -> str:
+    baseline = results[0]['bytes'] or 1
+    lines = [f"{'format':<16} {'bytes':>12} {'ratio':>7} {'write s':>9} {'read s':>9} {'read books/s':>13}"]
+    for row in results:
+        read_rate = row['books'] / row['read_time'] if row['read_time'] > 0 else float('inf')
+        lines.append(f"{row['format']:<16} {row['bytes']:>12} {row['bytes'] / baseline:>7.3f} "
+                     f"{row['write_time']:>9.3f} {row['read_time']:>9.3f} {read_rate:>13.0f}")
+    return "\n".join(lines)
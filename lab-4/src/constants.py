@@ -14,6 +14,22 @@ MAX_YEAR = 2024
 
 INITIAL_BOOKS_COUNT = 5
 
+PATRON_COUNT = 50
+
+# Средняя интенсивность событий (в модельный день) для run_timed
+EVENT_RATES = {
+    "add_book": 8.0,
+    "remove_book": 4.0,
+    "search_by_author": 30.0,
+    "search_by_year": 20.0,
+    "search_invalid_isbn": 5.0,
+    "search_by_genre": 15.0,
+    "checkout_book": 25.0,
+    "return_book": 20.0,
+    "renew_loan": 5.0,
+    "place_hold": 5.0,
+}
+
 MAX_SIMULATION_STEPS = 100
 
 LOG_FORMAT = "[Step {step}] {event}"
@@ -0,0 +1,163 @@
+import heapq
+import logging
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Интенсивность: событий в единицу модельного времени, число или функция от времени.
+# У функции должна быть верхняя граница peak (атрибут функции или параметр add_poisson)
+Rate = Union[float, Callable[[float], float]]
+
+
+def diurnal(rate: float, amplitude: float = 0.8, period: float = 1.0) -> Callable[[float], float]:
+    # Суточный цикл: максимум в середине периода, минимум на его границах
+    # amplitude < 1: интенсивность не обращается в ноль и поток не обрывается
+    if not 0 <= amplitude < 1:
+        raise ValueError("amplitude должна быть в диапазоне [0, 1)")
+    def intensity(now: float) -> float:
+        return rate * (1 - amplitude * math.cos(2 * math.pi * now / period))
+    intensity.peak = rate * (1 + amplitude)
+    return intensity
+
+
+class EventSource:
+
+    __slots__ = ('name', 'action', 'rate', 'peak', 'interval', 'count')
+
+    def __init__(self, name: str, action: Callable[[], object],
+                 rate: Optional[Rate] = None, interval: Optional[float] = None,
+                 peak: Optional[float] = None):
+        self.name = name
+        self.action = action
+        self.rate = rate
+        self.peak = peak
+        self.interval = interval
+        self.count = 0
+
+    def next_delay(self, now: float) -> Optional[float]:
+        if self.interval is not None:
+            return self.interval
+        if not callable(self.rate):
+            if self.rate <= 0:
+                return None
+            # Пуассоновский поток: экспоненциальные интервалы между событиями
+            return random.expovariate(self.rate)
+        # Неоднородный поток, прореживание Льюиса–Шедлера: кандидаты идут
+        # с пиковой интенсивностью, кандидат в момент t принимается
+        # с вероятностью rate(t) / peak
+        at = now
+        while True:
+            at += random.expovariate(self.peak)
+            rate = self.rate(at)
+            if rate > self.peak:
+                raise ValueError(f"Интенсивность источника '{self.name}' превысила peak={self.peak}")
+            if random.random() * self.peak < rate:
+                return at - now
+
+    def __repr__(self) -> str:
+        kind = f"interval={self.interval}" if self.interval is not None else f"rate={self.rate}"
+        return f"EventSource('{self.name}', {kind}, count={self.count})"
+
+
+class EventEngine:
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.start = start
+        # Куча (время, порядковый номер, источник): у каждого источника
+        # в очереди ровно одно следующее событие
+        self._queue: List[tuple] = []
+        self._counter = 0
+        self.sources: Dict[str, EventSource] = {}
+        self.processed = 0
+        self.max_queue = 0
+
+    def _push(self, at: float, source: EventSource) -> None:
+        self._counter += 1
+        heapq.heappush(self._queue, (at, self._counter, source))
+        if len(self._queue) > self.max_queue:
+            self.max_queue = len(self._queue)
+
+    def _add_source(self, source: EventSource, first: Optional[float]) -> EventSource:
+        if source.name in self.sources:
+            raise ValueError(f"Источник событий '{source.name}' уже зарегистрирован")
+        self.sources[source.name] = source
+        if first is None:
+            delay = source.next_delay(self.now)
+            if delay is None:
+                return source
+            first = self.now + delay
+        self._push(first, source)
+        return source
+
+    def add_poisson(self, name: str, rate: Rate, action: Callable[[], object],
+                    peak: Optional[float] = None) -> EventSource:
+        if callable(rate):
+            peak = getattr(rate, 'peak', None) if peak is None else peak
+            if peak is None or peak <= 0:
+                raise ValueError("Для интенсивности-функции нужна положительная верхняя граница peak")
+        return self._add_source(EventSource(name, action, rate=rate, peak=peak), None)
+
+    def add_periodic(self, name: str, interval: float, action: Callable[[], object],
+                     first: Optional[float] = None) -> EventSource:
+        if interval <= 0:
+            raise ValueError("Интервал должен быть положительным")
+        start = self.now + interval if first is None else first
+        return self._add_source(EventSource(name, action, interval=interval), start)
+
+    def schedule(self, at: float, name: str, action: Callable[[], object]) -> None:
+        # Разовое событие: источник без повторения
+        if at < self.now:
+            raise ValueError("Нельзя запланировать событие в прошлом")
+        self._push(at, EventSource(name, action, rate=0.0))
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> dict:
+        if until is None and max_events is None:
+            raise ValueError("Нужно указать until или max_events")
+
+        queue = self._queue
+        heappop = heapq.heappop
+        processed = 0
+        wall_start = time.perf_counter()
+        while queue:
+            at = queue[0][0]
+            if until is not None and at > until:
+                break
+            if max_events is not None and processed >= max_events:
+                break
+            _, _, source = heappop(queue)
+            self.now = at
+            source.count += 1
+            source.action()
+            processed += 1
+            delay = source.next_delay(at)
+            if delay is not None:
+                self._push(at + delay, source)
+        if until is not None and (not queue or queue[0][0] > until):
+            self.now = max(self.now, until)
+
+        wall = time.perf_counter() - wall_start
+        self.processed += processed
+        return self._report(processed, wall)
+
+    def _report(self, processed: int, wall: float) -> dict:
+        simulated = self.now - self.start
+        return {
+            'events': processed,
+            'simulated_time': simulated,
+            'events_per_time_unit': self.processed / simulated if simulated > 0 else 0.0,
+            'wall_time': wall,
+            'events_per_sec': processed / wall if wall > 0 else float('inf'),
+            'pending': len(self._queue),
+            'max_queue': self.max_queue,
+            'by_type': {name: source.count for name, source in self.sources.items()},
+        }
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __repr__(self) -> str:
+        return f"EventEngine(now={self.now:.3f}, pending={len(self._queue)}, processed={self.processed})"
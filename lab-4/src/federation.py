@@ -0,0 +1,121 @@
+import logging
+from typing import Callable, Dict, List, Optional
+from src.isbn import isbn_key
+from src.models import ACTION_ADD, Book, BookView, Library
+
+logger = logging.getLogger(__name__)
+
+
+def _increment(counter: dict, key, branch: str) -> None:
+    per_branch = counter.get(key)
+    if per_branch is None:
+        counter[key] = per_branch = {}
+    per_branch[branch] = per_branch.get(branch, 0) + 1
+
+
+def _decrement(counter: dict, key, branch: str) -> None:
+    per_branch = counter.get(key)
+    if per_branch is None or branch not in per_branch:
+        return
+    per_branch[branch] -= 1
+    if not per_branch[branch]:
+        del per_branch[branch]
+        if not per_branch:
+            del counter[key]
+
+
+class FederatedCatalog:
+
+    def __init__(self):
+        self.branches: Dict[str, Library] = {}
+        self._listeners: Dict[str, Callable] = {}
+        # Сводные индексы: ключ -> {филиал: число книг}
+        self._by_isbn: dict = {}
+        self._by_author: dict = {}
+        self._by_year: dict = {}
+        self._by_genre: dict = {}
+        self._total_books = 0
+
+    def add_branch(self, library: Library, name: Optional[str] = None) -> str:
+        name = name or library.name
+        if name in self.branches:
+            raise ValueError(f"Филиал '{name}' уже добавлен")
+
+        self.branches[name] = library
+        for book in library.books:
+            self._index(name, book)
+
+        # Дальнейшие изменения филиала приходят через подписку
+        def listener(action: str, book: Book, branch: str = name) -> None:
+            if action == ACTION_ADD:
+                self._index(branch, book)
+            else:
+                self._unindex(branch, book)
+
+        library.add_listener(listener)
+        self._listeners[name] = listener
+        logger.info(f"Branch '{name}' joined federation ({len(library.books)} books)")
+        return name
+
+    def remove_branch(self, name: str) -> bool:
+        library = self.branches.pop(name, None)
+        if library is None:
+            return False
+        library.remove_listener(self._listeners.pop(name))
+        for book in library.books:
+            self._unindex(name, book)
+        logger.info(f"Branch '{name}' left federation")
+        return True
+
+    def _index(self, branch: str, book: Book) -> None:
+        _increment(self._by_isbn, book.isbn_key, branch)
+        _increment(self._by_author, book.author, branch)
+        _increment(self._by_year, book.year, branch)
+        _increment(self._by_genre, book.genre, branch)
+        self._total_books += 1
+
+    def _unindex(self, branch: str, book: Book) -> None:
+        _decrement(self._by_isbn, book.isbn_key, branch)
+        _decrement(self._by_author, book.author, branch)
+        _decrement(self._by_year, book.year, branch)
+        _decrement(self._by_genre, book.genre, branch)
+        self._total_books -= 1
+
+    def where_is(self, isbn: str) -> List[str]:
+        return list(self._by_isbn.get(isbn_key(isbn), ()))
+
+    def search_by_isbn(self, isbn: str) -> Dict[str, Book]:
+        # Запрос идёт только в филиалы, где книга есть
+        results = {}
+        for branch in self._by_isbn.get(isbn_key(isbn), ()):
+            book = self.branches[branch].search_by_isbn(isbn)
+            if book is not None:
+                results[branch] = book
+        return results
+
+    def count_by_author(self, author: str) -> Dict[str, int]:
+        return dict(self._by_author.get(author, {}))
+
+    def search_by_author(self, author: str) -> Dict[str, BookView]:
+        return {branch: self.branches[branch].search_by_author(author)
+                for branch in self._by_author.get(author, ())}
+
+    def search_by_year(self, year: int) -> Dict[str, BookView]:
+        return {branch: self.branches[branch].search_by_year(year)
+                for branch in self._by_year.get(year, ())}
+
+    def get_statistics(self) -> dict:
+        return {
+            'branches': len(self.branches),
+            'total_books': self._total_books,
+            'unique_isbns': len(self._by_isbn),
+            'unique_authors': len(self._by_author),
+            'year_range': (min(self._by_year), max(self._by_year)) if self._by_year else None,
+            'genres': list(self._by_genre),
+        }
+
+    def __len__(self) -> int:
+        return len(self.branches)
+
+    def __repr__(self) -> str:
+        return f"FederatedCatalog(branches={len(self.branches)}, books={self._total_books})"
@@ -0,0 +1,139 @@
+import bisect
+import heapq
+import re
+import sys
+import unicodedata
+from array import array
+from operator import itemgetter
+from typing import Dict, FrozenSet, List, Tuple
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+DEFAULT_MIN_SIMILARITY = 0.3
+
+
+def normalize(text: str) -> str:
+    # Нижний регистр, без диакритики и пунктуации: "Gödel, Escher" -> "godel escher"
+    folded = text.casefold()
+    if not folded.isascii():
+        # ASCII-строкам разложение не нужно: диакритики в них нет
+        decomposed = unicodedata.normalize("NFKD", folded)
+        folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD_RE.sub(" ", folded).split())
+
+
+def trigrams(normalized: str) -> FrozenSet[str]:
+    # Каждое слово дополняется пробелами, как в pg_trgm: "cat" -> "  c", " ca", "cat", "at "
+    result = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return frozenset(result)
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex:
+
+    def __init__(self):
+        self._postings: Dict[str, set] = {}     # Триграмма -> {термы}
+        self._sizes: Dict[str, int] = {}        # Терм -> число триграмм
+        self._entries: Dict[str, array] = {}    # Терм -> array('I') номеров строк по возрастанию
+
+    def add(self, text: str, value: int) -> None:
+        term = normalize(text)
+        bucket = self._entries.get(term)
+        if bucket is None:
+            grams = trigrams(term)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(term)
+            self._sizes[term] = len(grams)
+            self._entries[term] = bucket = array('I')
+        if not bucket or bucket[-1] < value:
+            # Обычный случай: строки добавляются по возрастанию номеров
+            bucket.append(value)
+        else:
+            bucket.insert(bisect.bisect_left(bucket, value), value)
+
+    def remove(self, text: str, value: int) -> bool:
+        term = normalize(text)
+        bucket = self._entries.get(term)
+        if bucket is None:
+            return False
+        position = bisect.bisect_left(bucket, value)
+        if position == len(bucket) or bucket[position] != value:
+            return False
+        del bucket[position]
+        if not bucket:
+            # Последнее значение терма: убрать терм из постинг-листов
+            for gram in trigrams(term):
+                postings = self._postings[gram]
+                postings.discard(term)
+                if not postings:
+                    del self._postings[gram]
+            del self._sizes[term]
+            del self._entries[term]
+        return True
+
+    def search_terms(self, query: str, limit: int = 10,
+                     min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Tuple[str, float]]:
+        normalized = normalize(query)
+        grams = trigrams(normalized)
+        if not grams:
+            return []
+
+        # Считаются только термы, разделяющие с запросом хотя бы одну триграмму
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for term in self._postings.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+
+        scored = []
+        query_size = len(grams)
+        for term, count in shared.items():
+            # Сходство Жаккара по множествам триграмм
+            similarity = count / (query_size + self._sizes[term] - count)
+            if similarity >= min_similarity:
+                scored.append((term, similarity))
+
+        if 0 < limit < len(scored):
+            # Расстояние Левенштейна нужно только для порядка внутри limit лучших
+            # по Жаккару и для группы равных им на границе отбора
+            boundary = heapq.nlargest(limit, scored, key=itemgetter(1))[-1][1]
+            scored = [item for item in scored if item[1] >= boundary]
+        scored.sort(key=lambda item: (-item[1], edit_distance(normalized, item[0]), item[0]))
+        return scored[:limit]
+
+    def search(self, query: str, limit: int = 10,
+               min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[int]:
+        results = []
+        for term, _ in self.search_terms(query, limit, min_similarity):
+            for value in self._entries[term]:
+                results.append(value)
+                if len(results) == limit:
+                    return results
+        return results
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._postings) + sys.getsizeof(self._sizes) + sys.getsizeof(self._entries)
+        size += sum(sys.getsizeof(gram) + sys.getsizeof(terms) for gram, terms in self._postings.items())
+        size += sum(sys.getsizeof(term) + sys.getsizeof(values) for term, values in self._entries.items())
+        return size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"TrigramIndex(terms={len(self._entries)}, trigrams={len(self._postings)})"
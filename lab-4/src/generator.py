@@ -0,0 +1,139 @@
+import itertools
+import json
+import logging
+import random
+import time
+from typing import Dict, Iterator, List, Optional
+from src.constants import AUTHORS, BOOK_TITLES, MIN_YEAR, MAX_YEAR
+from src.batch import book_to_record
+from src.columnar import export_columnar
+from src.isbn import isbn13_check_digit
+from src.models import Book
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTHOR_COUNT = 10_000
+DEFAULT_ZIPF_EXPONENT = 1.1
+DEFAULT_YEAR_SKEW = 15.0        # Средний «возраст» книги в годах
+CHUNK_SIZE = 10_000
+
+# Доли жанров по умолчанию: художественная литература встречается чаще
+DEFAULT_GENRE_WEIGHTS = {
+    "Fiction": 0.35,
+    "Non-Fiction": 0.2,
+    "Science": 0.15,
+    "History": 0.12,
+    "Technology": 0.1,
+    "Biography": 0.08,
+}
+
+_FIRST_NAMES = ["Anna", "Boris", "Clara", "David", "Elena", "Felix", "Grace", "Hugo",
+                "Irina", "James", "Karl", "Lena", "Mark", "Nina", "Oscar", "Paula",
+                "Quinn", "Rosa", "Sergei", "Tara", "Umberto", "Vera", "Walter", "Yuri"]
+_LAST_NAMES = ["Abbott", "Bauer", "Chen", "Dvorak", "Evans", "Fischer", "Garcia", "Hale",
+               "Ivanov", "Jensen", "Kowalski", "Lindqvist", "Moreau", "Novak", "Okafor",
+               "Petrov", "Quist", "Rossi", "Sato", "Tanaka", "Ulrich", "Varga", "Weber", "Zhou"]
+_ADJECTIVES = ["Silent", "Hidden", "Last", "Broken", "Golden", "Distant", "Quantum", "Elegant",
+               "Forgotten", "Infinite", "Secret", "Northern", "Curious", "Deep", "Lost", "Bright"]
+_NOUNS = ["Universe", "Machine", "River", "Empire", "Garden", "Algorithm", "Voyage", "Theory",
+          "Kingdom", "Signal", "Archive", "Mountain", "Mind", "Library", "Engine", "Atlas"]
+
+
+def _author_names(count: int) -> List[str]:
+    # Сначала знакомые авторы из constants.py, затем сочетания имён и фамилий
+    names = list(AUTHORS[:count])
+    for last, first in itertools.product(_LAST_NAMES, _FIRST_NAMES):
+        if len(names) >= count:
+            return names
+        names.append(f"{first} {last}")
+    while len(names) < count:
+        names.append(f"Author {len(names):07d}")
+    return names
+
+
+def _isbn13(sequence: int) -> str:
+    # Уникальный корректный ISBN-13: 978 + 9 цифр номера + контрольная цифра
+    digits = f"978{sequence:09d}"
+    return f"{digits}{isbn13_check_digit(digits)}"
+
+
+class CatalogGenerator:
+
+    def __init__(self, seed: int = 0, author_count: int = DEFAULT_AUTHOR_COUNT,
+                 zipf_exponent: float = DEFAULT_ZIPF_EXPONENT,
+                 genre_weights: Optional[Dict[str, float]] = None,
+                 min_year: int = MIN_YEAR, max_year: int = MAX_YEAR,
+                 year_skew: float = DEFAULT_YEAR_SKEW):
+        if author_count <= 0:
+            raise ValueError("author_count должен быть положительным")
+        if zipf_exponent <= 0:
+            raise ValueError("zipf_exponent должен быть положительным")
+        if min_year > max_year:
+            raise ValueError("min_year не может быть больше max_year")
+        if year_skew <= 0:
+            raise ValueError("year_skew должен быть положительным")
+        genre_weights = genre_weights or DEFAULT_GENRE_WEIGHTS
+        if not genre_weights or min(genre_weights.values()) < 0 or not sum(genre_weights.values()):
+            raise ValueError("Веса жанров должны быть неотрицательными и не все нулевыми")
+
+        self.seed = seed
+        self.authors = _author_names(author_count)
+        # Закон Ципфа: k-й по популярности автор встречается ~ 1/k^s раз
+        self._author_weights = list(itertools.accumulate(
+            1.0 / rank ** zipf_exponent for rank in range(1, author_count + 1)))
+        self.genres = list(genre_weights)
+        self._genre_weights = list(itertools.accumulate(genre_weights.values()))
+        self.min_year = min_year
+        self.max_year = max_year
+        self.year_skew = year_skew
+        self._titles = list(BOOK_TITLES) + [f"The {adjective} {noun}"
+                                            for adjective in _ADJECTIVES for noun in _NOUNS]
+
+    def books(self, count: int, isbn_offset: int = 0) -> Iterator[Book]:
+        # Поток книг; одинаковые seed и аргументы дают одинаковый каталог.
+        # Память не зависит от count: книги создаются порциями
+        if count < 0:
+            raise ValueError("count не может быть отрицательным")
+        rng = random.Random(self.seed)
+        span = self.max_year - self.min_year
+        rate = 1.0 / self.year_skew
+        sequence = isbn_offset
+        remaining = count
+        while remaining:
+            size = min(CHUNK_SIZE, remaining)
+            authors = rng.choices(self.authors, cum_weights=self._author_weights, k=size)
+            genres = rng.choices(self.genres, cum_weights=self._genre_weights, k=size)
+            titles = rng.choices(self._titles, k=size)
+            for title, author, genre in zip(titles, authors, genres):
+                # Новые книги чаще старых: возраст распределён экспоненциально,
+                # значения за пределами диапазона лет разыгрываются заново
+                age = int(rng.expovariate(rate))
+                while age > span:
+                    age = int(rng.expovariate(rate))
+                yield Book(title, author, self.max_year - age, genre, _isbn13(sequence))
+                sequence += 1
+            remaining -= size
+
+    def __repr__(self) -> str:
+        return (f"CatalogGenerator(seed={self.seed}, authors={len(self.authors)}, "
+                f"genres={len(self.genres)})")
+
+
+def write_catalog(path: str, count: int, generator: CatalogGenerator,
+                  codec: str = "zlib") -> dict:
+    # Формат по расширению: .lcol — столбцовый, иначе JSONL
+    start = time.perf_counter()
+    books = generator.books(count)
+    if path.endswith(".lcol"):
+        export_columnar(books, path, codec)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for book in books:
+                f.write(json.dumps(book_to_record(book), ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Generated {count} book(s) into {path} in {elapsed:.3f}s")
+    return {
+        'books': count,
+        'elapsed': elapsed,
+        'books_per_sec': count / elapsed if elapsed > 0 else float('inf'),
+    }
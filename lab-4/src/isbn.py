@@ -0,0 +1,86 @@
+import re
+from typing import Optional, Union
+
+# Канонический ключ ISBN: разные написания одного ISBN дают один ключ.
+# Ключ — целое число (так его хранят выдачи, Book.isbn_key и SharedCatalog)
+# или сама строка:
+#   ISBN-10/ISBN-13 (с дефисами, пробелами, префиксом "ISBN")
+#       -> значение ISBN-13, диапазон [978e10, 980e10)
+#   Формат симулятора "ISBN-<до 12 цифр>"
+#       -> int("1" + цифры), диапазон [10, 2e12); ведущая единица
+#          сохраняет ведущие нули, поэтому "ISBN-001" != "ISBN-0001"
+#   Всё остальное -> сама строка (внешний API не ограничивается)
+# canonical_isbn(key) — каноническое написание ключа: isbn_key от него
+# возвращает тот же ключ. IndexDict хранит строки в этом написании, а не
+# целые ключи: запрос в каноническом виде находится без разбора строки,
+# а написание обычно совпадает с Book.isbn и не занимает лишней памяти
+IsbnKey = Union[int, str]
+
+_SIMULATOR_PREFIX = "ISBN-"
+_SIMULATOR_MAX_DIGITS = 12
+_STANDARD_MIN = 978 * 10 ** 10
+_PREFIX_RE = re.compile(r"ISBN(?:-1[03])?:?", re.IGNORECASE)
+_SEPARATORS = str.maketrans("", "", "- ")
+
+
+def _isbn10_to_13(digits: str) -> Optional[int]:
+    if not (digits[:9].isdigit() and (digits[9].isdigit() or digits[9] in "Xx")):
+        return None
+    total = sum((10 - i) * int(ch) for i, ch in enumerate(digits[:9]))
+    total += 10 if digits[9] in "Xx" else int(digits[9])
+    if total % 11 != 0:
+        return None
+    return _with_isbn13_check("978" + digits[:9])
+
+
+def isbn13_check_digit(first12: str) -> int:
+    # Веса 1 и 3 попеременно; срезы вместо enumerate заметно быстрее
+    total = sum(map(int, first12[0::2])) + 3 * sum(map(int, first12[1::2]))
+    return (10 - total % 10) % 10
+
+
+def _with_isbn13_check(first12: str) -> int:
+    return int(first12) * 10 + isbn13_check_digit(first12)
+
+
+def _parse_standard(isbn: str) -> Optional[int]:
+    value = isbn.strip()
+    match = _PREFIX_RE.match(value)
+    if match:
+        value = value[match.end():]
+    digits = value.translate(_SEPARATORS)
+    if not digits.isascii():
+        return None
+
+    if len(digits) == 10:
+        return _isbn10_to_13(digits)
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ("978", "979"):
+        if _with_isbn13_check(digits[:12]) == int(digits):
+            return int(digits)
+    return None
+
+
+def isbn_key(isbn: str) -> IsbnKey:
+    # Быстрый путь для формата симулятора
+    digits = isbn[5:]
+    if (isbn.startswith(_SIMULATOR_PREFIX) and 0 < len(digits) <= _SIMULATOR_MAX_DIGITS
+            and digits.isdigit() and digits.isascii()):
+        if len(digits) == 10:
+            standard = _parse_standard(digits)
+            if standard is not None:
+                return standard
+        return int("1" + digits)
+
+    standard = _parse_standard(isbn)
+    if standard is not None:
+        return standard
+    return isbn
+
+
+def canonical_isbn(key: IsbnKey) -> str:
+    if isinstance(key, str):
+        return key
+    if key >= _STANDARD_MIN:
+        return str(key)
+    # Ведущая единица формата симулятора отбрасывается
+    return _SIMULATOR_PREFIX + str(key)[1:]
@@ -0,0 +1,199 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RESERVOIR_SIZE = 512
+DEFAULT_CURVE_POINTS = 64
+
+
+class RunningStats:
+
+    __slots__ = ('count', 'mean', '_m2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        # Алгоритм Уэлфорда: среднее и дисперсия за один проход
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return f"RunningStats(count={self.count}, mean={self.mean:.3g})"
+
+
+class Reservoir:
+
+    def __init__(self, size: int = DEFAULT_RESERVOIR_SIZE, seed: int = 0):
+        if size <= 0:
+            raise ValueError("Размер выборки должен быть положительным")
+        self.size = size
+        self.seen = 0
+        self._samples: List[float] = []
+        # Свой генератор: глобальный random задаёт ход симуляции
+        self._random = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        # Алгоритм R: каждый элемент попадает в выборку с вероятностью size/seen
+        self.seen += 1
+        if len(self._samples) < self.size:
+            self._samples.append(value)
+            return
+        index = self._random.randrange(self.seen)
+        if index < self.size:
+            self._samples[index] = value
+
+    def quantile(self, fraction: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def __repr__(self) -> str:
+        return f"Reservoir(size={self.size}, seen={self.seen})"
+
+
+class GrowthCurve:
+
+    def __init__(self, max_points: int = DEFAULT_CURVE_POINTS):
+        if max_points < 2:
+            raise ValueError("max_points должно быть не меньше 2")
+        self.max_points = max_points
+        self.stride = 1
+        self._points: List[Tuple[int, int]] = []
+        self._position = 0
+        self._last: Optional[Tuple[int, int]] = None
+
+    def add(self, value: int) -> None:
+        # Точка сохраняется раз в stride наблюдений; при переполнении
+        # каждая вторая точка отбрасывается, а шаг удваивается
+        if self._position % self.stride == 0:
+            if len(self._points) == self.max_points:
+                self._points = self._points[::2]
+                self.stride *= 2
+            if self._position % self.stride == 0:
+                self._points.append((self._position, value))
+        self._last = (self._position, value)
+        self._position += 1
+
+    @property
+    def points(self) -> List[Tuple[int, int]]:
+        # Последнее наблюдение показывается всегда, даже между точками сетки
+        points = list(self._points)
+        if self._last is not None and points[-1] != self._last:
+            points.append(self._last)
+        return points
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+
+class SimulationMetrics:
+
+    def __init__(self, reservoir_size: int = DEFAULT_RESERVOIR_SIZE,
+                 curve_points: int = DEFAULT_CURVE_POINTS):
+        self.reservoir_size = reservoir_size
+        self.latency: Dict[str, RunningStats] = {}
+        self.latency_samples: Dict[str, Reservoir] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.result_sizes: Dict[str, Reservoir] = {}
+        self.library_size = GrowthCurve(curve_points)
+
+    def record_event(self, name: str, latency: float, library_size: Optional[int] = None) -> None:
+        stats = self.latency.get(name)
+        if stats is None:
+            stats = self.latency[name] = RunningStats()
+            self.latency_samples[name] = Reservoir(self.reservoir_size)
+        stats.add(latency)
+        self.latency_samples[name].add(latency)
+        if library_size is not None:
+            self.library_size.add(library_size)
+
+    def record_result(self, name: str, size: int) -> None:
+        # Пустой результат поиска считается промахом
+        if size:
+            self.hits[name] = self.hits.get(name, 0) + 1
+        else:
+            self.misses[name] = self.misses.get(name, 0) + 1
+        reservoir = self.result_sizes.get(name)
+        if reservoir is None:
+            reservoir = self.result_sizes[name] = Reservoir(self.reservoir_size)
+        reservoir.add(size)
+
+    def hit_rate(self, name: str) -> float:
+        hits = self.hits.get(name, 0)
+        total = hits + self.misses.get(name, 0)
+        return hits / total if total else 0.0
+
+    @property
+    def total_events(self) -> int:
+        return sum(stats.count for stats in self.latency.values())
+
+    def summary(self) -> dict:
+        events = {}
+        for name, stats in self.latency.items():
+            samples = self.latency_samples[name]
+            events[name] = {
+                'count': stats.count,
+                'mean_us': stats.mean * 1e6,
+                'p50_us': samples.quantile(0.50) * 1e6,
+                'p99_us': samples.quantile(0.99) * 1e6,
+                'max_us': stats.max * 1e6,
+            }
+        searches = {}
+        for name, reservoir in self.result_sizes.items():
+            searches[name] = {
+                'hit_rate': self.hit_rate(name),
+                'median_results': reservoir.quantile(0.50),
+                'p90_results': reservoir.quantile(0.90),
+            }
+        return {
+            'total_events': self.total_events,
+            'events': events,
+            'searches': searches,
+            'library_size': self.library_size.points,
+        }
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = [f"Events: {summary['total_events']}",
+                 f"  {'event':<20} {'count':>8} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}"]
+        for name, event in sorted(summary['events'].items(), key=lambda item: -item[1]['count']):
+            lines.append(f"  {name:<20} {event['count']:>8} {event['mean_us']:>9.1f} "
+                         f"{event['p50_us']:>9.1f} {event['p99_us']:>9.1f}")
+        if summary['searches']:
+            lines.append("Searches:")
+            for name, search in sorted(summary['searches'].items()):
+                lines.append(f"  {name:<20} hit rate {search['hit_rate']:6.1%}, "
+                             f"results p50={search['median_results']:g} "
+                             f"p90={search['p90_results']:g}")
+        curve = summary['library_size']
+        if curve:
+            # Кривая роста сокращается до нескольких точек для вывода
+            step = max(len(curve) // 8, 1)
+            shown = curve[::step]
+            if shown[-1] != curve[-1]:
+                shown.append(curve[-1])
+            lines.append("Library size: " + " -> ".join(f"{size}@{index}" for index, size in shown))
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"SimulationMetrics(events={self.total_events}, types={len(self.latency)})"
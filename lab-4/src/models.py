@@ -1,9 +1,52 @@
+import bisect
 import logging
-from typing import List, Optional, Union
+import sys
+import weakref
+from array import array
+from collections.abc import Sequence
+from itertools import chain, compress, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from src.constants import GENRES, AUTHORS, BOOK_TITLES, MIN_YEAR, MAX_YEAR
+from src.autocomplete import PrefixIndex
+from src.bloom import DEFAULT_CAPACITY, DEFAULT_FALSE_POSITIVE_RATE, CountingBloomFilter
+from src.changefeed import DEFAULT_RETENTION, ChangeFeed
+from src.circulation import Circulation
+from src.fuzzy import DEFAULT_MIN_SIMILARITY, TrigramIndex
+from src.isbn import IsbnKey, canonical_isbn, isbn_key
+from src.ordered import SortedIndex
+from src.pagination import Page, paginate_rows, paginate_scan
 
 logger = logging.getLogger(__name__)
 
+# Типы изменений, о которых Library уведомляет подписчиков
+ACTION_ADD = "add"
+ACTION_REMOVE = "remove"
+
+# Поля для упорядоченных представлений: поле -> ключ сортировки
+ORDER_KEYS: Dict[str, Callable] = {
+    "title": lambda value: value.casefold(),
+    "author": lambda value: value.casefold(),
+    "year": int,
+}
+
+# Поля группировки для aggregate: поле -> значение по книге
+GROUP_FIELDS: Dict[str, Callable[['Book'], object]] = {
+    "author": lambda book: book.author,
+    "year": lambda book: book.year,
+    "decade": lambda book: book.year // 10 * 10,
+    "genre": lambda book: book.genre,
+}
+# Эти поля считаются по размерам корзин и счётчикам индекса, без обхода книг
+INDEXED_GROUPS = ("author", "year", "decade", "genre")
+AGGREGATE_METRICS = ("count", "share")
+
+# Строк в блоке RowStore: единица копирования при записи после снимка
+ROW_CHUNK_BITS = 10
+ROW_CHUNK = 1 << ROW_CHUNK_BITS
+_ROW_MASK = ROW_CHUNK - 1
+# Заполненный блок, в котором живых строк меньше порога, хранится разреженно
+SPARSE_CHUNK_LIVE = ROW_CHUNK // 2
+
 
 class Book:
     
@@ -14,6 +57,16 @@ class Book:
         self.genre = genre
         self.isbn = isbn
     
+    @property
+    def isbn(self) -> str:
+        return self._isbn
+    
+    @isbn.setter
+    def isbn(self, value: str) -> None:
+        # Канонический целочисленный ключ считается один раз
+        self._isbn = value
+        self.isbn_key: IsbnKey = isbn_key(value)
+    
     def __repr__(self) -> str:
         return f"Book(title='{self.title}', author='{self.author}', isbn='{self.isbn}')"
     
@@ -23,7 +76,12 @@ class Book:
     def __eq__(self, other) -> bool:
         if not isinstance(other, Book):
             return False
-        return self.isbn == other.isbn
+        return self.isbn_key == other.isbn_key
+    
+    def __hash__(self) -> int:
+        # Согласовано с __eq__: книги с одним ISBN равны и имеют один хеш.
+        # ISBN книги, лежащей в множестве или словаре, менять нельзя
+        return hash(self.isbn_key)
     
     def __contains__(self, keyword: str) -> bool:
         keyword_lower = keyword.lower()
@@ -31,119 +89,740 @@ class Book:
                 keyword_lower in self.author.lower())
 
 
-class BookCollection:
+class _SparseChunk:
+    # Разреженный блок RowStore: смещения живых строк по возрастанию и их книги.
+    # Номера строк не меняются, удалённые строки не занимают места
+    
+    __slots__ = ('offsets', 'books')
+    
+    def __init__(self, offsets: array, books: List[Book]):
+        self.offsets = offsets
+        self.books = books
+    
+    @classmethod
+    def pack(cls, chunk: List[Optional[Book]]) -> '_SparseChunk':
+        offsets = array('H', compress(range(len(chunk)), chunk))
+        return cls(offsets, list(filter(None, chunk)))
+    
+    def copy(self) -> '_SparseChunk':
+        return _SparseChunk(array('H', self.offsets), list(self.books))
+    
+    def discard(self, offset: int) -> None:
+        position = bisect.bisect_left(self.offsets, offset)
+        del self.offsets[position]
+        del self.books[position]
+    
+    def rows(self, base: int, offset: int) -> Iterator[int]:
+        position = bisect.bisect_left(self.offsets, offset)
+        return map(base.__add__, islice(self.offsets, position, None))
+    
+    def __getitem__(self, offset: int) -> Optional[Book]:
+        position = bisect.bisect_left(self.offsets, offset)
+        if position < len(self.offsets) and self.offsets[position] == offset:
+            return self.books[position]
+        return None
+    
+    def __iter__(self) -> Iterator[Book]:
+        return iter(self.books)
+    
+    def __len__(self) -> int:
+        return len(self.books)
+    
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.offsets) + sys.getsizeof(self.books)
+
 
+class RowStore:
+    # Единое хранилище книг: номер строки = порядковый номер вставки.
+    # Все индексы ссылаются на книги только номерами строк;
+    # удалённая строка становится None, номера не переиспользуются.
+    # Строки лежат блоками по ROW_CHUNK: снимок разделяет блоки с хранилищем,
+    # а запись копирует только изменяемый блок. Заполненный блок, где живых
+    # строк меньше SPARSE_CHUNK_LIVE, сжимается в _SparseChunk; блок без живых
+    # строк освобождается, освобождённые блоки в начале списка отбрасываются.
+    # Так при любом порядке удалений allocated <= 2 * live + ROW_CHUNK
+    
     def __init__(self):
-        self._books: List[Book] = []
+        self._chunks: List[Union[List[Optional[Book]], _SparseChunk, None]] = []
+        self._counts = array('H')     # Число живых строк в каждом блоке
+        self._base = 0                # Номер блока _chunks[0]
+        self._next = 0
+        self._live = 0
+        # Копирование при записи: _shared — список блоков разделяется со снимком,
+        # _owned — номера блоков, скопированных после последнего снимка (None = все свои)
+        self._shared = False
+        self._owned: Optional[set] = None
+        self._frozen = False
+    
+    def snapshot(self) -> 'RowStore':
+        frozen = RowStore.__new__(RowStore)
+        frozen._chunks = self._chunks
+        frozen._counts = self._counts
+        frozen._base = self._base
+        frozen._next = self._next
+        frozen._live = self._live
+        frozen._shared = True
+        frozen._owned = None
+        frozen._frozen = True
+        self._shared = True
+        self._owned = set()
+        return frozen
+    
+    def _before_write(self) -> None:
+        if self._frozen:
+            raise TypeError("Снимок каталога доступен только для чтения")
+        if self._shared:
+            # Копируется только список блоков: O(n / ROW_CHUNK)
+            self._chunks = list(self._chunks)
+            self._counts = array('H', self._counts)
+            self._shared = False
+    
+    def _writable_chunk(self, index: int) -> Union[List[Optional[Book]], _SparseChunk]:
+        chunk = self._chunks[index]
+        number = index + self._base
+        if self._owned is not None and number not in self._owned:
+            # Блок ещё разделяется со снимком
+            chunk = self._chunks[index] = chunk.copy()
+            self._owned.add(number)
+        return chunk
+    
+    def _release(self, index: int) -> None:
+        # Строки блока больше не нужны ни хранилищу, ни индексам
+        self._chunks[index] = None
+        if index == 0:
+            dropped = 0
+            while dropped < len(self._chunks) and self._chunks[dropped] is None:
+                dropped += 1
+            del self._chunks[:dropped]
+            del self._counts[:dropped]
+            self._base += dropped
+    
+    def append(self, book: Book) -> int:
+        self._before_write()
+        row = self._next
+        index = (row >> ROW_CHUNK_BITS) - self._base
+        if index == len(self._chunks):
+            self._chunks.append([book])
+            self._counts.append(1)
+            if self._owned is not None:
+                self._owned.add(index + self._base)
+        else:
+            self._writable_chunk(index).append(book)
+            self._counts[index] += 1
+        self._next = row + 1
+        self._live += 1
+        return row
+    
+    def delete(self, row: int) -> Optional[Book]:
+        index = (row >> ROW_CHUNK_BITS) - self._base
+        if index < 0 or row >= self._next or self._chunks[index] is None:
+            return None
+        book = self._chunks[index][row & _ROW_MASK]
+        if book is not None:
+            self._before_write()
+            chunk = self._writable_chunk(index)
+            self._counts[index] -= 1
+            self._live -= 1
+            if type(chunk) is list:
+                chunk[row & _ROW_MASK] = None
+                if len(chunk) < ROW_CHUNK:
+                    # В неполный блок ещё идут вставки
+                    return book
+            else:
+                chunk.discard(row & _ROW_MASK)
+            count = self._counts[index]
+            if not count:
+                self._release(index)
+            elif count < SPARSE_CHUNK_LIVE and type(chunk) is list:
+                self._chunks[index] = _SparseChunk.pack(chunk)
+        return book
+    
+    def rows(self, after: int = -1) -> Iterator[int]:
+        # Номера живых строк по возрастанию, начиная со следующей после after
+        start = after + 1
+        chunks = self._chunks
+        first = self._base
+        for index in range(max((max(start, 0) >> ROW_CHUNK_BITS) - first, 0), len(chunks)):
+            chunk = chunks[index]
+            if chunk is None:
+                continue
+            base = (index + first) << ROW_CHUNK_BITS
+            offset = max(start - base, 0)
+            if type(chunk) is list:
+                yield from compress(range(base + offset, base + len(chunk)), islice(chunk, offset, None))
+            else:
+                yield from chunk.rows(base, offset)
     
-    def add(self, book: Book) -> None:
+    def books(self) -> Iterator[Book]:
+        return chain.from_iterable(filter(None, chunk) for chunk in self._chunks if chunk is not None)
+    
+    def row_at(self, position: int) -> int:
+        # Номер строки по позиции среди живых: O(n / ROW_CHUNK + ROW_CHUNK)
+        if position < 0:
+            position += self._live
+        if not 0 <= position < self._live:
+            raise IndexError("Индекс вне диапазона")
+        for index, count in enumerate(self._counts):
+            if position < count:
+                chunk = self._chunks[index]
+                base = (index + self._base) << ROW_CHUNK_BITS
+                if type(chunk) is not list:
+                    return base + chunk.offsets[position]
+                return next(islice(compress(range(base, base + len(chunk)), chunk), position, None))
+            position -= count
+        raise IndexError("Индекс вне диапазона")
+    
+    @property
+    def allocated(self) -> int:
+        # Занятых ячеек строк: живые плюс удалённые в плотных блоках
+        return sum(len(chunk) for chunk in self._chunks if chunk is not None)
+    
+    def __getitem__(self, row: int) -> Optional[Book]:
+        index = (row >> ROW_CHUNK_BITS) - self._base
+        chunk = self._chunks[index] if index >= 0 else None
+        return chunk[row & _ROW_MASK] if chunk is not None else None
+    
+    def __len__(self) -> int:
+        return self._live
+    
+    def memory_usage(self) -> int:
+        return (sys.getsizeof(self._chunks) + sys.getsizeof(self._counts)
+                + sum(sys.getsizeof(chunk) for chunk in self._chunks if chunk is not None))
+    
+    def __repr__(self) -> str:
+        return f"RowStore(rows={self._next}, live={self._live}, allocated={self.allocated})"
+
+
+class BookCollection:
+    # Книги коллекции — живые строки её хранилища по возрастанию номера
+    # (= порядок добавления); номера строк служат стабильными курсорами пагинации
+
+    def __init__(self, store: Optional[RowStore] = None, index: Optional['IndexDict'] = None):
+        self.store = store if store is not None else RowStore()
+        # Проверка вхождения за O(1): по ISBN-индексу библиотеки над тем же
+        # хранилищем, а без него — по собственному счётчику isbn_key -> число книг
+        self.index = index
+        self._keys: Optional[Dict[IsbnKey, int]] = {} if index is None else None
+        self._shared = False
+        self._frozen = False
+    
+    def snapshot(self, store: Optional[RowStore] = None,
+                 index: Optional['IndexDict'] = None) -> 'BookCollection':
+        frozen = BookCollection.__new__(BookCollection)
+        frozen.store = store if store is not None else self.store.snapshot()
+        frozen.index = index
+        frozen._keys = self._keys
+        frozen._shared = True
+        frozen._frozen = True
+        self._shared = True
+        return frozen
+    
+    def _before_write(self) -> None:
+        if self._frozen:
+            raise TypeError("Снимок каталога доступен только для чтения")
+        if self._shared:
+            if self._keys is not None:
+                self._keys = dict(self._keys)
+            self._shared = False
+    
+    def _count(self, key: IsbnKey) -> None:
+        if self._keys is not None:
+            self._keys[key] = self._keys.get(key, 0) + 1
+    
+    def _uncount(self, key: IsbnKey) -> None:
+        if self._keys is None:
+            return
+        count = self._keys[key] - 1
+        if count:
+            self._keys[key] = count
+        else:
+            del self._keys[key]
+    
+    @property
+    def row_ids(self) -> Iterator[int]:
+        return self.store.rows()
+    
+    def add(self, book: Book) -> int:
         if not isinstance(book, Book):
             raise TypeError("Можно добавлять только объекты Book")
-        self._books.append(book)
+        self._before_write()
+        row = self.store.append(book)
+        self._count(book.isbn_key)
         logger.debug(f"Added book: {book}")
+        return row
+    
+    def _delete(self, row: int) -> Optional[Book]:
+        self._before_write()
+        book = self.store.delete(row)
+        if book is not None:
+            self._uncount(book.isbn_key)
+        return book
     
     def remove(self, isbn: str) -> bool:
-        for i, book in enumerate(self._books):
-            if book.isbn == isbn:
-                removed_book = self._books.pop(i)
+        if self.index is not None:
+            row = self.index.row_of(isbn)
+            if row is not None and self.remove_row(row) is not None:
+                return True
+            logger.warning(f"Book with ISBN {isbn} not found")
+            return False
+        key = isbn_key(isbn)
+        rows = self.store
+        if key not in self._keys:
+            logger.warning(f"Book with ISBN {isbn} not found")
+            return False
+        for row in rows.rows():
+            if rows[row].isbn_key == key:
+                removed_book = self._delete(row)
                 logger.debug(f"Removed book: {removed_book}")
                 return True
         logger.warning(f"Book with ISBN {isbn} not found")
         return False
     
+    def remove_row(self, row: int) -> Optional[Book]:
+        removed_book = self._delete(row)
+        if removed_book is not None:
+            logger.debug(f"Removed book: {removed_book}")
+        return removed_book
+    
     def remove_at_index(self, index: int) -> Optional[Book]:
-        if 0 <= index < len(self._books):
-            removed_book = self._books.pop(index)
+        if 0 <= index < len(self.store):
+            removed_book = self._delete(self.store.row_at(index))
             logger.debug(f"Removed book at index {index}: {removed_book}")
             return removed_book
         return None
     
+    def extend(self, books: List[Book]) -> List[int]:
+        for book in books:
+            if not isinstance(book, Book):
+                raise TypeError("Можно добавлять только объекты Book")
+        self._before_write()
+        append = self.store.append
+        rows = [append(book) for book in books]
+        for book in books:
+            self._count(book.isbn_key)
+        logger.debug(f"Added {len(books)} book(s)")
+        return rows
+    
+    def remove_many(self, rows: List[int]) -> int:
+        removed = 0
+        for row in set(rows):
+            if self._delete(row) is not None:
+                removed += 1
+        logger.debug(f"Removed {removed} book(s)")
+        return removed
+    
     def clear(self) -> None:
-        self._books.clear()
+        self._before_write()
+        for row in list(self.store.rows()):
+            self.store.delete(row)
+        if self._keys is not None:
+            self._keys = {}
         logger.debug("Collection cleared")
     
+    def page(self, page_size: int = 50, cursor: Optional[str] = None) -> Page:
+        return paginate_scan(self.store.rows, self.store.__getitem__, page_size, cursor)
+    
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self._keys) if self._keys is not None else 0
+    
     def __getitem__(self, key: Union[int, slice]) -> Union[Book, List[Book]]:
-        return self._books[key]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.store))
+            if step > 0:
+                return list(islice(self, start, stop, step))
+            return list(self)[key]
+        return self.store[self.store.row_at(key)]
     
-    def __iter__(self):
-        return iter(self._books)
+    def __iter__(self) -> Iterator[Book]:
+        return self.store.books()
     
     def __len__(self) -> int:
-        return len(self._books)
+        return len(self.store)
     
     def __contains__(self, item: Union[Book, str]) -> bool:
         if isinstance(item, Book):
-            return item in self._books
+            isbn = item.isbn
         elif isinstance(item, str):
             # Поиск по ISBN
-            return any(book.isbn == item for book in self._books)
-        return False
+            isbn = item
+        else:
+            return False
+        if self.index is not None:
+            # Строка могла быть удалена из коллекции мимо индекса
+            row = self.index.row_of(isbn)
+            return row is not None and self.store[row] is not None
+        key = item.isbn_key if isinstance(item, Book) else isbn_key(item)
+        return key in self._keys
+    
+    def __repr__(self) -> str:
+        return f"BookCollection(size={len(self.store)})"
+
+
+class BookView(Sequence):
+    # Живое представление результатов поиска только для чтения: создаётся
+    # за O(1), без копирования, книги берутся из хранилища по номерам строк.
+    # Хранится индекс и ключ, а не корзина: транзакция заменяет корзину,
+    # запись после снимка копирует её, поэтому корзина ищется при каждом обращении
+
+    __slots__ = ('_index', '_name', '_key')
+
+    def __init__(self, index: 'IndexDict', name: str, key):
+        self._index = index
+        self._name = name
+        self._key = key
+    
+    @property
+    def _rows(self) -> array:
+        return getattr(self._index, self._name).get(self._key, _NO_ROWS)
+    
+    def __getitem__(self, key: Union[int, slice]) -> Union[Book, List[Book]]:
+        store = self._index.store
+        if isinstance(key, slice):
+            return [store[row] for row in self._rows[key]]
+        return store[self._rows[key]]
+    
+    def __iter__(self) -> Iterator[Book]:
+        return map(self._index.store.__getitem__, self._rows)
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, item) -> bool:
+        return any(book == item for book in self)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (BookView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
     
     def __repr__(self) -> str:
-        return f"BookCollection(size={len(self._books)})"
+        return f"BookView(size={len(self._rows)})"
+
+
+_NO_ROWS = array('I')
+_ABSENT = object()
+
+
+class _SnapshotMap:
+    # Словарь индекса на момент снимка без копирования: живой словарь
+    # и журнал прежних значений ключей, изменённых после снимка.
+    # Писатель сохраняет значение в журнал до изменения живого словаря,
+    # поэтому читатель смотрит сначала словарь, затем журнал
+    
+    __slots__ = ('_live', '_undo', '_size')
+    
+    def __init__(self, live: dict):
+        self._live = live
+        self._undo: dict = {}
+        self._size = len(live)
+    
+    def preserve(self, key) -> None:
+        if key not in self._undo:
+            self._undo[key] = self._live.get(key, _ABSENT)
+    
+    def get(self, key, default=None):
+        value = self._live.get(key, _ABSENT)
+        value = self._undo.get(key, value)
+        return default if value is _ABSENT else value
+    
+    def __contains__(self, key) -> bool:
+        return self.get(key, _ABSENT) is not _ABSENT
+    
+    def items(self) -> List[tuple]:
+        # Словарь копируется раньше журнала (см. порядок записи выше)
+        live = list(self._live.items())
+        undo = dict(self._undo)
+        items = [(key, value) for key, value in live if key not in undo]
+        items.extend((key, value) for key, value in undo.items() if value is not _ABSENT)
+        return items
+    
+    def values(self) -> list:
+        return [value for _, value in self.items()]
+    
+    def __len__(self) -> int:
+        return self._size
 
 
 class IndexDict:
 
-    def __init__(self):
-        self._by_isbn: dict = {}      # ISBN -> Book
-        self._by_author: dict = {}    # Author -> [Books]
-        self._by_year: dict = {}      # Year -> [Books]
+    def __init__(self, store: Optional[RowStore] = None):
+        # Без общего хранилища индекс ведёт собственное
+        self._owns_store = store is None
+        self.store = store if store is not None else RowStore()
+        self._by_isbn: dict = {}      # каноническое написание ISBN -> номер строки
+        self._by_author: dict = {}    # Author -> array('I') номеров строк
+        self._by_year: dict = {}      # Year -> array('I') номеров строк
+        self._genre_counts: dict = {} # Genre -> число книг
+        # Копирование при записи без копии словарей: снимок читает живые
+        # словари через журнал (_SnapshotMap). Перед первым после снимка
+        # изменением ключа его значение попадает в журналы живых снимков,
+        # а корзина копируется; _changed — такие ключи по словарям
+        self._frozen = False
+        self._snapshots: Optional[weakref.WeakSet] = weakref.WeakSet()
+        self._changed: Optional[Dict[str, set]] = None
     
-    def add_book(self, book: Book) -> None:
+    def snapshot(self, store: Optional[RowStore] = None) -> 'IndexDict':
+        frozen = IndexDict.__new__(IndexDict)
+        frozen._owns_store = False
+        frozen.store = store if store is not None else self.store.snapshot()
+        frozen._by_isbn = _SnapshotMap(self._by_isbn)
+        frozen._by_author = _SnapshotMap(self._by_author)
+        frozen._by_year = _SnapshotMap(self._by_year)
+        frozen._genre_counts = _SnapshotMap(self._genre_counts)
+        frozen._frozen = True
+        frozen._snapshots = None
+        frozen._changed = None
+        self._snapshots.add(frozen)
+        # Все корзины снова разделяются: уже изменённые ключи есть в журналах
+        # старых снимков, но в новый они попадут при следующем изменении
+        self._changed = {'_by_isbn': set(), '_by_author': set(), '_by_year': set(),
+                         '_genre_counts': set()}
+        return frozen
+    
+    def _before_write(self) -> None:
+        if self._frozen:
+            raise TypeError("Снимок индекса доступен только для чтения")
+        if self._changed is not None and not self._snapshots:
+            # Все снимки освобождены: журналы больше не нужны
+            self._changed = None
+    
+    def _before_change(self, name: str, key) -> bool:
+        # True, если ключ впервые меняется после снимка
+        changed = self._changed
+        if changed is None or key in changed[name]:
+            return False
+        for frozen in self._snapshots:
+            getattr(frozen, name).preserve(key)
+        changed[name].add(key)
+        return True
+    
+    def _writable_bucket(self, name: str, index: dict, key) -> array:
+        bucket = index.get(key)
+        if self._before_change(name, key) and bucket is not None:
+            # Корзина ещё разделяется со снимком
+            bucket = index[key] = array('I', bucket)
+        elif bucket is None:
+            bucket = index[key] = array('I')
+        return bucket
+    
+    @staticmethod
+    def _discard_row(bucket: array, row: int) -> bool:
+        position = bisect.bisect_left(bucket, row)
+        if position < len(bucket) and bucket[position] == row:
+            del bucket[position]
+            return True
+        return False
+    
+    def _count_genre(self, genre: str, delta: int) -> None:
+        self._before_change('_genre_counts', genre)
+        count = self._genre_counts.get(genre, 0) + delta
+        if count:
+            self._genre_counts[genre] = count
+        else:
+            del self._genre_counts[genre]
+    
+    @staticmethod
+    def _isbn_spelling(book: Book) -> str:
+        # Обычно книга уже записана канонически, и ключом служит её же строка
+        spelling = canonical_isbn(book.isbn_key)
+        return book.isbn if spelling == book.isbn else spelling
+    
+    def _find_row(self, book: Book) -> Optional[int]:
+        row = self._by_isbn.get(self._isbn_spelling(book))
+        if row is not None and self.store[row] is book:
+            return row
+        # Дубликат ISBN: книга есть только в корзинах
+        for row in self._by_author.get(book.author, ()):
+            if self.store[row] is book:
+                return row
+        return None
+    
+    def add_book(self, book: Book, row: Optional[int] = None) -> int:
+        self._before_write()
+        if row is None:
+            row = self.store.append(book)
+        
         # Индекс по ISBN
-        self._by_isbn[book.isbn] = book
+        spelling = self._isbn_spelling(book)
+        self._before_change('_by_isbn', spelling)
+        self._by_isbn[spelling] = row
         
         # Индекс по автору
-        if book.author not in self._by_author:
-            self._by_author[book.author] = []
-        self._by_author[book.author].append(book)
+        self._writable_bucket('_by_author', self._by_author, book.author).append(row)
         
         # Индекс по году
-        if book.year not in self._by_year:
-            self._by_year[book.year] = []
-        self._by_year[book.year].append(book)
+        self._writable_bucket('_by_year', self._by_year, book.year).append(row)
+        
+        # Счётчик по жанру
+        self._count_genre(book.genre, 1)
         
         logger.debug(f"Indexed book: {book}")
+        return row
     
-    def remove_book(self, book: Book) -> bool:
+    def remove_book(self, book: Book, row: Optional[int] = None) -> bool:
+        if row is None:
+            row = self._find_row(book)
+            if row is None:
+                return False
+        self._before_write()
         removed = False
         
         # Удалить из ISBN индекса
-        if book.isbn in self._by_isbn:
-            del self._by_isbn[book.isbn]
+        spelling = self._isbn_spelling(book)
+        if self._by_isbn.get(spelling) == row:
+            self._before_change('_by_isbn', spelling)
+            del self._by_isbn[spelling]
             removed = True
         
-        # Удалить из автора индекса
+        # Удалить из автора индекса; книга учтена в счётчике жанра,
+        # только если её строка была в корзине автора
         if book.author in self._by_author:
-            if book in self._by_author[book.author]:
-                self._by_author[book.author].remove(book)
-                if not self._by_author[book.author]:
+            bucket = self._writable_bucket('_by_author', self._by_author, book.author)
+            if self._discard_row(bucket, row):
+                self._count_genre(book.genre, -1)
+                if not bucket:
                     del self._by_author[book.author]
         
         # Удалить из года индекса
         if book.year in self._by_year:
-            if book in self._by_year[book.year]:
-                self._by_year[book.year].remove(book)
-                if not self._by_year[book.year]:
-                    del self._by_year[book.year]
+            bucket = self._writable_bucket('_by_year', self._by_year, book.year)
+            if self._discard_row(bucket, row) and not bucket:
+                del self._by_year[book.year]
         
+        if self._owns_store:
+            self.store.delete(row)
         return removed
     
+    def add_many(self, books: List[Book], rows: List[int]) -> None:
+        self._before_write()
+        spelling_of = self._isbn_spelling
+        for book, row in zip(books, rows):
+            spelling = spelling_of(book)
+            self._before_change('_by_isbn', spelling)
+            self._by_isbn[spelling] = row
+            self._writable_bucket('_by_author', self._by_author, book.author).append(row)
+            self._writable_bucket('_by_year', self._by_year, book.year).append(row)
+            self._count_genre(book.genre, 1)
+        logger.debug(f"Indexed {len(books)} book(s)")
+    
+    def remove_many(self, books: List[Book], rows: List[int]) -> None:
+        self._before_write()
+        by_author: dict = {}
+        by_year: dict = {}
+        for book, row in zip(books, rows):
+            spelling = self._isbn_spelling(book)
+            if self._by_isbn.get(spelling) == row:
+                self._before_change('_by_isbn', spelling)
+                del self._by_isbn[spelling]
+            by_author.setdefault(book.author, set()).add(row)
+            by_year.setdefault(book.year, set()).add(row)
+            self._count_genre(book.genre, -1)
+        # Каждая затронутая корзина фильтруется один раз
+        for name, index, grouped in (('_by_author', self._by_author, by_author),
+                                     ('_by_year', self._by_year, by_year)):
+            for key, doomed in grouped.items():
+                bucket = index.get(key)
+                if bucket is None:
+                    continue
+                # Корзина заменяется новой, поэтому копировать её не нужно
+                self._before_change(name, key)
+                kept = array('I', [row for row in bucket if row not in doomed])
+                if kept:
+                    index[key] = kept
+                else:
+                    del index[key]
+    
+    def row_of(self, isbn: str) -> Optional[int]:
+        # Точное совпадение строки не требует разбора ISBN;
+        # при промахе запрос приводится к каноническому написанию
+        row = self._by_isbn.get(isbn)
+        if row is None:
+            spelling = canonical_isbn(isbn_key(isbn))
+            if spelling != isbn:
+                row = self._by_isbn.get(spelling)
+        return row
+    
+    def exact_row(self, spelling: str) -> Optional[int]:
+        # Только каноническое написание, без разбора ISBN
+        return self._by_isbn.get(spelling)
+    
+    def author_rows(self, author: str) -> array:
+        return self._by_author.get(author, _NO_ROWS)
+    
+    def year_rows(self, year: int) -> array:
+        return self._by_year.get(year, _NO_ROWS)
+    
+    def author_counts(self) -> Dict[str, int]:
+        return {author: len(rows) for author, rows in self._by_author.items()}
+    
+    def year_counts(self) -> Dict[int, int]:
+        return {year: len(rows) for year, rows in self._by_year.items()}
+    
+    def genre_counts(self) -> Dict[str, int]:
+        return dict(self._genre_counts.items())
+    
+    def genre_count(self, genre: str) -> int:
+        return self._genre_counts.get(genre, 0)
+    
     def get_by_isbn(self, isbn: str) -> Optional[Book]:
-        return self._by_isbn.get(isbn)
+        row = self._by_isbn.get(isbn)
+        if row is None:
+            row = self.row_of(isbn)
+        return self.store[row] if row is not None else None
     
-    def get_by_author(self, author: str) -> List[Book]:
-        return self._by_author.get(author, [])
+    def get_by_author(self, author: str) -> BookView:
+        return BookView(self, '_by_author', author)
     
-    def get_by_year(self, year: int) -> List[Book]:
-        return self._by_year.get(year, [])
+    def get_by_year(self, year: int) -> BookView:
+        return BookView(self, '_by_year', year)
+    
+    def iter_by_author(self, author: str) -> Iterator[Book]:
+        return map(self.store.__getitem__, self._by_author.get(author, ()))
+    
+    def iter_by_year(self, year: int) -> Iterator[Book]:
+        return map(self.store.__getitem__, self._by_year.get(year, ()))
+    
+    # Пакетные поиски: один проход по ключам, методы словарей и хранилища
+    # связываются один раз на весь пакет; повторные ключи схлопываются
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, Optional[Book]]:
+        lookup = self._by_isbn.get
+        row_of = self.row_of
+        store = self.store
+        results = {}
+        for isbn in isbns:
+            row = lookup(isbn)
+            if row is None:
+                row = row_of(isbn)
+            results[isbn] = store[row] if row is not None else None
+        return results
+    
+    def get_many_by_author(self, authors: Iterable[str]) -> Dict[str, BookView]:
+        return self._views_of('_by_author', authors)
+    
+    def get_many_by_year(self, years: Iterable[int]) -> Dict[int, BookView]:
+        return self._views_of('_by_year', years)
+    
+    def _views_of(self, name: str, keys: Iterable) -> dict:
+        return {key: BookView(self, name, key) for key in keys}
+    
+    def memory_usage(self) -> dict:
+        def buckets_size(index: dict) -> int:
+            return sys.getsizeof(index) + sum(sys.getsizeof(bucket) for bucket in index.values())
+        
+        # Ключи ISBN обычно разделяются с Book.isbn, учитываются только номера строк
+        return {
+            'isbn_index': sys.getsizeof(self._by_isbn)
+                          + sum(sys.getsizeof(row) for row in self._by_isbn.values()),
+            'author_index': buckets_size(self._by_author),
+            'year_index': buckets_size(self._by_year),
+            'genre_counts': sys.getsizeof(self._genre_counts),
+        }
     
     def __getitem__(self, key: str):
-        return self._by_isbn.get(key)
+        return self.get_by_isbn(key)
     
     def __contains__(self, key: str) -> bool:
-        return key in self._by_isbn
+        return self.row_of(key) is not None
     
     def __len__(self) -> int:
         return len(self._by_isbn)
@@ -151,61 +830,125 @@ class IndexDict:
     def __repr__(self) -> str:
         return (f"IndexDict(by_isbn={len(self._by_isbn)}, "
                 f"by_author={len(self._by_author)}, "
-                f"by_year={len(self._by_year)})")
+                f"by_year={len(self._by_year)}, "
+                f"genres={len(self._genre_counts)})")
 
 
-class Library:
-    
-    def __init__(self, name: str = "Main Library"):
-        self.name = name
-        self.books = BookCollection()
-        self.indexes = IndexDict()
-        logger.info(f"Library '{name}' initialized")
-    
-    def add_book(self, book: Book) -> None:
-        self.books.add(book)
-        self.indexes.add_book(book)
-        logger.info(f"Book added to library: {book}")
-    
-    def remove_book(self, isbn: str) -> bool:
-        # Найти книгу
-        book = self.indexes.get_by_isbn(isbn)
-        if book:
-            self.books.remove(isbn)
-            self.indexes.remove_book(book)
-            logger.info(f"Book removed from library: {book}")
-            return True
-        logger.warning(f"Book with ISBN {isbn} not found in library")
-        return False
+class CatalogReader:
+    # Операции чтения, общие для Library и её снимков;
+    # наследник предоставляет атрибуты books и indexes
     
     def search_by_isbn(self, isbn: str) -> Optional[Book]:
         return self.indexes.get_by_isbn(isbn)
     
-    def search_by_author(self, author: str) -> List[Book]:
+    def search_by_author(self, author: str) -> BookView:
         return self.indexes.get_by_author(author)
     
-    def search_by_year(self, year: int) -> List[Book]:
+    def search_by_year(self, year: int) -> BookView:
         return self.indexes.get_by_year(year)
     
+    # Пакетные версии: {ключ: результат} за один вызов
+    def search_many_isbn(self, isbns: Iterable[str]) -> Dict[str, Optional[Book]]:
+        return self.indexes.get_many_by_isbn(isbns)
+    
+    def search_many_authors(self, authors: Iterable[str]) -> Dict[str, BookView]:
+        return self.indexes.get_many_by_author(authors)
+    
+    def search_many_years(self, years: Iterable[int]) -> Dict[int, BookView]:
+        return self.indexes.get_many_by_year(years)
+    
+    # Ленивые итераторы для потоковой обработки результатов
+    def iter_by_author(self, author: str) -> Iterator[Book]:
+        return self.indexes.iter_by_author(author)
+    
+    def iter_by_year(self, year: int) -> Iterator[Book]:
+        return self.indexes.iter_by_year(year)
+    
+    def iter_by_genre(self, genre: str) -> Iterator[Book]:
+        # Число книг жанра известно из счётчика: просмотр останавливается
+        # на последней из них, неизвестный жанр не просматривается вовсе
+        count = self.indexes.genre_count(genre)
+        if not count:
+            return iter(())
+        return islice((book for book in self.books if book.genre == genre), count)
+    
     def search_by_genre(self, genre: str) -> List[Book]:
-        results = []
-        for book in self.books:
-            if book.genre == genre:
-                results.append(book)
-        return results
+        return list(self.iter_by_genre(genre))
     
     def get_all_books(self) -> BookCollection:
         return self.books
     
-    def get_statistics(self) -> dict:
-        authors = set()
-        years = set()
-        genres = set()
+    # Курсорная пагинация: курсор указывает на порядковый номер вставки
+    # последней выданной книги, поэтому удаления и добавления между
+    # запросами страниц не приводят к дублям и пропускам
+    def page_all_books(self, page_size: int = 50, cursor: Optional[str] = None) -> Page:
+        return self.books.page(page_size, cursor)
+    
+    def page_by_author(self, author: str, page_size: int = 50,
+                       cursor: Optional[str] = None) -> Page:
+        return paginate_rows(self.indexes.author_rows(author), self.books.store.__getitem__,
+                             page_size, cursor)
+    
+    def page_by_year(self, year: int, page_size: int = 50,
+                     cursor: Optional[str] = None) -> Page:
+        return paginate_rows(self.indexes.year_rows(year), self.books.store.__getitem__,
+                             page_size, cursor)
+    
+    def page_by_genre(self, genre: str, page_size: int = 50,
+                      cursor: Optional[str] = None) -> Page:
+        return paginate_scan(self.books.store.rows, self.books.store.__getitem__, page_size, cursor,
+                             lambda book: book.genre == genre)
+    
+    def aggregate(self, group_by: Union[str, Tuple[str, ...]], metric: str = "count") -> dict:
+        fields = (group_by,) if isinstance(group_by, str) else tuple(group_by)
+        if not fields:
+            raise ValueError("Нужно указать хотя бы одно поле группировки")
+        for field in fields:
+            if field not in GROUP_FIELDS:
+                raise ValueError(f"Нельзя группировать по полю '{field}' "
+                                 f"(допустимо: {', '.join(GROUP_FIELDS)})")
+        if metric not in AGGREGATE_METRICS:
+            raise ValueError(f"Неизвестная метрика '{metric}' "
+                             f"(допустимо: {', '.join(AGGREGATE_METRICS)})")
         
-        for book in self.books:
-            authors.add(book.author)
-            years.add(book.year)
-            genres.add(book.genre)
+        if len(fields) == 1 and fields[0] in INDEXED_GROUPS:
+            # Размеры корзин индекса: O(число групп)
+            field = fields[0]
+            if field == "author":
+                counts = self.indexes.author_counts()
+            elif field == "genre":
+                counts = self.indexes.genre_counts()
+            else:
+                counts = self.indexes.year_counts()
+                if field == "decade":
+                    decades: Dict[int, int] = {}
+                    for year, count in counts.items():
+                        decade = year // 10 * 10
+                        decades[decade] = decades.get(decade, 0) + count
+                    counts = decades
+        else:
+            # Неиндексированное поле или составной ключ: один проход по книгам
+            counts = {}
+            if len(fields) == 1:
+                extract = GROUP_FIELDS[fields[0]]
+            else:
+                extractors = [GROUP_FIELDS[field] for field in fields]
+                extract = lambda book: tuple([get(book) for get in extractors])
+            for book in self.books:
+                key = extract(book)
+                counts[key] = counts.get(key, 0) + 1
+        
+        result = dict(sorted(counts.items()))
+        if metric == "share":
+            total = len(self.books)
+            result = {key: count / total for key, count in result.items()}
+        return result
+    
+    def get_statistics(self) -> dict:
+        # Ключи индексов и счётчиков: O(число групп), без обхода книг
+        authors = self.indexes.author_counts()
+        years = self.indexes.year_counts()
+        genres = self.indexes.genre_counts()
         
         return {
             'total_books': len(self.books),
@@ -213,10 +956,381 @@ class Library:
             'year_range': (min(years), max(years)) if years else None,
             'genres': list(genres)
         }
+
+
+class Library(CatalogReader):
+    
+    def __init__(self, name: str = "Main Library"):
+        self.name = name
+        # Книги хранятся один раз; коллекция и индексы держат номера строк,
+        # вхождение в коллекцию проверяется по ISBN-индексу
+        store = RowStore()
+        self.indexes = IndexDict(store)
+        self.books = BookCollection(store, self.indexes)
+        # Триграммные индексы для нечёткого поиска
+        self.fuzzy_authors = TrigramIndex()
+        self.fuzzy_titles = TrigramIndex()
+        # Префиксный индекс для подсказок строится enable_completions
+        # и только после этого обновляется вместе с каталогом
+        self.completions: Optional[PrefixIndex] = None
+        # Подписчики на изменения: callback(action, book)
+        self._listeners: List[Callable[[str, Book], None]] = []
+        self._transaction: Optional['Transaction'] = None
+        self.change_feed: Optional[ChangeFeed] = None
+        # Выдачи, продления и очереди резервирования
+        self.circulation = Circulation(self)
+        # Необязательный фильтр Блума перед поиском по ISBN
+        self.isbn_filter: Optional[CountingBloomFilter] = None
+        # Упорядоченные индексы строятся при первом ordered_by по полю
+        self._ordered: Dict[str, SortedIndex] = {}
+        logger.info(f"Library '{name}' initialized")
+    
+    def add_listener(self, listener: Callable[[str, Book], None]) -> None:
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, Book], None]) -> bool:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+            return True
+        return False
+    
+    def enable_change_feed(self, retention: int = DEFAULT_RETENTION) -> ChangeFeed:
+        # Журнал изменений с номерами для инкрементальных потребителей
+        if self.change_feed is None:
+            self.change_feed = ChangeFeed(self, retention)
+        return self.change_feed
+    
+    def enable_completions(self) -> PrefixIndex:
+        # Построение индекса — проход по всему каталогу: его выгодно
+        # вызывать один раз после пакетной загрузки, а не при первом suggest
+        if self.completions is None:
+            self.completions = PrefixIndex()
+            for book in self.books:
+                self.completions.add(book.author)
+                self.completions.add(book.title)
+            logger.info(f"Autocomplete index built ({len(self.completions)} terms)")
+        return self.completions
+    
+    def enable_isbn_filter(self, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+                           capacity: Optional[int] = None) -> CountingBloomFilter:
+        # Промахи по ISBN отсекаются фильтром без обращения к индексу
+        if self.isbn_filter is None:
+            capacity = max(capacity or 2 * len(self.books), DEFAULT_CAPACITY)
+            self.isbn_filter = CountingBloomFilter(capacity, false_positive_rate)
+            for book in self.books:
+                self.isbn_filter.add(canonical_isbn(book.isbn_key))
+        return self.isbn_filter
+    
+    def _grow_isbn_filter(self) -> None:
+        isbn_filter = self.isbn_filter
+        if isbn_filter.overloaded:
+            # Фильтр переполнен: вероятность ложных срабатываний растёт
+            capacity = max(2 * isbn_filter.capacity, 2 * len(isbn_filter))
+            isbn_filter.rebuild((canonical_isbn(b.isbn_key) for b in self.books), capacity)
+            logger.info(f"ISBN filter resized to capacity {isbn_filter.capacity}")
+    
+    def search_by_isbn(self, isbn: str) -> Optional[Book]:
+        if self._transaction is not None:
+            # Внутри транзакции поиск по ISBN видит её неподтверждённые изменения
+            return self._transaction.search_by_isbn(isbn)
+        if self.isbn_filter is None:
+            return self.indexes.get_by_isbn(isbn)
+        row = self._filtered_row(isbn)
+        return self.books.store[row] if row is not None else None
+    
+    def _filtered_row(self, isbn: str) -> Optional[int]:
+        # Фильтр и индекс хранят каноническое написание ISBN. Запрос обычно
+        # уже записан так, и попадание не требует разбора строки; иначе
+        # написание приводится к каноническому один раз и проверяется снова
+        isbn_filter = self.isbn_filter
+        exact_row = self.indexes.exact_row
+        if isbn_filter.might_contain(isbn):
+            row = exact_row(isbn)
+            if row is not None:
+                return row
+            spelling = canonical_isbn(isbn_key(isbn))
+            if spelling == isbn:
+                isbn_filter.false_positives += 1
+                return None
+        else:
+            spelling = canonical_isbn(isbn_key(isbn))
+            if spelling == isbn:
+                return None
+        if not isbn_filter.might_contain(spelling):
+            return None
+        row = exact_row(spelling)
+        if row is None:
+            isbn_filter.false_positives += 1
+        return row
+    
+    def search_many_isbn(self, isbns: Iterable[str]) -> Dict[str, Optional[Book]]:
+        transaction = self._transaction
+        if transaction is not None:
+            return {isbn: transaction.search_by_isbn(isbn) for isbn in isbns}
+        if self.isbn_filter is None:
+            return self.indexes.get_many_by_isbn(isbns)
+        # Индекс проверяется только для ключей, прошедших фильтр
+        filtered_row = self._filtered_row
+        store = self.books.store
+        results: Dict[str, Optional[Book]] = {}
+        for isbn in isbns:
+            row = filtered_row(isbn)
+            results[isbn] = store[row] if row is not None else None
+        return results
+    
+    def _notify(self, action: str, book: Book) -> None:
+        for listener in self._listeners:
+            listener(action, book)
+    
+    def add_book(self, book: Book) -> None:
+        if self._transaction is not None:
+            self._transaction.add_book(book)
+            return
+        row = self.books.add(book)
+        self.indexes.add_book(book, row)
+        if self.isbn_filter is not None:
+            self.isbn_filter.add(canonical_isbn(book.isbn_key))
+            self._grow_isbn_filter()
+        for field, index in self._ordered.items():
+            index.add((ORDER_KEYS[field](getattr(book, field)), row))
+        self.fuzzy_authors.add(book.author, row)
+        self.fuzzy_titles.add(book.title, row)
+        if self.completions is not None:
+            self.completions.add(book.author)
+            self.completions.add(book.title)
+        self._notify(ACTION_ADD, book)
+        logger.info(f"Book added to library: {book}")
+    
+    def transaction(self) -> 'Transaction':
+        # Поиск по ISBN в открытой транзакции учитывает её изменения; выборки
+        # по автору, году и жанру, страницы и агрегаты видят только
+        # подтверждённый каталог до commit
+        if self._transaction is not None:
+            raise RuntimeError("Транзакция уже открыта")
+        self._transaction = Transaction(self)
+        return self._transaction
+    
+    def _apply_batch(self, removed_rows: List[int], added: List[Book]) -> None:
+        # Слитое обновление коллекции и индексов за один проход
+        removed = [self.books.store[row] for row in removed_rows]
+        self.books.remove_many(removed_rows)
+        self.indexes.remove_many(removed, removed_rows)
+        added_rows = self.books.extend(added)
+        self.indexes.add_many(added, added_rows)
+        if self.isbn_filter is not None:
+            for book in removed:
+                self.isbn_filter.remove(canonical_isbn(book.isbn_key))
+            for book in added:
+                self.isbn_filter.add(canonical_isbn(book.isbn_key))
+            self._grow_isbn_filter()
+        for field, index in self._ordered.items():
+            order_key = ORDER_KEYS[field]
+            for book, row in zip(removed, removed_rows):
+                index.remove((order_key(getattr(book, field)), row))
+            for book, row in zip(added, added_rows):
+                index.add((order_key(getattr(book, field)), row))
+        completions = self.completions
+        for book, row in zip(removed, removed_rows):
+            self.fuzzy_authors.remove(book.author, row)
+            self.fuzzy_titles.remove(book.title, row)
+            if completions is not None:
+                completions.remove(book.author)
+                completions.remove(book.title)
+        for book, row in zip(added, added_rows):
+            self.fuzzy_authors.add(book.author, row)
+            self.fuzzy_titles.add(book.title, row)
+            if completions is not None:
+                completions.add(book.author)
+                completions.add(book.title)
+        for book in removed:
+            self.circulation.forget(book.isbn_key)
+            self._notify(ACTION_REMOVE, book)
+        for book in added:
+            self._notify(ACTION_ADD, book)
+        if self.change_feed is not None:
+            # Транзакция доставляется подписчикам одной порцией
+            self.change_feed.flush()
+        logger.info(f"Batch applied to library: -{len(removed)} / +{len(added)} book(s)")
+    
+    def snapshot(self) -> 'LibrarySnapshot':
+        # O(1): данные разделяются, копия делается при следующей записи
+        store = self.books.store.snapshot()
+        indexes = self.indexes.snapshot(store)
+        return LibrarySnapshot(self.name, self.books.snapshot(store, indexes), indexes)
+    
+    def remove_book(self, isbn: str) -> bool:
+        if self._transaction is not None:
+            return self._transaction.remove_book(isbn)
+        # Найти книгу
+        row = self.indexes.row_of(isbn)
+        if row is not None:
+            book = self.books.remove_row(row)
+            self.indexes.remove_book(book, row)
+            if self.isbn_filter is not None:
+                self.isbn_filter.remove(canonical_isbn(book.isbn_key))
+            for field, index in self._ordered.items():
+                index.remove((ORDER_KEYS[field](getattr(book, field)), row))
+            self.fuzzy_authors.remove(book.author, row)
+            self.fuzzy_titles.remove(book.title, row)
+            if self.completions is not None:
+                self.completions.remove(book.author)
+                self.completions.remove(book.title)
+            self.circulation.forget(book.isbn_key)
+            self._notify(ACTION_REMOVE, book)
+            logger.info(f"Book removed from library: {book}")
+            return True
+        logger.warning(f"Book with ISBN {isbn} not found in library")
+        return False
+    
+    def ordered_by(self, field: str, reverse: bool = False, start=None) -> Iterator[Book]:
+        # Ленивый обход в порядке поля; start — значение поля, с которого начать
+        order_key = ORDER_KEYS.get(field)
+        if order_key is None:
+            raise ValueError(f"Нельзя упорядочить по полю '{field}' "
+                             f"(допустимо: {', '.join(ORDER_KEYS)})")
+        index = self._ordered.get(field)
+        if index is None:
+            store = self.books.store
+            index = SortedIndex((order_key(getattr(store[row], field)), row)
+                                for row in self.books.row_ids)
+            self._ordered[field] = index
+            logger.info(f"Ordered index by '{field}' built ({len(index)} books)")
+        start_key = None if start is None else order_key(start)
+        store = self.books.store
+        return (store[row] for _, row in index.irange(start_key, reverse))
+    
+    # Нечёткий поиск: устойчив к опечаткам и порядку слов,
+    # результаты упорядочены по убыванию сходства
+    def fuzzy_search_author(self, query: str, limit: int = 10,
+                            min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Book]:
+        rows = self.fuzzy_authors.search(query, limit, min_similarity)
+        return [self.books.store[row] for row in rows]
+    
+    def fuzzy_search_title(self, query: str, limit: int = 10,
+                           min_similarity: float = DEFAULT_MIN_SIMILARITY) -> List[Book]:
+        rows = self.fuzzy_titles.search(query, limit, min_similarity)
+        return [self.books.store[row] for row in rows]
+    
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        # Автодополнение по названиям и авторам: (текст, число книг)
+        if self.completions is None:
+            raise ValueError("Подсказки не включены: вызовите enable_completions()")
+        return self.completions.suggest(prefix, limit)
+    
+    def memory_usage(self) -> dict:
+        # Приблизительный размер структур в байтах (sys.getsizeof)
+        books = sum(sys.getsizeof(book) + sys.getsizeof(book.__dict__) for book in self.books)
+        usage = {
+            'books': books,
+            'row_store': self.books.store.memory_usage(),
+        }
+        usage.update(self.indexes.memory_usage())
+        usage['fuzzy_index'] = self.fuzzy_authors.memory_usage() + self.fuzzy_titles.memory_usage()
+        if self.completions is not None:
+            usage['autocomplete'] = self.completions.memory_usage()
+        if self.isbn_filter is not None:
+            usage['isbn_filter'] = self.isbn_filter.memory_usage()
+        if self._ordered:
+            usage['ordered_index'] = sum(index.memory_usage() for index in self._ordered.values())
+        usage['total'] = sum(usage.values())
+        return usage
     
     def __repr__(self) -> str:
-<<<<<<< HEAD:lab-4/src/models.py
         return f"Library(name='{self.name}', books={len(self.books)}, indexes={self.indexes})"
-=======
-        return f"Library(name='{self.name}', books={len(self.books)}, indexes={self.indexes})"
->>>>>>> 5e75f67ec578f1a639f2b4e96089bb1b0c554ffa:src/models.py
+
+
+class Transaction:
+    # Изменения копятся в буфере и применяются одним слитым обновлением
+    # при commit; при исключении внутри with буфер отбрасывается
+    
+    def __init__(self, library: Library):
+        self.library = library
+        self._added: dict = {}          # id(Book) -> Book, в порядке добавления
+        self._added_by_key: dict = {}   # isbn_key -> [Book]
+        self._removed: dict = {}        # isbn_key -> номер строки существующей книги
+        self.active = True
+    
+    def _check_active(self) -> None:
+        if not self.active:
+            raise RuntimeError("Транзакция уже завершена")
+    
+    def add_book(self, book: Book) -> None:
+        self._check_active()
+        if not isinstance(book, Book):
+            raise TypeError("Можно добавлять только объекты Book")
+        self._added[id(book)] = book
+        self._added_by_key.setdefault(book.isbn_key, []).append(book)
+    
+    def remove_book(self, isbn: str) -> bool:
+        self._check_active()
+        key = isbn_key(isbn)
+        pending = self._added_by_key.get(key)
+        if pending:
+            # Книга добавлена в этой же транзакции: просто не добавлять её
+            book = pending.pop()
+            if not pending:
+                del self._added_by_key[key]
+            del self._added[id(book)]
+            return True
+        if key in self._removed:
+            return False
+        row = self.library.indexes.row_of(isbn)
+        if row is None:
+            return False
+        self._removed[key] = row
+        return True
+    
+    def search_by_isbn(self, isbn: str) -> Optional[Book]:
+        key = isbn_key(isbn)
+        pending = self._added_by_key.get(key)
+        if pending:
+            return pending[-1]
+        if key in self._removed:
+            return None
+        return self.library.indexes.get_by_isbn(isbn)
+    
+    def commit(self) -> None:
+        self._check_active()
+        self.active = False
+        self.library._transaction = None
+        self.library._apply_batch(list(self._removed.values()), list(self._added.values()))
+    
+    def rollback(self) -> None:
+        self._check_active()
+        self.active = False
+        self.library._transaction = None
+        logger.info(f"Transaction rolled back: {len(self)} pending change(s) discarded")
+    
+    def __len__(self) -> int:
+        return len(self._added) + len(self._removed)
+    
+    def __enter__(self) -> 'Transaction':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if not self.active:
+            return
+        if exc_type is not None:
+            self.rollback()
+        else:
+            self.commit()
+    
+    def __repr__(self) -> str:
+        return f"Transaction(added={len(self._added)}, removed={len(self._removed)}, active={self.active})"
+
+
+class LibrarySnapshot(CatalogReader):
+    
+    def __init__(self, name: str, books: BookCollection, indexes: IndexDict):
+        self.name = name
+        self.books = books
+        self.indexes = indexes
+    
+    def __iter__(self) -> Iterator[Book]:
+        return iter(self.books)
+    
+    def __len__(self) -> int:
+        return len(self.books)
+    
+    def __repr__(self) -> str:
+        return f"LibrarySnapshot(name='{self.name}', books={len(self.books)})"
@@ -0,0 +1,115 @@
+import bisect
+import sys
+from typing import Iterable, Iterator, List
+
+DEFAULT_LOAD = 500
+
+_INFINITY = float("inf")
+
+
+class SortedIndex:
+    # Блочный отсортированный список (как SortedList): элементы лежат
+    # в блоках не длиннее 2·load, для каждого блока хранится максимум.
+    # Поиск блока — бинарный, вставка внутри блока — сдвиг не более 2·load
+    # элементов; элементы — кортежи (ключ сортировки, номер строки)
+
+    def __init__(self, items: Iterable[tuple] = (), load: int = DEFAULT_LOAD):
+        if load < 2:
+            raise ValueError("load должен быть не меньше 2")
+        self._load = load
+        ordered = sorted(items)
+        self._blocks: List[list] = [ordered[i:i + load] for i in range(0, len(ordered), load)]
+        self._maxes: list = [block[-1] for block in self._blocks]
+        self._len = len(ordered)
+
+    def add(self, item: tuple) -> None:
+        blocks, maxes = self._blocks, self._maxes
+        self._len += 1
+        if not blocks:
+            blocks.append([item])
+            maxes.append(item)
+            return
+        i = bisect.bisect_left(maxes, item)
+        if i == len(maxes):
+            # Больше всех: в конец последнего блока
+            i -= 1
+            block = blocks[i]
+            block.append(item)
+            maxes[i] = item
+        else:
+            block = blocks[i]
+            bisect.insort(block, item)
+        if len(block) > 2 * self._load:
+            # Разделить переполненный блок пополам
+            tail = block[self._load:]
+            del block[self._load:]
+            blocks.insert(i + 1, tail)
+            maxes[i] = block[-1]
+            maxes.insert(i + 1, tail[-1])
+
+    def remove(self, item: tuple) -> bool:
+        blocks, maxes = self._blocks, self._maxes
+        i = bisect.bisect_left(maxes, item)
+        if i == len(maxes):
+            return False
+        block = blocks[i]
+        j = bisect.bisect_left(block, item)
+        if j == len(block) or block[j] != item:
+            return False
+        del block[j]
+        self._len -= 1
+        if not block:
+            del blocks[i]
+            del maxes[i]
+        elif j == len(block):
+            maxes[i] = block[-1]
+        return True
+
+    def irange(self, start=None, reverse: bool = False) -> Iterator[tuple]:
+        # Ленивый обход от ключа start (включительно); первые k элементов — O(k)
+        blocks, maxes = self._blocks, self._maxes
+        if not blocks:
+            return
+        if not reverse:
+            if start is None:
+                i, j = 0, 0
+            else:
+                bound = (start,)
+                i = bisect.bisect_left(maxes, bound)
+                if i == len(maxes):
+                    return
+                j = bisect.bisect_left(blocks[i], bound)
+            while i < len(blocks):
+                yield from blocks[i][j:]
+                i += 1
+                j = 0
+        else:
+            if start is None:
+                i, j = len(blocks) - 1, len(blocks[-1])
+            else:
+                bound = (start, _INFINITY)
+                i = bisect.bisect_left(maxes, bound)
+                if i == len(maxes):
+                    i, j = len(blocks) - 1, len(blocks[-1])
+                else:
+                    j = bisect.bisect_right(blocks[i], bound)
+            while i >= 0:
+                yield from reversed(blocks[i][:j])
+                i -= 1
+                if i >= 0:
+                    j = len(blocks[i])
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._blocks) + sys.getsizeof(self._maxes)
+        size += sum(sys.getsizeof(block) for block in self._blocks)
+        size += sum(sys.getsizeof(item) for block in self._blocks for item in block)
+        return size
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self.irange()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"SortedIndex(size={self._len}, blocks={len(self._blocks)})"
@@ -0,0 +1,94 @@
+import base64
+import bisect
+import struct
+from typing import Callable, Iterable, List, Optional, Sequence
+
+_CURSOR = struct.Struct("<BQ")
+_CURSOR_VERSION = 1
+
+
+class Page:
+
+    __slots__ = ('items', 'next_cursor')
+
+    def __init__(self, items: list, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f"Page(size={len(self.items)}, has_more={self.has_more})"
+
+
+def encode_cursor(seq: int) -> str:
+    raw = _CURSOR.pack(_CURSOR_VERSION, seq)
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    # Курсор хранит порядковый номер последнего выданного элемента
+    if cursor is None:
+        return -1
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, seq = _CURSOR.unpack(base64.urlsafe_b64decode(padded))
+    except (ValueError, struct.error, TypeError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor!r}") from e
+    if version != _CURSOR_VERSION:
+        raise ValueError(f"Некорректный курсор: {cursor!r}")
+    return seq
+
+
+def check_page_size(page_size: int) -> None:
+    if not isinstance(page_size, int) or page_size <= 0:
+        raise ValueError("page_size должен быть положительным целым числом")
+
+
+def paginate_rows(rows: Sequence[int], resolve: Callable[[int], object], page_size: int,
+                  cursor: Optional[str] = None) -> Page:
+    # rows — возрастающие номера строк; курсор хранит номер последней выданной строки
+    check_page_size(page_size)
+    start = bisect.bisect_right(rows, decode_cursor(cursor))
+    end = start + page_size
+    chunk = rows[start:end]
+    items = [resolve(row) for row in chunk]
+    if end < len(rows):
+        return Page(items, encode_cursor(chunk[-1]))
+    return Page(items, None)
+
+
+def paginate_scan(scan: Callable[[int], Iterable[int]], resolve: Callable[[int], object],
+                  page_size: int, cursor: Optional[str] = None,
+                  predicate: Optional[Callable] = None) -> Page:
+    # scan(after) — возрастающие номера строк после after; страница набирается
+    # просмотром от позиции курсора, predicate отбирает книги неиндексированных полей
+    check_page_size(page_size)
+    items: List = []
+    last_row = None
+    for row in scan(decode_cursor(cursor)):
+        item = resolve(row)
+        if predicate is None or predicate(item):
+            if len(items) == page_size:
+                return Page(items, encode_cursor(last_row))
+            items.append(item)
+            last_row = row
+    return Page(items, None)
+
+
+def iter_pages(fetch: Callable[[Optional[str]], Page]) -> Iterable[Page]:
+    cursor = None
+    while True:
+        page = fetch(cursor)
+        yield page
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
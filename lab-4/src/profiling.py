@@ -0,0 +1,110 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cpu", "memory", "both")
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+
+def profile_call(func: Callable, mode: str, output_dir: str = ".",
+                 prefix: str = "profile", **kwargs) -> List[str]:
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Неизвестный режим профилирования: {mode}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, prefix)
+    use_cpu = mode in ("cpu", "both")
+    use_memory = mode in ("memory", "both")
+
+    profiler = cProfile.Profile() if use_cpu else None
+    start_snapshot = None
+
+    if use_memory:
+        tracemalloc.start()
+        start_snapshot = tracemalloc.take_snapshot()
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        func(**kwargs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        end_snapshot = None
+        peak = 0
+        if use_memory:
+            end_snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    written = []
+    if profiler is not None:
+        written.extend(_write_cpu_report(profiler, base))
+    if end_snapshot is not None:
+        written.append(_write_memory_report(start_snapshot, end_snapshot, peak, base))
+
+    for path in written:
+        logger.info(f"Profile report written: {path}")
+    return written
+
+
+def _write_cpu_report(profiler: cProfile.Profile, base: str) -> List[str]:
+    pstats_path = f"{base}.pstats"
+    report_path = f"{base}_cpu.txt"
+
+    profiler.dump_stats(pstats_path)
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs()
+    stream.write("=== Sorted by cumulative time ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+    stream.write("\n=== Sorted by own time ===\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+    return [report_path, pstats_path]
+
+
+def _write_memory_report(start: tracemalloc.Snapshot, end: tracemalloc.Snapshot,
+                         peak: int, base: str) -> str:
+    report_path = f"{base}_memory.txt"
+
+    # Не учитывать аллокации самого профилировщика
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, __file__)]
+    start = start.filter_traces(filters)
+    end = end.filter_traces(filters)
+
+    start_total = sum(stat.size for stat in start.statistics("filename"))
+    end_total = sum(stat.size for stat in end.statistics("filename"))
+
+    lines = [
+        "=== Memory summary ===",
+        f"Traced at start: {start_total / 1024:.1f} KiB",
+        f"Traced at end:   {end_total / 1024:.1f} KiB",
+        f"Growth:          {(end_total - start_total) / 1024:+.1f} KiB",
+        f"Peak:            {peak / 1024:.1f} KiB",
+        "",
+        f"=== Top {TOP_ALLOCATIONS} allocation sites at end ===",
+    ]
+    for stat in end.statistics("lineno")[:TOP_ALLOCATIONS]:
+        lines.append(str(stat))
+
+    lines.append("")
+    lines.append(f"=== Top {TOP_ALLOCATIONS} growth sites (end vs start) ===")
+    for diff in end.compare_to(start, "lineno")[:TOP_ALLOCATIONS]:
+        lines.append(str(diff))
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return report_path
@@ -0,0 +1,327 @@
+import bisect
+import logging
+import struct
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional
+from src.isbn import isbn_key
+from src.models import Book
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LSHM"
+VERSION = 1
+
+# Разделы блока в порядке размещения: имя -> код типа array/memoryview.
+#   Пул строк: string_offsets[i]..string_offsets[i+1] — байты i-й строки в string_data
+#   Столбцы: номера строк пула (title/author/genre/isbn) и годы
+#   Индексы: ISBN — отсортированные целочисленные ключи; автор, жанр, год —
+#   сжатые списки строк (keys, starts, rows): строки ключа keys[k]
+#   лежат в rows[starts[k]:starts[k + 1]] по возрастанию
+SECTIONS = (
+    ("string_offsets", "Q"),
+    ("string_data", "B"),
+    ("titles", "I"),
+    ("authors", "I"),
+    ("genres", "I"),
+    ("isbns", "I"),
+    ("years", "i"),
+    ("isbn_keys", "q"),
+    ("isbn_rows", "I"),
+    ("isbn_text_rows", "I"),    # ISBN без числового ключа, по тексту
+    ("author_keys", "I"),
+    ("author_starts", "I"),
+    ("author_rows", "I"),
+    ("genre_keys", "I"),
+    ("genre_starts", "I"),
+    ("genre_rows", "I"),
+    ("year_keys", "i"),
+    ("year_starts", "I"),
+    ("year_rows", "I"),
+)
+
+_HEADER = struct.Struct("<4sBxxxQQ")     # магия, версия, книг, строк пула
+_SECTION = struct.Struct("<QQ")          # смещение, число элементов
+_ALIGNMENT = 8
+
+
+class _StringPool:
+    # Каждая строка хранится один раз в UTF-8
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def intern(self, value: str) -> int:
+        code = self.ids.get(value)
+        if code is None:
+            code = self.ids[value] = len(self.offsets) - 1
+            self.data += value.encode("utf-8")
+            self.offsets.append(len(self.data))
+        return code
+
+    def encoded(self, code: int) -> bytes:
+        return bytes(self.data[self.offsets[code]:self.offsets[code + 1]])
+
+
+def _grouped(keys: List[int], order_key) -> tuple:
+    # Сжатый список строк для столбца ключей
+    groups: Dict[int, array] = {}
+    for row, key in enumerate(keys):
+        rows = groups.get(key)
+        if rows is None:
+            rows = groups[key] = array("I")
+        rows.append(row)
+    ordered = sorted(groups, key=order_key)
+    starts = array("I", [0])
+    flat = array("I")
+    for key in ordered:
+        flat.extend(groups[key])
+        starts.append(len(flat))
+    return ordered, starts, flat
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class SharedCatalog:
+    # Каталог только для чтения в разделяемой памяти. Процессы подключаются
+    # по имени блока и ищут прямо по его данным: без pickle и без копии
+    # каталога в каждом процессе, объекты Book создаются лишь для результатов
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._closed = False
+        buffer = shm.buf
+        magic, version, self._rows, self._strings = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Блок '{shm.name}' не содержит каталога")
+        if version != VERSION:
+            shm.close()
+            raise ValueError(f"Неподдерживаемая версия каталога: {version}")
+
+        self._views: Dict[str, memoryview] = {}
+        position = _HEADER.size
+        for section, typecode in SECTIONS:
+            offset, count = _SECTION.unpack_from(buffer, position)
+            position += _SECTION.size
+            size = count * array(typecode).itemsize
+            self._views[section] = buffer[offset:offset + size].cast(typecode)
+        views = self._views
+        self._offsets = views["string_offsets"]
+        self._data = views["string_data"]
+        self._titles = views["titles"]
+        self._authors = views["authors"]
+        self._genres = views["genres"]
+        self._isbns = views["isbns"]
+        self._years = views["years"]
+
+    @classmethod
+    def create(cls, books: Iterable[Book], name: Optional[str] = None) -> 'SharedCatalog':
+        # Блок создаётся один раз; создатель отвечает за unlink()
+        pool = _StringPool()
+        columns = {section: array(typecode) for section, typecode in SECTIONS[2:7]}
+        int_keys: List[tuple] = []
+        text_keys: List[tuple] = []
+        for row, book in enumerate(books):
+            columns["titles"].append(pool.intern(book.title))
+            columns["authors"].append(pool.intern(book.author))
+            columns["genres"].append(pool.intern(book.genre))
+            isbn_id = pool.intern(book.isbn)
+            columns["isbns"].append(isbn_id)
+            columns["years"].append(book.year)
+            if isinstance(book.isbn_key, int):
+                int_keys.append((book.isbn_key, row))
+            else:
+                text_keys.append((pool.encoded(isbn_id), row))
+        int_keys.sort()
+        text_keys.sort()
+
+        # Строки упорядочены по байтам UTF-8 — это порядок кодовых точек
+        sections = {
+            "string_offsets": pool.offsets,
+            "string_data": array("B", pool.data),
+            **columns,
+            "isbn_keys": array("q", [key for key, _ in int_keys]),
+            "isbn_rows": array("I", [row for _, row in int_keys]),
+            "isbn_text_rows": array("I", [row for _, row in text_keys]),
+        }
+        for field in ("author", "genre"):
+            keys, starts, rows = _grouped(columns[f"{field}s"], pool.encoded)
+            sections[f"{field}_keys"] = array("I", keys)
+            sections[f"{field}_starts"] = starts
+            sections[f"{field}_rows"] = rows
+        keys, starts, rows = _grouped(columns["years"], None)
+        sections["year_keys"] = array("i", keys)
+        sections["year_starts"] = starts
+        sections["year_rows"] = rows
+
+        placement = []
+        size = _HEADER.size + len(SECTIONS) * _SECTION.size
+        for section, _ in SECTIONS:
+            size = _align(size)
+            placement.append(size)
+            size += len(sections[section]) * sections[section].itemsize
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        buffer = shm.buf
+        _HEADER.pack_into(buffer, 0, MAGIC, VERSION, len(columns["titles"]), len(pool.offsets) - 1)
+        position = _HEADER.size
+        for (section, _), offset in zip(SECTIONS, placement):
+            data = sections[section]
+            _SECTION.pack_into(buffer, position, offset, len(data))
+            position += _SECTION.size
+            raw = memoryview(data).cast("B")
+            buffer[offset:offset + len(raw)] = raw
+        logger.info(f"Shared catalog '{shm.name}' created: {len(columns['titles'])} book(s), "
+                    f"{size} bytes")
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedCatalog':
+        # Подключённый процесс не должен удалять блок при выходе
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: параметра track нет
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _string(self, code: int) -> str:
+        return str(self._data[self._offsets[code]:self._offsets[code + 1]], "utf-8")
+
+    def _encoded(self, code: int) -> bytes:
+        return bytes(self._data[self._offsets[code]:self._offsets[code + 1]])
+
+    def _find_string(self, keys: memoryview, value: str) -> Optional[int]:
+        # Бинарный поиск по номерам строк пула, упорядоченным по тексту
+        target = value.encode("utf-8")
+        low, high = 0, len(keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self._encoded(keys[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(keys) and self._encoded(keys[low]) == target:
+            return low
+        return None
+
+    def _group_rows(self, field: str, position: Optional[int]) -> List[int]:
+        if position is None:
+            return []
+        starts = self._views[f"{field}_starts"]
+        return self._views[f"{field}_rows"][starts[position]:starts[position + 1]].tolist()
+
+    def book(self, row: int) -> Book:
+        return Book(self._string(self._titles[row]), self._string(self._authors[row]),
+                    self._years[row], self._string(self._genres[row]),
+                    self._string(self._isbns[row]))
+
+    def row_of(self, isbn: str) -> Optional[int]:
+        # При повторе ISBN побеждает последняя книга, как в IndexDict
+        key = isbn_key(isbn)
+        if isinstance(key, int):
+            keys = self._views["isbn_keys"]
+            position = bisect.bisect_right(keys, key) - 1
+            if position >= 0 and keys[position] == key:
+                return self._views["isbn_rows"][position]
+            return None
+        rows = self._views["isbn_text_rows"]
+        target = key.encode("utf-8")
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self._encoded(self._isbns[rows[middle]]) <= target:
+                low = middle + 1
+            else:
+                high = middle
+        if low and self._encoded(self._isbns[rows[low - 1]]) == target:
+            return rows[low - 1]
+        return None
+
+    def author_rows(self, author: str) -> List[int]:
+        return self._group_rows("author", self._find_string(self._views["author_keys"], author))
+
+    def genre_rows(self, genre: str) -> List[int]:
+        return self._group_rows("genre", self._find_string(self._views["genre_keys"], genre))
+
+    def year_rows(self, year: int) -> List[int]:
+        keys = self._views["year_keys"]
+        position = bisect.bisect_left(keys, year)
+        if position < len(keys) and keys[position] == year:
+            return self._group_rows("year", position)
+        return []
+
+    def search_by_isbn(self, isbn: str) -> Optional[Book]:
+        row = self.row_of(isbn)
+        return self.book(row) if row is not None else None
+
+    def search_by_author(self, author: str) -> List[Book]:
+        return [self.book(row) for row in self.author_rows(author)]
+
+    def search_by_year(self, year: int) -> List[Book]:
+        return [self.book(row) for row in self.year_rows(year)]
+
+    def search_by_genre(self, genre: str) -> List[Book]:
+        return [self.book(row) for row in self.genre_rows(genre)]
+
+    # Пакетные версии, как у Library: {ключ: результат}
+    def search_many_isbn(self, isbns: Iterable[str]) -> Dict[str, Optional[Book]]:
+        return {isbn: self.search_by_isbn(isbn) for isbn in isbns}
+
+    def search_many_authors(self, authors: Iterable[str]) -> Dict[str, List[Book]]:
+        return {author: self.search_by_author(author) for author in authors}
+
+    def search_many_years(self, years: Iterable[int]) -> Dict[int, List[Book]]:
+        return {year: self.search_by_year(year) for year in years}
+
+    def get_statistics(self) -> dict:
+        return {
+            'name': self.name,
+            'books': self._rows,
+            'strings': self._strings,
+            'bytes': self._shm.size,
+            'authors': len(self._views["author_keys"]),
+            'years': len(self._views["year_keys"]),
+            'genres': len(self._views["genre_keys"]),
+        }
+
+    def close(self) -> None:
+        # Представления держат буфер: без release() close() завершится BufferError
+        if self._closed:
+            return
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._shm.close()
+        self._closed = True
+
+    def unlink(self) -> None:
+        if not self._owner:
+            raise ValueError("Удалить блок может только создавший его процесс")
+        self._shm.unlink()
+        logger.info(f"Shared catalog '{self._shm.name}' unlinked")
+
+    def __enter__(self) -> 'SharedCatalog':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # Создатель при выходе из with также удаляет блок
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __repr__(self) -> str:
+        return f"SharedCatalog(name='{self.name}', books={self._rows}, owner={self._owner})"
@@ -1,18 +1,28 @@
 import random
 import logging
-from typing import List, Callable
+import time
+from typing import Callable, Dict, List, Optional
 from src.models import Library, Book
-from src.constants import GENRES, AUTHORS, BOOK_TITLES, MIN_YEAR, MAX_YEAR
+from src.constants import GENRES, AUTHORS, BOOK_TITLES, MIN_YEAR, MAX_YEAR, PATRON_COUNT, EVENT_RATES
+from src.engine import EventEngine, Rate
+from src.metrics import SimulationMetrics
+from src.generator import CatalogGenerator
+from src.sinks import OutputSink, StdoutSink
+from src.trace import TraceRecorder
 
 logger = logging.getLogger(__name__)
 
 
 class LibrarySimulator:
     
-    def __init__(self, library: Library):
+    def __init__(self, library: Library, sink: Optional[OutputSink] = None):
         self.library = library
+        # Куда пишутся записи о шагах; по умолчанию — буферизованный stdout
+        self.sink = sink if sink is not None else StdoutSink()
         self.event_counter = 0
         self._isbn_counter = 1000  # Для генерации уникальных ISBN
+        # Потоковые метрики: память не растёт с числом шагов
+        self.metrics = SimulationMetrics()
         
         # Список событий
         self.events: List[Callable] = [
@@ -22,6 +32,11 @@ class LibrarySimulator:
             self.event_search_by_year,
             self.event_search_invalid_isbn,
             self.event_search_by_genre,
+            self.event_checkout_book,
+            self.event_return_book,
+            self.event_renew_loan,
+            self.event_place_hold,
+            self.event_advance_day,
         ]
         
         logger.info(f"Simulator initialized with {len(self.events)} event types")
@@ -63,6 +78,7 @@ class LibrarySimulator:
         results = self.library.search_by_author(author)
         
         count = len(results)
+        self.metrics.record_result("search_by_author", count)
         return f"Search by author '{author}': found {count} book(s)"
     
     def event_search_by_year(self) -> str:
@@ -70,11 +86,13 @@ class LibrarySimulator:
         results = self.library.search_by_year(year)
         
         count = len(results)
+        self.metrics.record_result("search_by_year", count)
         return f"Search by year {year}: found {count} book(s)"
     
     def event_search_invalid_isbn(self) -> str:
         fake_isbn = f"ISBN-{random.randint(1, 10000):06d}"
         result = self.library.search_by_isbn(fake_isbn)
+        self.metrics.record_result("search_invalid_isbn", 0 if result is None else 1)
         
         if result is None:
             return f"Search by ISBN '{fake_isbn}': NOT FOUND (expected behavior)"
@@ -86,16 +104,133 @@ class LibrarySimulator:
         results = self.library.search_by_genre(genre)
         
         count = len(results)
+        self.metrics.record_result("search_by_genre", count)
         return f"Search by genre '{genre}': found {count} book(s)"
     
+    def _random_patron(self) -> str:
+        return f"patron-{random.randint(1, PATRON_COUNT)}"
+    
+    def _random_book(self) -> Book:
+        return self.library.books[random.randint(0, len(self.library.books) - 1)]
+    
+    def event_checkout_book(self) -> str:
+        if len(self.library.books) == 0:
+            return "Cannot checkout: library is empty"
+        
+        book = self._random_book()
+        patron = self._random_patron()
+        try:
+            loan = self.library.circulation.checkout(book.isbn, patron)
+        except ValueError:
+            return f"Checkout of '{book.isbn}' by {patron}: not available"
+        return f"Checked out '{book.isbn}' to {patron}, due day {loan.due}"
+    
+    def event_return_book(self) -> str:
+        loans = self.library.circulation
+        if len(loans) == 0:
+            return "Cannot return: no active loans"
+        
+        book = self._random_book()
+        if loans.get_loan(book.isbn) is None:
+            return f"Return of '{book.isbn}': book is not on loan"
+        next_patron = loans.return_book(book.isbn)
+        if next_patron is not None:
+            return f"Returned '{book.isbn}', held for {next_patron}"
+        return f"Returned '{book.isbn}'"
+    
+    def event_renew_loan(self) -> str:
+        if len(self.library.books) == 0:
+            return "Cannot renew: library is empty"
+        
+        book = self._random_book()
+        try:
+            due = self.library.circulation.renew(book.isbn)
+        except ValueError:
+            return f"Renewal of '{book.isbn}': refused"
+        return f"Renewed '{book.isbn}', new due day {due}"
+    
+    def event_place_hold(self) -> str:
+        if len(self.library.books) == 0:
+            return "Cannot place hold: library is empty"
+        
+        book = self._random_book()
+        patron = self._random_patron()
+        try:
+            position = self.library.circulation.place_hold(book.isbn, patron)
+        except ValueError:
+            return f"Hold on '{book.isbn}' by {patron}: already queued"
+        if position == 0:
+            return f"Hold on '{book.isbn}' by {patron}: ready for pickup"
+        return f"Hold on '{book.isbn}' by {patron}: position {position}"
+    
+    def event_advance_day(self) -> str:
+        result = self.library.circulation.advance()
+        return (f"Day {result['day']}: {len(result['new_overdue'])} new overdue loan(s), "
+                f"{result['expired_holds']} expired hold(s)")
+    
+    def _execute(self, event_func: Callable[[], str]) -> str:
+        start = time.perf_counter()
+        result = event_func()
+        self.metrics.record_event(event_func.__name__[len("event_"):],
+                                  time.perf_counter() - start, len(self.library.books))
+        return result
+    
     def run_step(self) -> str:
+        return self._step()["message"]
+    
+    def _step(self) -> dict:
         self.event_counter += 1
         event_func = random.choice(self.events)
-        result = event_func()
+        result = self._execute(event_func)
         
         formatted = f"[Step {self.event_counter}] {result}"
-        logger.info(formatted)
-        return formatted
+        # Текст шага выводит приёмник; в журнал он попадает только на DEBUG
+        logger.debug(formatted)
+        return {"step": self.event_counter, "event": event_func.__name__[len("event_"):],
+                "message": formatted}
+    
+    def run_timed(self, duration: float, seed: int = None,
+                  rates: Optional[Dict[str, Rate]] = None, verbose: bool = False) -> dict:
+        # Дискретно-событийная модель: у каждого типа событий свой пуассоновский
+        # поток, время модели — дни; смена дня для выдач происходит раз в день
+        if seed is not None:
+            random.seed(seed)
+        rates = EVENT_RATES if rates is None else rates
+        engine = EventEngine()
+        
+        def make_action(name: str) -> Callable[[], None]:
+            event_func = getattr(self, f"event_{name}", None)
+            if event_func is None:
+                raise ValueError(f"Неизвестный тип события: '{name}'")
+            if not verbose:
+                return lambda: self._execute(event_func)
+            def action() -> None:
+                result = self._execute(event_func)
+                self.sink.write_step({"time": engine.now, "event": name,
+                                      "message": f"[t={engine.now:9.4f}] {result}"})
+            return action
+        
+        for name, rate in rates.items():
+            engine.add_poisson(name, rate, make_action(name))
+        engine.add_periodic("advance_day", 1.0, make_action("advance_day"))
+        
+        logger.info(f"Timed simulation started: duration={duration}, seed={seed}")
+        report = engine.run(until=duration)
+        self.sink.flush()
+        self.event_counter += report['events']
+        logger.info(f"Timed simulation completed: {report['events']} events")
+        return report
+    
+    def print_timed_report(self, report: dict) -> None:
+        print("\n" + "="*70)
+        print(f"TIMED SIMULATION: {report['simulated_time']:.2f} simulated day(s)")
+        print("="*70)
+        print(f"Events: {report['events']} "
+              f"({report['events_per_time_unit']:.1f} per simulated day)")
+        print(f"Wall time: {report['wall_time']:.3f}s ({report['events_per_sec']:.0f} events/s)")
+        print(f"Event queue: {report['pending']} pending, max {report['max_queue']}")
+        for name, count in sorted(report['by_type'].items(), key=lambda item: -item[1]):
+            print(f"  {name:<20} {count}")
     
     def run_simulation(self, steps: int = 20, seed: int = None) -> None:
         if seed is not None:
@@ -109,9 +244,13 @@ class LibrarySimulator:
         print("="*70 + "\n")
         
         for _ in range(steps):
-            event_output = self.run_step()
-            print(event_output)
+            self.sink.write_step(self._step())
+        self.sink.flush()
         
+        self.print_statistics()
+        logger.info("Simulation completed")
+    
+    def print_statistics(self) -> None:
         # Вывести итоговую статистику
         print("\n" + "="*70)
         print("FINAL STATISTICS:")
@@ -122,15 +261,28 @@ class LibrarySimulator:
         if stats['year_range']:
             print(f"Year range: {stats['year_range'][0]} - {stats['year_range'][1]}")
         print(f"Genres: {', '.join(stats['genres'])}")
+        circulation = self.library.circulation.get_statistics()
+        print(f"Active loans: {circulation['active_loans']} "
+              f"(overdue: {circulation['overdue_loans']})")
+        print(f"Holds: {circulation['waiting_holds']} waiting, "
+              f"{circulation['ready_for_pickup']} ready for pickup")
+        if self.metrics.total_events:
+            print("-"*70)
+            print(self.metrics.format_summary())
         print("="*70 + "\n")
-        
-        logger.info("Simulation completed")
 
 
-def run_simulation(steps: int = 20, seed: int = None) -> None:
+def run_simulation(steps: int = 20, seed: int = None, trace_path: str = None,
+                   duration: float = None, catalog_size: int = 0,
+                   sink: Optional[OutputSink] = None) -> None:
 
     # Создать библиотеку
     library = Library("Central Library")
+    recorder = None
+    if trace_path is not None:
+        # Все операции над библиотекой пишутся в бинарную трассу
+        recorder = TraceRecorder(library, trace_path)
+        library = recorder
     
     # Добавить несколько начальных книг
     initial_books = [
@@ -142,6 +294,26 @@ def run_simulation(steps: int = 20, seed: int = None) -> None:
     for book in initial_books:
         library.add_book(book)
     
+    if catalog_size:
+        # Начальный каталог реалистичного размера одной транзакцией
+        generator = CatalogGenerator(seed=seed if seed is not None else 0)
+        with library.transaction():
+            for book in generator.books(catalog_size):
+                library.add_book(book)
+        logger.info(f"Generated initial catalog of {catalog_size} book(s)")
+    
     # Создать симулятор и запустить
-    simulator = LibrarySimulator(library)
-    simulator.run_simulation(steps=steps, seed=seed)
+    simulator = LibrarySimulator(library, sink)
+    try:
+        if duration is not None:
+            # Модельное время вместо фиксированного числа шагов;
+            # события пишутся, только если вывод задан явно
+            report = simulator.run_timed(duration, seed=seed, verbose=sink is not None)
+            simulator.print_timed_report(report)
+            simulator.print_statistics()
+        else:
+            simulator.run_simulation(steps=steps, seed=seed)
+    finally:
+        simulator.sink.flush()
+        if recorder is not None:
+            recorder.close()
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import IO, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 64 * 1024          # символов в буфере до записи
+DEFAULT_FLUSH_INTERVAL = 1.0             # секунд между сбросами
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+SINK_KINDS = ("stdout", "null", "file", "jsonl", "rotate")
+
+
+def format_text(record: dict) -> str:
+    return record["message"] + "\n"
+
+
+def format_jsonl(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class OutputSink(ABC):
+    # Приёмник записей о шагах симуляции:
+    # {"step": номер, "event": тип события, "message": текст, ...}
+
+    @abstractmethod
+    def write_step(self, record: dict) -> None:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class NullSink(OutputSink):
+    # Вывод отбрасывается; число записей считается для отчётов и тестов
+
+    def __init__(self):
+        self.records = 0
+
+    def write_step(self, record: dict) -> None:
+        self.records += 1
+
+    def __repr__(self) -> str:
+        return f"NullSink(records={self.records})"
+
+
+class BufferedSink(OutputSink):
+    # Записи копятся в памяти и уходят одним write(): при заполнении буфера,
+    # по истечении flush_interval или по flush()/close().
+    # buffer_size=0 — запись на каждом шаге, flush_interval=None — только по размеру
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+                 formatter: Callable[[dict], str] = format_text):
+        if buffer_size < 0:
+            raise ValueError("buffer_size не может быть отрицательным")
+        if flush_interval is not None and flush_interval <= 0:
+            raise ValueError("flush_interval должен быть положительным")
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._format = formatter
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self.flushes = 0
+
+    @abstractmethod
+    def _write(self, data: str) -> None:
+        ...
+
+    def write_step(self, record: dict) -> None:
+        line = self._format(record)
+        self._pending.append(line)
+        self._pending_size += len(line)
+        self.records += 1
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+        elif (self.flush_interval is not None
+              and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        data = "".join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        self._write(data)
+        self.flushes += 1
+
+    def get_statistics(self) -> dict:
+        return {
+            'records': self.records,
+            'flushes': self.flushes,
+            'buffered': len(self._pending),
+        }
+
+
+class StdoutSink(BufferedSink):
+
+    def __init__(self, stream: Optional[IO[str]] = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+                 formatter: Callable[[dict], str] = format_text):
+        super().__init__(buffer_size, flush_interval, formatter)
+        # None — текущий sys.stdout на момент записи (его подменяют тесты и профилировщик)
+        self._stream = stream
+
+    def _write(self, data: str) -> None:
+        stream = self._stream if self._stream is not None else sys.stdout
+        stream.write(data)
+        stream.flush()
+
+    def __repr__(self) -> str:
+        return f"StdoutSink(records={self.records}, flushes={self.flushes})"
+
+
+class FileSink(BufferedSink):
+
+    def __init__(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+                 formatter: Callable[[dict], str] = format_text):
+        super().__init__(buffer_size, flush_interval, formatter)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, data: str) -> None:
+        self._file.write(data)
+        # Сброшенные данные сразу видны читателям файла (tail -f)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        logger.info(f"Wrote {self.records} record(s) to {self.path} in {self.flushes} flush(es)")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(path='{self.path}', records={self.records})"
+
+
+class JsonlSink(FileSink):
+    # Одна JSON-запись на строку: поля шага сохраняются целиком
+
+    def __init__(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL):
+        super().__init__(path, buffer_size, flush_interval, format_jsonl)
+
+
+class RotatingFileSink(FileSink):
+    # Как RotatingFileHandler: при превышении max_bytes файл становится path.1,
+    # старые копии сдвигаются до path.<backup_count>, самая старая удаляется.
+    # Ротация проверяется перед записью буфера, поэтому файл может
+    # превысить max_bytes не больше чем на один буфер.
+    # backup_count >= 1: без копий ротация стирала бы записанные шаги
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL,
+                 formatter: Callable[[dict], str] = format_text):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes должен быть положительным")
+        if backup_count < 1:
+            raise ValueError("backup_count должен быть не меньше 1: без копий ротация теряет данные")
+        super().__init__(path, buffer_size, flush_interval, formatter)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotations = 0
+        self._size = 0
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._size = 0
+        self.rotations += 1
+
+    def _write(self, data: str) -> None:
+        size = len(data.encode("utf-8"))
+        if self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        super()._write(data)
+        self._size += size
+
+    def get_statistics(self) -> dict:
+        stats = super().get_statistics()
+        stats['rotations'] = self.rotations
+        return stats
+
+
+def open_sink(spec: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+              flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL) -> OutputSink:
+    # "stdout", "null", "file:PATH", "jsonl:PATH", "rotate:PATH";
+    # rotate пишет JSONL, если PATH оканчивается на .jsonl, иначе текст
+    kind, _, path = spec.partition(":")
+    if kind not in SINK_KINDS:
+        raise ValueError(f"Неизвестный вывод '{kind}' (допустимо: {', '.join(SINK_KINDS)})")
+    if kind in ("stdout", "null"):
+        if path:
+            raise ValueError(f"Вывод '{kind}' не принимает путь")
+        if kind == "null":
+            return NullSink()
+        return StdoutSink(buffer_size=buffer_size, flush_interval=flush_interval)
+    if not path:
+        raise ValueError(f"Для вывода '{kind}' нужен путь: {kind}:PATH")
+    if kind == "file":
+        return FileSink(path, buffer_size, flush_interval)
+    if kind == "jsonl":
+        return JsonlSink(path, buffer_size, flush_interval)
+    formatter = format_jsonl if path.endswith(".jsonl") else format_text
+    return RotatingFileSink(path, buffer_size=buffer_size, flush_interval=flush_interval,
+                            formatter=formatter)
@@ -0,0 +1,315 @@
+import logging
+import struct
+import time
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from src.circulation import DEFAULT_LOAN_DAYS, DEFAULT_RENEW_DAYS
+from src.models import Book
+
+logger = logging.getLogger(__name__)
+
+TRACE_MAGIC = b"LTRC"
+TRACE_VERSION = 2
+# Версия 1 — без операций выдачи; такие трассы читаются без изменений
+SUPPORTED_VERSIONS = (1, 2)
+
+# Коды операций
+OP_STRING = 0
+OP_ADD = 1
+OP_REMOVE = 2
+OP_SEARCH_ISBN = 3
+OP_SEARCH_AUTHOR = 4
+OP_SEARCH_YEAR = 5
+OP_SEARCH_GENRE = 6
+OP_CHECKOUT = 7
+OP_RETURN = 8
+OP_RENEW = 9
+OP_PLACE_HOLD = 10
+OP_CANCEL_HOLD = 11
+OP_ADVANCE = 12
+
+_HEADER = struct.Struct("<4sB")
+_OPCODE = struct.Struct("<B")
+_STRING_LEN = struct.Struct("<H")
+_ADD = struct.Struct("<IIiII")
+_STRING_REF = struct.Struct("<I")
+_YEAR = struct.Struct("<i")
+_CHECKOUT = struct.Struct("<IIi")      # ISBN, читатель, дней
+_RENEW = struct.Struct("<Ii")          # ISBN, дней
+_STRING_PAIR = struct.Struct("<II")    # ISBN, читатель
+
+_STRING_ARG_OPS = (OP_REMOVE, OP_SEARCH_ISBN, OP_SEARCH_AUTHOR, OP_SEARCH_GENRE, OP_RETURN)
+_STRING_PAIR_OPS = (OP_PLACE_HOLD, OP_CANCEL_HOLD)
+# Методы library.circulation для операций выдачи
+_CIRCULATION_METHODS = {
+    OP_CHECKOUT: 'checkout',
+    OP_RETURN: 'return_book',
+    OP_RENEW: 'renew',
+    OP_PLACE_HOLD: 'place_hold',
+    OP_CANCEL_HOLD: 'cancel_hold',
+    OP_ADVANCE: 'advance',
+}
+
+
+class TraceWriter:
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._strings: Dict[str, int] = {}
+        self.operations = 0
+        self._stream.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+
+    def _string_id(self, value: str) -> int:
+        # Строки пишутся один раз, дальше используется их номер
+        string_id = self._strings.get(value)
+        if string_id is None:
+            data = value.encode("utf-8")
+            self._stream.write(_OPCODE.pack(OP_STRING) + _STRING_LEN.pack(len(data)) + data)
+            string_id = len(self._strings)
+            self._strings[value] = string_id
+        return string_id
+
+    def write_add(self, book: Book) -> None:
+        ids = (self._string_id(book.title), self._string_id(book.author),
+               book.year, self._string_id(book.genre), self._string_id(book.isbn))
+        self._stream.write(_OPCODE.pack(OP_ADD) + _ADD.pack(*ids))
+        self.operations += 1
+
+    def write_string_op(self, opcode: int, value: str) -> None:
+        string_id = self._string_id(value)
+        self._stream.write(_OPCODE.pack(opcode) + _STRING_REF.pack(string_id))
+        self.operations += 1
+
+    def write_search_year(self, year: int) -> None:
+        self._stream.write(_OPCODE.pack(OP_SEARCH_YEAR) + _YEAR.pack(year))
+        self.operations += 1
+
+    def write_checkout(self, isbn: str, patron: str, days: int) -> None:
+        ids = (self._string_id(isbn), self._string_id(patron), days)
+        self._stream.write(_OPCODE.pack(OP_CHECKOUT) + _CHECKOUT.pack(*ids))
+        self.operations += 1
+
+    def write_renew(self, isbn: str, days: int) -> None:
+        string_id = self._string_id(isbn)
+        self._stream.write(_OPCODE.pack(OP_RENEW) + _RENEW.pack(string_id, days))
+        self.operations += 1
+
+    def write_string_pair(self, opcode: int, isbn: str, patron: str) -> None:
+        ids = (self._string_id(isbn), self._string_id(patron))
+        self._stream.write(_OPCODE.pack(opcode) + _STRING_PAIR.pack(*ids))
+        self.operations += 1
+
+    def write_advance(self, days: int) -> None:
+        self._stream.write(_OPCODE.pack(OP_ADVANCE) + _YEAR.pack(days))
+        self.operations += 1
+
+
+class CirculationRecorder:
+    # Операции выдачи пишутся в трассу до выполнения, как и операции каталога:
+    # отказ (ValueError) при воспроизведении повторится так же.
+    # Поиск книги по ISBN внутри checkout/place_hold повторяется вместе с операцией
+
+    def __init__(self, circulation, writer: TraceWriter):
+        self.circulation = circulation
+        self._writer = writer
+
+    def checkout(self, isbn: str, patron: str, days: int = DEFAULT_LOAN_DAYS):
+        self._writer.write_checkout(isbn, patron, days)
+        return self.circulation.checkout(isbn, patron, days)
+
+    def return_book(self, isbn: str) -> Optional[str]:
+        self._writer.write_string_op(OP_RETURN, isbn)
+        return self.circulation.return_book(isbn)
+
+    def renew(self, isbn: str, days: int = DEFAULT_RENEW_DAYS) -> int:
+        self._writer.write_renew(isbn, days)
+        return self.circulation.renew(isbn, days)
+
+    def place_hold(self, isbn: str, patron: str) -> int:
+        self._writer.write_string_pair(OP_PLACE_HOLD, isbn, patron)
+        return self.circulation.place_hold(isbn, patron)
+
+    def cancel_hold(self, isbn: str, patron: str) -> bool:
+        self._writer.write_string_pair(OP_CANCEL_HOLD, isbn, patron)
+        return self.circulation.cancel_hold(isbn, patron)
+
+    def advance(self, days: int = 1) -> dict:
+        self._writer.write_advance(days)
+        return self.circulation.advance(days)
+
+    def __getattr__(self, name):
+        # Чтение состояния (get_loan, is_available, get_statistics, ...) не записывается
+        return getattr(self.circulation, name)
+
+    def __len__(self) -> int:
+        return len(self.circulation)
+
+
+class TraceRecorder:
+
+    def __init__(self, library, path: str):
+        self.library = library
+        self.path = path
+        self._file = open(path, "wb")
+        self._writer = TraceWriter(self._file)
+        self.circulation = CirculationRecorder(library.circulation, self._writer)
+        logger.info(f"Recording trace to {path}")
+
+    def add_book(self, book: Book) -> None:
+        self._writer.write_add(book)
+        self.library.add_book(book)
+
+    def remove_book(self, isbn: str) -> bool:
+        self._writer.write_string_op(OP_REMOVE, isbn)
+        return self.library.remove_book(isbn)
+
+    def search_by_isbn(self, isbn: str):
+        self._writer.write_string_op(OP_SEARCH_ISBN, isbn)
+        return self.library.search_by_isbn(isbn)
+
+    def search_by_author(self, author: str):
+        self._writer.write_string_op(OP_SEARCH_AUTHOR, author)
+        return self.library.search_by_author(author)
+
+    def search_by_year(self, year: int):
+        self._writer.write_search_year(year)
+        return self.library.search_by_year(year)
+
+    def search_by_genre(self, genre: str):
+        self._writer.write_string_op(OP_SEARCH_GENRE, genre)
+        return self.library.search_by_genre(genre)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Trace closed: {self._writer.operations} operation(s) in {self.path}")
+
+    def __getattr__(self, name):
+        # Остальные атрибуты (books, get_statistics, ...) берутся у библиотеки
+        return getattr(self.library, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"TraceRecorder(path='{self.path}', operations={self._writer.operations})"
+
+
+def load_trace(path: str) -> List[Tuple[int, tuple]]:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Файл трассы слишком короткий: {path}")
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"Неверный формат файла трассы: {path}")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Неподдерживаемая версия трассы: {version}")
+
+    strings: List[str] = []
+    operations: List[Tuple[int, tuple]] = []
+    offset = _HEADER.size
+    size = len(data)
+
+    try:
+        while offset < size:
+            opcode = data[offset]
+            offset += 1
+            if opcode == OP_STRING:
+                (length,) = _STRING_LEN.unpack_from(data, offset)
+                offset += _STRING_LEN.size
+                strings.append(data[offset:offset + length].decode("utf-8"))
+                offset += length
+            elif opcode == OP_ADD:
+                title, author, year, genre, isbn = _ADD.unpack_from(data, offset)
+                offset += _ADD.size
+                operations.append((OP_ADD, (strings[title], strings[author], year,
+                                            strings[genre], strings[isbn])))
+            elif opcode in _STRING_ARG_OPS:
+                (string_id,) = _STRING_REF.unpack_from(data, offset)
+                offset += _STRING_REF.size
+                operations.append((opcode, (strings[string_id],)))
+            elif opcode in (OP_SEARCH_YEAR, OP_ADVANCE):
+                (value,) = _YEAR.unpack_from(data, offset)
+                offset += _YEAR.size
+                operations.append((opcode, (value,)))
+            elif opcode == OP_CHECKOUT:
+                isbn, patron, days = _CHECKOUT.unpack_from(data, offset)
+                offset += _CHECKOUT.size
+                operations.append((OP_CHECKOUT, (strings[isbn], strings[patron], days)))
+            elif opcode == OP_RENEW:
+                isbn, days = _RENEW.unpack_from(data, offset)
+                offset += _RENEW.size
+                operations.append((OP_RENEW, (strings[isbn], days)))
+            elif opcode in _STRING_PAIR_OPS:
+                isbn, patron = _STRING_PAIR.unpack_from(data, offset)
+                offset += _STRING_PAIR.size
+                operations.append((opcode, (strings[isbn], strings[patron])))
+            else:
+                raise ValueError(f"Неизвестный код операции {opcode} в позиции {offset - 1}")
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Повреждённый файл трассы {path}: {e}") from e
+
+    logger.debug(f"Loaded {len(operations)} operation(s) from {path}")
+    return operations
+
+
+def _refusable(operation: Callable) -> Callable:
+    # Отказ операции выдачи — часть записанного сценария, а не ошибка воспроизведения
+    def run(*args):
+        try:
+            return operation(*args)
+        except ValueError:
+            return None
+    return run
+
+
+def _circulation_handler(library, handlers: dict, opcode: int, name: str) -> Callable:
+    # Выдача разрешается при первой операции выдачи в трассе: трассы без них
+    # воспроизводятся и на целях без library.circulation
+    def run(*args):
+        handler = handlers[opcode] = _refusable(getattr(library.circulation, name))
+        return handler(*args)
+    return run
+
+
+class TraceReplayer:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.operations = load_trace(path)
+
+    def replay(self, library, limit: Optional[int] = None) -> dict:
+        add_book = library.add_book
+        handlers = {
+            OP_ADD: lambda title, author, year, genre, isbn:
+                add_book(Book(title, author, year, genre, isbn)),
+            OP_REMOVE: library.remove_book,
+            OP_SEARCH_ISBN: library.search_by_isbn,
+            OP_SEARCH_AUTHOR: library.search_by_author,
+            OP_SEARCH_YEAR: library.search_by_year,
+            OP_SEARCH_GENRE: library.search_by_genre,
+        }
+        for opcode, name in _CIRCULATION_METHODS.items():
+            handlers[opcode] = _circulation_handler(library, handlers, opcode, name)
+        operations = self.operations if limit is None else self.operations[:limit]
+
+        start = time.perf_counter()
+        for opcode, args in operations:
+            handlers[opcode](*args)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'operations': len(operations),
+            'elapsed': elapsed,
+            'ops_per_sec': len(operations) / elapsed if elapsed > 0 else float('inf'),
+        }
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def __repr__(self) -> str:
+        return f"TraceReplayer(path='{self.path}', operations={len(self.operations)})"
@@ -1,6 +1,32 @@
 import pytest
-from src.models import Book, BookCollection, IndexDict, Library
+from src.models import ROW_CHUNK, Book, BookCollection, BookView, IndexDict, Library
 from src.simulation import LibrarySimulator, run_simulation
+from src.profiling import profile_call
+from src.pagination import iter_pages
+from src.isbn import canonical_isbn, isbn_key
+from src.fuzzy import TrigramIndex, normalize
+from src.autocomplete import PrefixIndex
+from src.federation import FederatedCatalog
+from src.changefeed import ChangeFeed
+from src.batch import load_catalog, run_queries, run_query_file
+from src.engine import EventEngine, diurnal
+from src.metrics import GrowthCurve, Reservoir, SimulationMetrics
+from src.bloom import CountingBloomFilter
+from src.ordered import SortedIndex
+from src.columnar import export_columnar, import_columnar, iter_columnar
+from src.generator import CatalogGenerator, write_catalog
+from src.sharedcatalog import SharedCatalog
+from src.sinks import (BufferedSink, JsonlSink, NullSink, OutputSink, RotatingFileSink,
+                       StdoutSink, open_sink)
+from src.trace import TraceRecorder, TraceReplayer, load_trace, OP_ADD, OP_REMOVE
+
+
+def make_library(books, name: str = "Test") -> Library:
+    # Общая заготовка тестов: библиотека из кортежей (title, author, year, genre, isbn)
+    library = Library(name)
+    for fields in books:
+        library.add_book(Book(*fields))
+    return library
 
 
 class TestBook:
@@ -21,6 +47,14 @@ class TestBook:
         assert book1 == book2  # Одинаковый ISBN
         assert book1 != book3  # Разные ISBN
     
+    def test_book_hash(self):
+        book1 = Book("Title1", "Author1", 2020, "Fiction", "ISBN-001")
+        book2 = Book("Title2", "Author2", 2021, "Science", "ISBN-001")
+        
+        assert hash(book1) == hash(book2)
+        assert len({book1, book2}) == 1
+        assert {book1: "first"}[book2] == "first"
+    
     def test_book_repr(self):
         book = Book("Foundation", "Asimov", 1951, "Science", "ISBN-001")
         repr_str = repr(book)
@@ -36,6 +70,60 @@ class TestBook:
         assert "NonExistent" not in book
 
 
+class TestIsbnKey:
+    
+    def test_simulator_format(self):
+        assert isbn_key("ISBN-001000") == 1001000
+        assert isbn_key("ISBN-001") != isbn_key("ISBN-0001")
+    
+    def test_isbn10_and_isbn13_are_same_key(self):
+        key = isbn_key("978-0-306-40615-7")
+        assert isinstance(key, int)
+        assert isbn_key("9780306406157") == key
+        assert isbn_key("0-306-40615-2") == key
+        assert isbn_key("ISBN 0306406152") == key
+    
+    def test_unparseable_falls_back_to_string(self):
+        assert isbn_key("ISBN-NEW") == "ISBN-NEW"
+        assert isbn_key("978-0-306-40615-0") == "978-0-306-40615-0"  # неверная контрольная цифра
+    
+    def test_library_lookup_by_canonical_key(self):
+        library = Library("Test")
+        book = Book("Arithmetic", "Author", 1990, "Science", "978-0-306-40615-7")
+        library.add_book(book)
+        assert library.search_by_isbn("0306406152") is book
+        assert "9780306406157" in library.indexes
+        assert library.remove_book("9780306406157") is True
+        assert len(library.books) == 0
+    
+    def test_canonical_spelling_round_trips(self):
+        for isbn in ("ISBN-001", "0-306-40615-2", "ISBN-NEW", "978000000123"):
+            key = isbn_key(isbn)
+            assert isbn_key(canonical_isbn(key)) == key
+        assert canonical_isbn(isbn_key("0-306-40615-2")) == "9780306406157"
+        assert canonical_isbn(isbn_key("ISBN-001")) == "ISBN-001"
+    
+    def test_spellings_share_row_and_exact_hit_skips_parsing(self, monkeypatch):
+        import src.models
+        library = make_library([("Arithmetic", "Author", 1990, "Science", "978-0-306-40615-7"),
+                                ("Simulated", "Author", 2000, "Fiction", "ISBN-000042")])
+        index = library.indexes
+        row = index.row_of("9780306406157")
+        assert row == 0
+        for spelling in ("978-0-306-40615-7", "0-306-40615-2", "ISBN 0306406152"):
+            assert index.row_of(spelling) == row
+        
+        # Каноническое написание находится без разбора строки
+        parsed = []
+        monkeypatch.setattr(src.models, "isbn_key", lambda isbn: parsed.append(isbn) or isbn_key(isbn))
+        assert library.search_by_isbn("9780306406157").title == "Arithmetic"
+        assert library.search_by_isbn("ISBN-000042").title == "Simulated"
+        assert library.search_many_isbn(["ISBN-000042"])["ISBN-000042"].title == "Simulated"
+        assert parsed == []
+        assert library.search_by_isbn("0-306-40615-2").title == "Arithmetic"
+        assert parsed == ["0-306-40615-2"]
+
+
 class TestBookCollection:
     
     def test_collection_creation(self):
@@ -100,6 +188,32 @@ class TestBookCollection:
         assert other_book not in collection
         assert "ISBN-999" not in collection
     
+    def test_contains_tracks_removals(self):
+        collection = BookCollection()
+        collection.extend([Book("A", "X", 2020, "Fiction", "ISBN-001"),
+                           Book("B", "Y", 2021, "Fiction", "ISBN-001"),
+                           Book("C", "Z", 2022, "Fiction", "ISBN-002")])
+        
+        collection.remove("ISBN-001")
+        assert "ISBN-001" in collection  # Осталась вторая книга с тем же ISBN
+        collection.remove_many(list(collection.row_ids))
+        assert "ISBN-001" not in collection
+        assert "ISBN-002" not in collection
+        assert not collection.remove("ISBN-002")
+    
+    def test_library_collection_uses_isbn_index(self):
+        library = Library("Test")
+        book = Book("Arithmetic", "Author", 1990, "Science", "978-0-306-40615-7")
+        library.add_book(book)
+        # Отдельного словаря ключей у коллекции библиотеки нет
+        assert library.books.index is library.indexes
+        assert library.books._keys is None
+        assert book in library.books
+        assert "0306406152" in library.books
+        assert library.books.remove("9780306406157")
+        assert book not in library.books
+        assert library.snapshot().books.index is not None
+    
     def test_remove(self):
         collection = BookCollection()
         book1 = Book("Book1", "Author1", 2020, "Fiction", "ISBN-001")
@@ -203,6 +317,336 @@ class TestIndexDict:
         assert index.get_by_isbn("ISBN-001") is None
 
 
+class TestBookView:
+    
+    def test_search_returns_read_only_view(self):
+        library = Library("Test")
+        book1 = Book("Foundation", "Asimov", 1951, "Science", "ISBN-001")
+        book2 = Book("Robot", "Asimov", 1950, "Science", "ISBN-002")
+        library.add_book(book1)
+        library.add_book(book2)
+        
+        view = library.search_by_author("Asimov")
+        assert isinstance(view, BookView)
+        assert view == [book1, book2]
+        assert view[0] == book1
+        assert book2 in view
+        assert not hasattr(view, "append")
+        with pytest.raises(TypeError):
+            view[0] = book2
+    
+    def test_view_is_live(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        view = library.search_by_year(1951)
+        library.add_book(Book("Other", "Sagan", 1951, "Science", "ISBN-002"))
+        assert len(view) == 2
+    
+    def test_view_after_transaction_remove(self):
+        library = Library("Test")
+        for i in range(3):
+            library.add_book(Book(f"Book{i}", "Asimov", 1951, "Science", f"ISBN-00{i}"))
+        view = library.search_by_author("Asimov")
+        with library.transaction() as tx:
+            tx.remove_book("ISBN-001")
+        assert [b.isbn for b in view] == ["ISBN-000", "ISBN-002"]
+        assert len(view) == 2
+        assert view[1].isbn == "ISBN-002"
+    
+    def test_view_after_snapshot_and_remove(self):
+        library = Library("Test")
+        for i in range(3):
+            library.add_book(Book(f"Book{i}", "Asimov", 1951, "Science", f"ISBN-00{i}"))
+        view = library.search_by_year(1951)
+        frozen = library.snapshot()
+        frozen_view = frozen.search_by_year(1951)
+        library.remove_book("ISBN-000")
+        assert [b.isbn for b in view] == ["ISBN-001", "ISBN-002"]
+        assert len(view) == 2
+        assert [b.isbn for b in frozen_view] == ["ISBN-000", "ISBN-001", "ISBN-002"]
+        # Корзина удалена и создана заново: представление видит новую
+        library.remove_book("ISBN-001")
+        library.remove_book("ISBN-002")
+        assert len(view) == 0
+        library.add_book(Book("New", "Sagan", 1951, "Science", "ISBN-003"))
+        assert [b.isbn for b in view] == ["ISBN-003"]
+    
+    def test_empty_view_and_iterators(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        assert len(library.search_by_author("Unknown")) == 0
+        assert list(library.iter_by_author("Unknown")) == []
+        assert [b.isbn for b in library.iter_by_year(1951)] == ["ISBN-001"]
+        assert [b.isbn for b in library.iter_by_genre("Science")] == ["ISBN-001"]
+
+
+class TestPagination:
+    
+    @pytest.fixture
+    def library(self):
+        return make_library((f"Book{i}", "Asimov" if i % 2 == 0 else "Sagan", 2000 + i % 5,
+                             "Science" if i % 3 == 0 else "Fiction", f"ISBN-{i:03d}")
+                            for i in range(10))
+    
+    def test_page_all_books(self, library):
+        first = library.page_all_books(page_size=4)
+        assert [b.isbn for b in first] == ["ISBN-000", "ISBN-001", "ISBN-002", "ISBN-003"]
+        assert first.has_more
+        
+        pages = list(iter_pages(lambda c: library.page_all_books(4, c)))
+        assert [len(p) for p in pages] == [4, 4, 2]
+        assert pages[-1].next_cursor is None
+    
+    def test_walk_while_mutating(self, library):
+        first = library.page_all_books(page_size=3)
+        # Удаление уже выданной и ещё не выданной книги между страницами
+        library.remove_book("ISBN-001")
+        library.remove_book("ISBN-005")
+        library.add_book(Book("New", "Author", 2020, "Fiction", "ISBN-NEW"))
+        
+        seen = [b.isbn for b in first]
+        cursor = first.next_cursor
+        while cursor:
+            page = library.page_all_books(3, cursor)
+            seen.extend(b.isbn for b in page)
+            cursor = page.next_cursor
+        
+        expected = ["ISBN-000", "ISBN-001", "ISBN-002", "ISBN-003", "ISBN-004",
+                    "ISBN-006", "ISBN-007", "ISBN-008", "ISBN-009", "ISBN-NEW"]
+        assert seen == expected
+    
+    def test_page_search_results(self, library):
+        pages = list(iter_pages(lambda c: library.page_by_author("Asimov", 2, c)))
+        isbns = [b.isbn for p in pages for b in p]
+        assert isbns == ["ISBN-000", "ISBN-002", "ISBN-004", "ISBN-006", "ISBN-008"]
+        
+        genre = [b.isbn for p in iter_pages(lambda c: library.page_by_genre("Science", 2, c))
+                 for b in p]
+        assert genre == ["ISBN-000", "ISBN-003", "ISBN-006", "ISBN-009"]
+        
+        year = library.page_by_year(2000, page_size=10)
+        assert [b.isbn for b in year] == ["ISBN-000", "ISBN-005"]
+        assert year.next_cursor is None
+    
+    def test_invalid_cursor_and_page_size(self, library):
+        with pytest.raises(ValueError):
+            library.page_all_books(2, "garbage!")
+        with pytest.raises(ValueError):
+            library.page_all_books(0)
+
+
+class TestFuzzySearch:
+    
+    @pytest.fixture
+    def library(self):
+        return make_library([
+            ("Foundation", "Isaac Asimov", 1951, "Science", "ISBN-001"),
+            ("Surely You're Joking", "Richard Feynman", 1985, "Biography", "ISBN-002"),
+            ("Gödel, Escher, Bach", "Douglas Hofstadter", 1979, "Science", "ISBN-003"),
+        ])
+    
+    def test_normalize(self):
+        assert normalize("Gödel, Escher, Bach") == "godel escher bach"
+    
+    def test_typo_and_word_order(self, library):
+        assert [b.isbn for b in library.fuzzy_search_author("Asimov, Isaac")] == ["ISBN-001"]
+        assert [b.isbn for b in library.fuzzy_search_author("Feynmann")] == ["ISBN-002"]
+        assert [b.isbn for b in library.fuzzy_search_title("godel escher")] == ["ISBN-003"]
+        assert library.fuzzy_search_author("zzzz") == []
+    
+    def test_ranking(self):
+        index = TrigramIndex()
+        index.add("Carl Sagan", 1)
+        index.add("Carl Sagen", 2)
+        terms = index.search_terms("carl sagan")
+        assert terms[0] == ("carl sagan", 1.0)
+        assert terms[1][0] == "carl sagen"
+        assert index.search("carl sagan", limit=1) == [1]
+    
+    def test_remove_from_large_buckets(self):
+        from array import array
+        
+        class CountingRows(array):
+            # Корзина, считающая обращения по индексу и запрещающая полный обход
+            reads = 0
+            
+            def __getitem__(self, position):
+                CountingRows.reads += 1
+                return array.__getitem__(self, position)
+            
+            def __iter__(self):
+                raise AssertionError("remove не должен просматривать корзину целиком")
+        
+        index = TrigramIndex()
+        for row in range(200000):
+            index.add(f"Author {row % 10}", row)
+        for term, bucket in list(index._entries.items()):
+            index._entries[term] = CountingRows('I', bucket.tobytes())
+        doomed = list(range(0, 200000, 100))
+        for row in doomed:
+            assert index.remove(f"Author {row % 10}", row)
+        # Двоичный поиск по корзине из 20 000 строк: O(log n) чтений на удаление
+        assert CountingRows.reads <= len(doomed) * 20
+        for term, bucket in list(index._entries.items()):
+            index._entries[term] = array('I', bucket.tobytes())
+        assert not index.remove("Author 0", 0)
+        assert index.remove("Author 0", 10)
+        assert len(index) == 10
+        assert index.search("author 0", limit=3) == [20, 30, 40]
+        index.add("Author 0", 0)
+        assert index.search("author 0", limit=2) == [0, 20]
+    
+    def test_edit_distance_only_for_top_candidates(self, monkeypatch):
+        import src.fuzzy
+        index = TrigramIndex()
+        for i in range(2000):
+            index.add(f"Author Name {i}", i)
+        calls = []
+        edit_distance = src.fuzzy.edit_distance
+        monkeypatch.setattr(src.fuzzy, "edit_distance",
+                            lambda a, b: calls.append(b) or edit_distance(a, b))
+        
+        terms = index.search_terms("Author Name 1234", limit=3)
+        assert [term for term, _ in terms][0] == "author name 1234"
+        # Кандидатов с общей триграммой — все 2000 термов
+        assert len(calls) < 100
+    
+    def test_index_updated_on_remove(self, library):
+        library.remove_book("ISBN-001")
+        assert library.fuzzy_search_author("Asimov") == []
+        assert len(library.fuzzy_authors) == 2
+
+
+class TestAutocomplete:
+    
+    def test_suggest_ranked_by_count(self):
+        library = Library("Test")
+        library.enable_completions()
+        library.add_book(Book("Foundation", "Isaac Asimov", 1951, "Science", "ISBN-001"))
+        library.add_book(Book("Foundation and Empire", "Isaac Asimov", 1952, "Science", "ISBN-002"))
+        library.add_book(Book("Foundation", "Isaac Asimov", 1960, "Fiction", "ISBN-003"))
+        
+        assert library.suggest("foun") == [("Foundation", 2), ("Foundation and Empire", 1)]
+        assert library.suggest("Asim") == [("Isaac Asimov", 3)]
+        assert library.suggest("empire") == [("Foundation and Empire", 1)]
+        assert library.suggest("foun", limit=1) == [("Foundation", 2)]
+        assert library.suggest("xyz") == []
+    
+    def test_incremental_remove(self):
+        library = Library("Test")
+        library.add_book(Book("Cosmos", "Carl Sagan", 1980, "Science", "ISBN-001"))
+        library.add_book(Book("Contact", "Carl Sagan", 1985, "Fiction", "ISBN-002"))
+        library.enable_completions()
+        library.remove_book("ISBN-001")
+        assert library.suggest("co") == [("Contact", 1)]
+        library.remove_book("ISBN-002")
+        assert library.suggest("c") == []
+        assert len(library.completions) == 0
+    
+    def test_top_k_recomputed_after_remove(self):
+        index = PrefixIndex(top_k=2)
+        for text in ["aa", "aa", "ab", "ab", "ac"]:
+            index.add(text)
+        assert index.suggest("a") == [("aa", 2), ("ab", 2)]
+        index.remove("aa")
+        index.remove("aa")
+        assert index.suggest("a") == [("ab", 2), ("ac", 1)]
+    
+    def test_completions_only_when_enabled(self):
+        library = Library("Test")
+        for i in range(100):
+            library.add_book(Book(f"Title {i}", f"Author {i % 7}", 2000, "Fiction", f"ISBN-{i:03d}"))
+        library.remove_book("ISBN-000")
+        # Без enable_completions префиксный индекс не строится и не обновляется
+        assert library.completions is None
+        assert 'autocomplete' not in library.memory_usage()
+        with pytest.raises(ValueError):
+            library.suggest("auth")
+        assert library.completions is None
+        
+        completions = library.enable_completions()
+        assert library.enable_completions() is completions
+        assert library.suggest("author 0") == [("Author 0", 14)]
+        assert 'autocomplete' in library.memory_usage()
+        library.add_book(Book("Title X", "Author 0", 2001, "Fiction", "ISBN-100"))
+        assert library.suggest("author 0") == [("Author 0", 15)]
+
+
+class TestRowStorage:
+    
+    def test_indexes_hold_row_ids(self):
+        library = Library("Test")
+        book1 = Book("Foundation", "Asimov", 1951, "Science", "ISBN-001")
+        book2 = Book("Robot", "Asimov", 1950, "Science", "ISBN-002")
+        library.add_book(book1)
+        library.add_book(book2)
+        
+        assert library.indexes.store is library.books.store
+        assert list(library.indexes.author_rows("Asimov")) == [0, 1]
+        assert library.indexes.row_of("ISBN-002") == 1
+        assert library.books.store[1] is book2
+    
+    def test_removed_row_is_released(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-002"))
+        library.remove_book("ISBN-001")
+        
+        assert library.books.store[0] is None
+        assert len(library.books.store) == 1
+        assert list(library.books.row_ids) == [1]
+        assert list(library.indexes.author_rows("Asimov")) == [1]
+    
+    def test_standalone_index_owns_store(self):
+        index = IndexDict()
+        book = Book("Test", "Author", 2020, "Fiction", "ISBN-001")
+        index.add_book(book)
+        index.remove_book(book)
+        assert len(index.store) == 0
+        assert index.get_by_author("Author") == []
+    
+    def test_churn_keeps_allocated_rows_bounded(self):
+        import random
+        rng = random.Random(7)
+        library = Library("Test")
+        store = library.books.store
+        live = []
+        for i in range(2 * ROW_CHUNK):
+            library.add_book(Book(f"Book{i}", f"Author {i % 10}", 2000, "Fiction", f"ISBN-{i:06d}"))
+            live.append(f"ISBN-{i:06d}")
+        frozen = library.snapshot()
+        worst = 0
+        for step in range(2 * ROW_CHUNK, 14 * ROW_CHUNK):
+            victim = live.pop(rng.randrange(len(live)))
+            assert library.remove_book(victim)
+            library.add_book(Book(f"Book{step}", f"Author {step % 10}", 2000, "Fiction",
+                                  f"ISBN-{step:06d}"))
+            live.append(f"ISBN-{step:06d}")
+            worst = max(worst, store.allocated - 2 * len(store))
+        
+        assert len(store) == 2 * ROW_CHUNK
+        assert worst <= ROW_CHUNK
+        assert store.allocated < 3 * ROW_CHUNK
+        # Номера строк не переиспользуются: каталог и индексы согласованы
+        assert sorted(book.isbn for book in library.get_all_books()) == sorted(live)
+        assert all(library.search_by_isbn(isbn).isbn == isbn for isbn in live[::97])
+        assert sum(len(library.search_by_author(f"Author {i}")) for i in range(10)) == len(live)
+        assert [book.isbn for book in library.books[100:103]] == \
+            [store[row].isbn for row in list(store.rows())[100:103]]
+        # Снимок до удалений не изменился
+        assert len(frozen.get_all_books()) == 2 * ROW_CHUNK
+        assert frozen.search_by_isbn("ISBN-000000") is not None
+    
+    def test_memory_usage(self):
+        library = Library("Test")
+        for i in range(10):
+            library.add_book(Book(f"Book{i}", "Author", 2000, "Fiction", f"ISBN-{i:03d}"))
+        usage = library.memory_usage()
+        for key in ('books', 'row_store', 'isbn_index', 'author_index', 'year_index', 'total'):
+            assert usage[key] > 0
+        assert usage['total'] == sum(v for k, v in usage.items() if k != 'total')
+
+
 class TestLibrary:
     
     def test_library_creation(self):
@@ -254,6 +698,27 @@ class TestLibrary:
         science_books = library.search_by_genre("Science")
         assert len(science_books) == 2
     
+    def test_search_many(self):
+        library = Library("Test")
+        book1 = Book("Foundation", "Asimov", 1951, "Science", "ISBN-001")
+        book2 = Book("Cosmos", "Sagan", 1980, "Science", "ISBN-002")
+        book3 = Book("Robot", "Asimov", 1950, "Fiction", "ISBN-003")
+        for book in (book1, book2, book3):
+            library.add_book(book)
+        
+        assert library.search_many_isbn(["ISBN-001", "ISBN-404"]) == {"ISBN-001": book1, "ISBN-404": None}
+        authors = library.search_many_authors(["Asimov", "Sagan", "Nobody", "Asimov"])
+        assert list(authors) == ["Asimov", "Sagan", "Nobody"]
+        assert authors["Asimov"] == [book1, book3]
+        assert len(authors["Nobody"]) == 0
+        years = library.search_many_years(range(1950, 1953))
+        assert {year: len(books) for year, books in years.items()} == {1950: 1, 1951: 1, 1952: 0}
+        
+        # С фильтром Блума результат тот же, промахи отсекаются фильтром
+        library.enable_isbn_filter()
+        assert library.search_many_isbn(["ISBN-003", "ISBN-404"]) == {"ISBN-003": book3, "ISBN-404": None}
+        assert library.snapshot().search_many_isbn(["ISBN-002"]) == {"ISBN-002": book2}
+    
     def test_get_statistics(self):
         library = Library("Test")
         book1 = Book("Foundation", "Asimov", 1951, "Science", "ISBN-001")
@@ -268,6 +733,549 @@ class TestLibrary:
         assert 'Science' in stats['genres']
 
 
+class TestIsbnFilter:
+    
+    def test_filter_false_positive_rate(self):
+        bloom = CountingBloomFilter(capacity=1000, false_positive_rate=0.01)
+        for key in range(1000):
+            bloom.add(key)
+        assert all(bloom.might_contain(key) for key in range(1000))
+        false_positives = sum(bloom.might_contain(key) for key in range(10_000, 30_000))
+        assert false_positives / 20_000 < 0.03
+        
+        bloom.remove(5)
+        assert len(bloom) == 999
+        with pytest.raises(ValueError):
+            CountingBloomFilter(false_positive_rate=1.5)
+    
+    def test_library_filter_in_sync(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        isbn_filter = library.enable_isbn_filter(false_positive_rate=0.001)
+        library.add_book(Book("Dune", "Herbert", 1965, "Science", "ISBN-002"))
+        with library.transaction():
+            library.add_book(Book("Cosmos", "Sagan", 1980, "Science", "ISBN-003"))
+        library.remove_book("ISBN-001")
+        
+        assert library.search_by_isbn("ISBN-001") is None
+        assert library.search_by_isbn("ISBN-002").title == "Dune"
+        assert library.search_by_isbn("ISBN-003").title == "Cosmos"
+        assert len(isbn_filter) == 2
+        
+        stats = isbn_filter.get_statistics()
+        assert stats['lookups'] == 3
+        assert stats['probes_saved'] + stats['false_positives'] == 1
+    
+    def test_canonical_hits_skip_parsing(self, monkeypatch):
+        import src.models
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        library.add_book(Book("Cosmos", "Sagan", 1980, "Science", "978-0-306-40615-7"))
+        library.enable_isbn_filter(false_positive_rate=0.001)
+        parsed = []
+        parse = src.models.isbn_key
+        monkeypatch.setattr(src.models, "isbn_key", lambda isbn: parsed.append(isbn) or parse(isbn))
+        
+        # Фильтр проверяется тем же написанием, что хранит индекс
+        assert library.search_by_isbn("ISBN-001").title == "Foundation"
+        assert library.search_by_isbn("9780306406157").title == "Cosmos"
+        assert library.search_many_isbn(["ISBN-001"])["ISBN-001"].title == "Foundation"
+        assert parsed == []
+        assert library.search_by_isbn("978-0-306-40615-7").title == "Cosmos"
+        assert library.search_by_isbn("0-306-40615-2").title == "Cosmos"
+        assert library.search_by_isbn("ISBN-404") is None
+        assert parsed == ["978-0-306-40615-7", "0-306-40615-2", "ISBN-404"]
+    
+    def test_filter_grows_with_library(self):
+        library = Library("Test")
+        isbn_filter = library.enable_isbn_filter()
+        with library.transaction():
+            for i in range(3000):
+                library.add_book(Book("Book", "Author", 2000, "Fiction", f"ISBN-{i:06d}"))
+        assert isbn_filter.capacity >= 3000
+        assert all(library.search_by_isbn(f"ISBN-{i:06d}") for i in range(0, 3000, 7))
+
+
+class TestOrderedViews:
+    
+    def test_sorted_index_matches_sorted(self):
+        import random
+        rng = random.Random(3)
+        index = SortedIndex(load=4)
+        expected = []
+        for row in range(300):
+            item = (rng.randint(0, 50), row)
+            index.add(item)
+            expected.append(item)
+        for item in expected[::3]:
+            assert index.remove(item)
+        assert not index.remove((999, 0))
+        expected = sorted(set(expected) - set(expected[::3]))
+        
+        assert list(index) == expected
+        assert list(index.irange(25)) == [item for item in expected if item[0] >= 25]
+        assert list(index.irange(25, reverse=True)) == [item for item in reversed(expected) if item[0] <= 25]
+    
+    def test_library_ordered_by(self):
+        library = Library("Test")
+        library.add_book(Book("dune", "Herbert", 1965, "Science", "ISBN-001"))
+        library.add_book(Book("Cosmos", "Sagan", 1980, "Science", "ISBN-002"))
+        assert [b.title for b in library.ordered_by("title")] == ["Cosmos", "dune"]
+        
+        # Индекс поддерживается при изменениях после построения
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-003"))
+        with library.transaction():
+            library.add_book(Book("Anathem", "Stephenson", 2008, "Fiction", "ISBN-004"))
+            library.remove_book("ISBN-002")
+        assert [b.title for b in library.ordered_by("title")] == ["Anathem", "dune", "Foundation"]
+        assert [b.year for b in library.ordered_by("year", reverse=True)] == [2008, 1965, 1951]
+        assert [b.year for b in library.ordered_by("year", start=1960)] == [1965, 2008]
+        assert next(library.ordered_by("author", start="h")).author == "Herbert"
+        with pytest.raises(ValueError):
+            library.ordered_by("genre")
+
+
+class TestAggregate:
+    
+    @pytest.fixture
+    def library(self):
+        return make_library([
+            ("Foundation", "Asimov", 1951, "Science", "ISBN-001"),
+            ("I, Robot", "Asimov", 1950, "Fiction", "ISBN-002"),
+            ("Dune", "Herbert", 1965, "Science", "ISBN-003"),
+            ("Cosmos", "Sagan", 1980, "Science", "ISBN-004"),
+        ])
+    
+    def test_indexed_groups(self, library):
+        assert library.aggregate("author") == {"Asimov": 2, "Herbert": 1, "Sagan": 1}
+        assert library.aggregate("decade") == {1950: 2, 1960: 1, 1980: 1}
+        library.remove_book("ISBN-004")
+        assert library.aggregate("year") == {1950: 1, 1951: 1, 1965: 1}
+    
+    def test_streaming_and_multi_key(self, library):
+        assert library.aggregate("genre") == {"Fiction": 1, "Science": 3}
+        assert library.aggregate(("author", "decade")) == {
+            ("Asimov", 1950): 2, ("Herbert", 1960): 1, ("Sagan", 1980): 1}
+        assert library.aggregate("genre", metric="share")["Science"] == 0.75
+    
+    def test_genre_counts_maintained_without_scanning(self, library, monkeypatch):
+        frozen = library.snapshot()
+        library.remove_book("ISBN-002")
+        with library.transaction() as tx:
+            tx.add_book(Book("Emma", "Austen", 1815, "Romance", "ISBN-005"))
+            tx.remove_book("ISBN-003")
+        
+        # Отчёты не обходят каталог
+        monkeypatch.setattr(BookCollection, "__iter__", lambda self: pytest.fail("catalog scan"))
+        assert library.aggregate("genre") == {"Romance": 1, "Science": 2}
+        stats = library.get_statistics()
+        assert sorted(stats['genres']) == ["Romance", "Science"]
+        assert stats['unique_authors'] == 3
+        assert stats['year_range'] == (1815, 1980)
+        assert library.search_by_genre("Fiction") == []
+        assert frozen.aggregate("genre") == {"Fiction": 1, "Science": 3}
+    
+    def test_invalid_arguments(self, library):
+        with pytest.raises(ValueError):
+            library.aggregate("isbn")
+        with pytest.raises(ValueError):
+            library.aggregate("author", metric="sum")
+        with pytest.raises(ValueError):
+            library.aggregate(())
+
+
+class TestSnapshot:
+    
+    def test_snapshot_is_isolated_from_writes(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-002"))
+        
+        snapshot = library.snapshot()
+        library.remove_book("ISBN-001")
+        library.add_book(Book("Cosmos", "Sagan", 1980, "Science", "ISBN-003"))
+        library.add_book(Book("Nemesis", "Asimov", 1989, "Fiction", "ISBN-004"))
+        
+        assert [b.isbn for b in snapshot] == ["ISBN-001", "ISBN-002"]
+        assert snapshot.search_by_isbn("ISBN-001") is not None
+        assert snapshot.search_by_isbn("ISBN-003") is None
+        assert len(snapshot.search_by_author("Asimov")) == 2
+        assert snapshot.get_statistics()['total_books'] == 2
+        
+        assert len(library.search_by_author("Asimov")) == 2
+        assert [b.isbn for b in library.books] == ["ISBN-002", "ISBN-003", "ISBN-004"]
+    
+    def test_snapshot_shares_storage_until_write(self):
+        library = Library("Test")
+        library.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        snapshot = library.snapshot()
+        assert snapshot.books.store._chunks is library.books.store._chunks
+        library.add_book(Book("Cosmos", "Sagan", 1980, "Science", "ISBN-002"))
+        assert snapshot.books.store._chunks is not library.books.store._chunks
+        assert len(snapshot.books) == 1
+    
+    def test_write_after_snapshot_copies_one_chunk(self):
+        library = Library("Test")
+        for i in range(5 * ROW_CHUNK):
+            library.add_book(Book(f"Title {i}", f"Author {i % 50}", 1950 + i % 40, "Fiction",
+                                  f"ISBN-{i:06d}"))
+        by_isbn = library.indexes._by_isbn
+        by_author = library.indexes._by_author
+        snapshot = library.snapshot()
+        library.remove_book("ISBN-000007")
+        
+        # Скопирован только блок с удалённой строкой; словари индекса не копируются
+        live, frozen = library.books.store._chunks, snapshot.books.store._chunks
+        assert sum(a is not b for a, b in zip(live, frozen)) == 1
+        assert library.indexes._by_isbn is by_isbn
+        assert library.indexes._by_author is by_author
+        frozen_authors = dict(snapshot.indexes._by_author.items())
+        assert [author for author, bucket in by_author.items()
+                if bucket is not frozen_authors[author]] == ["Author 7"]
+        
+        per_author = len(range(7, 5 * ROW_CHUNK, 50))
+        assert snapshot.search_by_isbn("ISBN-000007").title == "Title 7"
+        assert len(snapshot.search_by_author("Author 7")) == per_author
+        assert snapshot.aggregate("author")["Author 7"] == per_author
+        assert len(snapshot.indexes) == 5 * ROW_CHUNK
+        assert library.search_by_isbn("ISBN-000007") is None
+        assert len(library.search_by_author("Author 7")) == per_author - 1
+        
+        # Второй снимок видит удаление, первый — нет
+        second = library.snapshot()
+        library.add_book(Book("New", "Author 7", 2000, "Fiction", "ISBN-000007"))
+        assert second.search_by_isbn("ISBN-000007") is None
+        assert snapshot.search_by_isbn("ISBN-000007").title == "Title 7"
+        assert library.search_by_isbn("ISBN-000007").title == "New"
+        assert len(second.search_by_author("Author 7")) == per_author - 1
+    
+    def test_snapshot_is_read_only(self):
+        library = Library("Test")
+        snapshot = library.snapshot()
+        with pytest.raises(TypeError):
+            snapshot.books.add(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        assert not hasattr(snapshot, "add_book")
+
+
+class TestTransaction:
+    
+    @pytest.fixture
+    def library(self):
+        return make_library([
+            ("Foundation", "Asimov", 1951, "Science", "ISBN-001"),
+            ("Cosmos", "Sagan", 1980, "Science", "ISBN-002"),
+        ])
+    
+    def test_commit_applies_buffered_changes(self, library):
+        with library.transaction() as tx:
+            assert library.remove_book("ISBN-001") is True
+            library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-003"))
+            library.add_book(Book("Contact", "Sagan", 1985, "Fiction", "ISBN-004"))
+            # До commit библиотека не меняется
+            assert len(library.books) == 2
+            assert tx.search_by_isbn("ISBN-001") is None
+            assert tx.search_by_isbn("ISBN-003") is not None
+        
+        assert [b.isbn for b in library.books] == ["ISBN-002", "ISBN-003", "ISBN-004"]
+        assert library.search_by_isbn("ISBN-001") is None
+        assert [b.isbn for b in library.search_by_author("Asimov")] == ["ISBN-003"]
+        assert len(library.search_by_author("Sagan")) == 2
+    
+    def test_rollback_on_exception(self, library):
+        with pytest.raises(RuntimeError):
+            with library.transaction():
+                library.remove_book("ISBN-001")
+                library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-003"))
+                raise RuntimeError("boom")
+        
+        assert [b.isbn for b in library.books] == ["ISBN-001", "ISBN-002"]
+        library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-003"))
+        assert len(library.books) == 3
+    
+    def test_add_then_remove_in_same_transaction(self, library):
+        with library.transaction():
+            library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-003"))
+            assert library.remove_book("ISBN-003") is True
+            assert library.remove_book("ISBN-999") is False
+        assert len(library.books) == 2
+    
+    def test_isbn_lookups_read_pending_changes(self, library):
+        library.enable_isbn_filter()
+        with library.transaction():
+            library.remove_book("ISBN-001")
+            library.add_book(Book("Robot", "Asimov", 1950, "Science", "ISBN-003"))
+            assert library.search_by_isbn("ISBN-001") is None
+            assert library.search_by_isbn("ISBN-003").title == "Robot"
+            assert library.search_by_isbn("ISBN-002").title == "Cosmos"
+            found = library.search_many_isbn(["ISBN-001", "ISBN-002", "ISBN-003"])
+            assert {isbn: book and book.title for isbn, book in found.items()} == {
+                "ISBN-001": None, "ISBN-002": "Cosmos", "ISBN-003": "Robot"}
+            # Выборки по автору видят каталог до commit
+            assert [b.isbn for b in library.search_by_author("Asimov")] == ["ISBN-001"]
+        assert library.search_by_isbn("ISBN-003").title == "Robot"
+        assert [b.isbn for b in library.search_by_author("Asimov")] == ["ISBN-003"]
+    
+    def test_nested_transaction_rejected(self, library):
+        with library.transaction():
+            with pytest.raises(RuntimeError):
+                library.transaction()
+
+
+class TestChangeFeed:
+    
+    def _book(self, i):
+        return Book(f"Book{i}", "Author", 2000, "Fiction", f"ISBN-{i:03d}")
+    
+    def test_sequence_numbers_and_resume(self):
+        library = Library("Test")
+        feed = library.enable_change_feed()
+        library.add_book(self._book(1))
+        library.add_book(self._book(2))
+        library.remove_book("ISBN-001")
+        
+        changes = feed.changes_since(0)
+        assert [(c.seq, c.action) for c in changes] == [(1, "add"), (2, "add"), (3, "remove")]
+        assert [c.seq for c in feed.changes_since(2)] == [3]
+        assert feed.last_seq == 3
+    
+    def test_sync_subscriber_batches(self):
+        library = Library("Test")
+        feed = library.enable_change_feed()
+        batches = []
+        feed.subscribe(batches.append, batch_size=2)
+        for i in range(5):
+            library.add_book(self._book(i))
+        assert [len(b) for b in batches] == [2, 2]
+        feed.flush()
+        assert [len(b) for b in batches] == [2, 2, 1]
+    
+    def test_subscribe_since_replays_backlog(self):
+        library = Library("Test")
+        feed = library.enable_change_feed()
+        for i in range(3):
+            library.add_book(self._book(i))
+        received = []
+        subscription = feed.subscribe(received.extend, since=1)
+        library.add_book(self._book(3))
+        subscription.flush()
+        assert [c.seq for c in received] == [2, 3, 4]
+        assert subscription.last_seq == 4
+    
+    def test_background_subscriber(self):
+        library = Library("Test")
+        feed = library.enable_change_feed()
+        received = []
+        subscription = feed.subscribe(received.extend, background=True, batch_size=10)
+        with library.transaction():
+            for i in range(25):
+                library.add_book(self._book(i))
+        subscription.close()
+        assert [c.seq for c in received] == list(range(1, 26))
+    
+    def test_retention(self):
+        library = Library("Test")
+        feed = ChangeFeed(library, retention=2)
+        for i in range(5):
+            library.add_book(self._book(i))
+        with pytest.raises(ValueError):
+            feed.changes_since(0)
+        assert feed.changes_since(4)[0].seq == 5
+
+
+class TestFederatedCatalog:
+    
+    def _federation(self):
+        north = Library("North")
+        south = Library("South")
+        north.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        south.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        south.add_book(Book("Cosmos", "Sagan", 1980, "Science", "ISBN-002"))
+        federation = FederatedCatalog()
+        federation.add_branch(north)
+        federation.add_branch(south)
+        return federation, north, south
+    
+    def test_cross_branch_lookup(self):
+        federation, north, south = self._federation()
+        assert sorted(federation.where_is("ISBN-001")) == ["North", "South"]
+        assert list(federation.search_by_isbn("ISBN-002")) == ["South"]
+        assert federation.count_by_author("Asimov") == {"North": 1, "South": 1}
+        assert len(federation.search_by_author("Sagan")["South"]) == 1
+    
+    def test_index_follows_branch_mutations(self):
+        federation, north, south = self._federation()
+        south.remove_book("ISBN-001")
+        north.add_book(Book("Contact", "Sagan", 1985, "Fiction", "ISBN-003"))
+        
+        assert federation.where_is("ISBN-001") == ["North"]
+        assert federation.count_by_author("Sagan") == {"South": 1, "North": 1}
+        stats = federation.get_statistics()
+        assert stats['total_books'] == 3
+        assert stats['year_range'] == (1951, 1985)
+        assert sorted(stats['genres']) == ["Fiction", "Science"]
+    
+    def test_remove_branch(self):
+        federation, north, south = self._federation()
+        assert federation.remove_branch("South") is True
+        south.add_book(Book("Other", "Author", 2000, "Fiction", "ISBN-009"))
+        assert federation.where_is("ISBN-009") == []
+        assert federation.get_statistics()['total_books'] == 1
+        with pytest.raises(ValueError):
+            federation.add_branch(north)
+
+
+class TestCirculation:
+    
+    @pytest.fixture
+    def library(self):
+        return make_library([
+            ("Foundation", "Asimov", 1951, "Science", "ISBN-001"),
+            ("Dune", "Herbert", 1965, "Science", "ISBN-002"),
+        ])
+    
+    def test_checkout_and_return(self, library):
+        loans = library.circulation
+        loan = loans.checkout("ISBN-001", "alice", days=14)
+        assert loan.due == 14
+        assert not loans.is_available("ISBN-001")
+        with pytest.raises(ValueError):
+            loans.checkout("ISBN-001", "bob")
+        with pytest.raises(ValueError):
+            loans.checkout("ISBN-404", "bob")
+        assert loans.return_book("ISBN-001") is None
+        assert loans.is_available("ISBN-001")
+    
+    def test_overdue_detection(self, library):
+        loans = library.circulation
+        loans.checkout("ISBN-001", "alice", days=3)
+        loans.checkout("ISBN-002", "bob", days=10)
+        assert loans.advance(3)['new_overdue'] == []
+        result = loans.advance(1)
+        assert [loan.patron for loan in result['new_overdue']] == ["alice"]
+        assert loans.advance(1)['new_overdue'] == []
+        
+        # Продление снимает просрочку
+        assert loans.renew("ISBN-001", days=7) == 12
+        assert loans.overdue() == []
+        assert [loan.patron for loan in loans.advance(8)['new_overdue']] == ["bob", "alice"]
+    
+    def test_hold_queue_promotion(self, library):
+        loans = library.circulation
+        loans.checkout("ISBN-001", "alice")
+        assert loans.place_hold("ISBN-001", "bob") == 1
+        assert loans.place_hold("ISBN-001", "carol") == 2
+        with pytest.raises(ValueError):
+            loans.renew("ISBN-001")
+        
+        assert loans.return_book("ISBN-001") == "bob"
+        with pytest.raises(ValueError):
+            loans.checkout("ISBN-001", "carol")
+        
+        # Боб не забрал книгу вовремя: очередь переходит к Кэрол
+        loans.advance(4)
+        assert loans.checkout("ISBN-001", "carol").patron == "carol"
+        assert loans.get_statistics()['waiting_holds'] == 0
+    
+    def test_removed_book_leaves_circulation(self, library):
+        library.circulation.checkout("ISBN-002", "alice")
+        library.remove_book("ISBN-002")
+        assert len(library.circulation) == 0
+        assert library.circulation.advance(30)['new_overdue'] == []
+
+
+class TestEventEngine:
+    
+    def test_events_processed_in_time_order(self):
+        engine = EventEngine()
+        fired = []
+        engine.schedule(2.0, "late", lambda: fired.append(("late", engine.now)))
+        engine.schedule(0.5, "early", lambda: fired.append(("early", engine.now)))
+        engine.add_periodic("tick", 1.0, lambda: fired.append(("tick", engine.now)))
+        
+        report = engine.run(until=2.5)
+        assert fired == [("early", 0.5), ("tick", 1.0), ("late", 2.0), ("tick", 2.0)]
+        assert engine.now == 2.5
+        assert report['events'] == 4
+        assert report['by_type']['tick'] == 2
+    
+    def test_poisson_rate(self):
+        import random
+        random.seed(1)
+        engine = EventEngine()
+        engine.add_poisson("arrival", 100.0, lambda: None)
+        report = engine.run(until=50)
+        assert 4500 < report['events'] < 5500
+        assert report['pending'] == 1
+        assert report['max_queue'] == 1
+    
+    def test_max_events_and_validation(self):
+        engine = EventEngine()
+        engine.add_poisson("arrival", diurnal(10.0), lambda: None)
+        assert engine.run(max_events=25)['events'] == 25
+        with pytest.raises(ValueError):
+            engine.add_poisson("arrival", 1.0, lambda: None)
+        with pytest.raises(ValueError):
+            engine.run()
+        with pytest.raises(ValueError):
+            diurnal(1.0, amplitude=1.0)
+    
+    def test_diurnal_arrivals_follow_rate_curve(self):
+        import math
+        import random
+        random.seed(5)
+        engine = EventEngine()
+        arrivals = []
+        engine.add_poisson("arrival", diurnal(3.0, amplitude=0.9), lambda: arrivals.append(engine.now))
+        engine.run(until=2000)
+        
+        # Среднее за период — rate; в середине периода ∫ = 0.5 + amplitude / π
+        assert 5600 < len(arrivals) < 6400
+        daytime = sum(1 for at in arrivals if 0.25 <= at % 1 < 0.75) / len(arrivals)
+        assert abs(daytime - (0.5 + 0.9 / math.pi)) < 0.035
+    
+    def test_rate_function_needs_peak(self):
+        engine = EventEngine()
+        with pytest.raises(ValueError):
+            engine.add_poisson("arrival", lambda now: 1.0, lambda: None)
+        # Неверная граница обнаруживается на первом кандидате выше неё
+        with pytest.raises(ValueError):
+            engine.add_poisson("burst", lambda now: 5.0 if now > 1 else 1.0, lambda: None, peak=2.0)
+            engine.run(until=10)
+
+
+class TestMetrics:
+    
+    def test_reservoir_bounded(self):
+        reservoir = Reservoir(size=100)
+        for value in range(10_000):
+            reservoir.add(value)
+        assert len(reservoir) == 100
+        assert reservoir.seen == 10_000
+        assert 2_000 < reservoir.quantile(0.5) < 8_000
+    
+    def test_growth_curve_bounded(self):
+        curve = GrowthCurve(max_points=16)
+        for size in range(1000):
+            curve.add(size)
+        assert len(curve) <= 16
+        points = curve.points
+        assert points[0] == (0, 0)
+        assert points[-1] == (999, 999)
+        assert all(index == size for index, size in points)
+    
+    def test_hit_rate_and_summary(self):
+        metrics = SimulationMetrics()
+        metrics.record_event("search_by_year", 0.001, library_size=3)
+        metrics.record_event("search_by_year", 0.003, library_size=3)
+        metrics.record_result("search_by_year", 2)
+        metrics.record_result("search_by_year", 0)
+        summary = metrics.summary()
+        assert summary['total_events'] == 2
+        assert summary['events']['search_by_year']['mean_us'] == pytest.approx(2000)
+        assert summary['searches']['search_by_year']['hit_rate'] == 0.5
+        assert "search_by_year" in metrics.format_summary()
+
+
 class TestLibrarySimulator:
     
     def test_simulator_creation(self):
@@ -315,6 +1323,37 @@ class TestLibrarySimulator:
         result = simulator.event_remove_book()
         assert "Removed" in result
         assert len(library.books) == 0
+    
+    def test_metrics_collected(self):
+        library = Library("Test")
+        simulator = LibrarySimulator(library)
+        for _ in range(500):
+            simulator.run_step()
+        assert simulator.metrics.total_events == 500
+        assert len(simulator.metrics.library_size) <= simulator.metrics.library_size.max_points
+        assert set(simulator.metrics.latency) <= {e.__name__[len("event_"):] for e in simulator.events}
+    
+    def test_run_timed(self):
+        library = Library("Test")
+        simulator = LibrarySimulator(library)
+        report = simulator.run_timed(5, seed=42, rates={"add_book": 20.0, "checkout_book": 10.0})
+        
+        assert report['simulated_time'] == 5
+        assert report['by_type']['advance_day'] == 5
+        assert len(library.books) == report['by_type']['add_book']
+        assert library.circulation.today == 5
+        with pytest.raises(ValueError):
+            simulator.run_timed(1, rates={"unknown": 1.0})
+    
+    def test_circulation_events(self):
+        library = Library("Test")
+        library.add_book(Book("Test", "Author", 2020, "Fiction", "ISBN-001"))
+        simulator = LibrarySimulator(library)
+        
+        assert "Checked out" in simulator.event_checkout_book()
+        assert "position 1" in simulator.event_place_hold()
+        assert "Returned" in simulator.event_return_book()
+        assert "Day 1" in simulator.event_advance_day()
 
 
 class TestIntegration:
@@ -349,8 +1388,461 @@ class TestIntegration:
         assert library.search_by_isbn("ISBN-001") is None
     
     def test_simulation_full_run(self):
-<<<<<<< HEAD:lab-4/tests/test.py
         run_simulation(steps=5, seed=42)
-=======
+    
+    def test_simulation_sink(self, capsys):
+        sink = NullSink()
+        run_simulation(steps=50, seed=42, sink=sink)
+        assert sink.records == 50
+        assert "[Step" not in capsys.readouterr().out
+        
         run_simulation(steps=5, seed=42)
->>>>>>> 5e75f67ec578f1a639f2b4e96089bb1b0c554ffa:tests/test.py
+        assert capsys.readouterr().out.count("[Step") == 5
+
+
+class TestProfiling:
+    
+    def test_profile_cpu(self, tmp_path):
+        reports = profile_call(run_simulation, "cpu", output_dir=str(tmp_path),
+                               steps=10, seed=1)
+        assert (tmp_path / "profile.pstats").exists()
+        assert "run_simulation" in (tmp_path / "profile_cpu.txt").read_text()
+        assert len(reports) == 2
+    
+    def test_profile_memory(self, tmp_path):
+        profile_call(run_simulation, "memory", output_dir=str(tmp_path),
+                     steps=10, seed=1)
+        report = (tmp_path / "profile_memory.txt").read_text()
+        assert "Growth" in report
+        assert not (tmp_path / "profile.pstats").exists()
+    
+    def test_profile_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            profile_call(run_simulation, "gpu", output_dir=str(tmp_path))
+
+
+class TestTrace:
+    
+    def test_record_and_load(self, tmp_path):
+        path = str(tmp_path / "ops.trace")
+        with TraceRecorder(Library("Test"), path) as recorder:
+            recorder.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+            recorder.search_by_year(1951)
+            recorder.remove_book("ISBN-001")
+            assert len(recorder.books) == 0
+        
+        operations = load_trace(path)
+        assert len(operations) == 3
+        assert operations[0] == (OP_ADD, ("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+        assert operations[2] == (OP_REMOVE, ("ISBN-001",))
+    
+    def test_replay_matches_recorded_run(self, tmp_path):
+        path = str(tmp_path / "sim.trace")
+        library = Library("Recorded")
+        with TraceRecorder(library, path) as recorder:
+            simulator = LibrarySimulator(recorder)
+            simulator.run_simulation(steps=100, seed=7)
+        
+        replayed = Library("Replayed")
+        result = TraceReplayer(path).replay(replayed)
+        assert result['operations'] > 0
+        assert [b.isbn for b in replayed.books] == [b.isbn for b in library.books]
+    
+    def test_replay_without_circulation(self, tmp_path):
+        path = str(tmp_path / "catalog.trace")
+        with TraceRecorder(Library("Recorded"), path) as recorder:
+            recorder.add_book(Book("Foundation", "Asimov", 1951, "Science", "ISBN-001"))
+            recorder.search_by_author("Asimov")
+            recorder.remove_book("ISBN-001")
+        
+        class Catalog:
+            # Минимальная цель воспроизведения: только каталог, без выдачи
+            def __init__(self):
+                self.calls = []
+            
+            def add_book(self, book):
+                self.calls.append(("add", book.isbn))
+            
+            def remove_book(self, isbn):
+                self.calls.append(("remove", isbn))
+            
+            def search_by_isbn(self, isbn):
+                self.calls.append(("isbn", isbn))
+            
+            def search_by_author(self, author):
+                self.calls.append(("author", author))
+            
+            def search_by_year(self, year):
+                self.calls.append(("year", year))
+            
+            def search_by_genre(self, genre):
+                self.calls.append(("genre", genre))
+        
+        target = Catalog()
+        assert TraceReplayer(path).replay(target)['operations'] == 3
+        assert target.calls == [("add", "ISBN-001"), ("author", "Asimov"), ("remove", "ISBN-001")]
+    
+    def test_round_trip_records_every_executed_operation(self, tmp_path, monkeypatch):
+        from src.circulation import Circulation
+        executed = []
+        depth = [0]
+        
+        def counted(cls, name):
+            method = getattr(cls, name)
+            def wrapper(*args, **kwargs):
+                # Вложенные вызовы (поиск ISBN внутри checkout) — часть операции
+                if not depth[0]:
+                    executed.append(name)
+                depth[0] += 1
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    depth[0] -= 1
+            monkeypatch.setattr(cls, name, wrapper)
+        
+        for name in ("add_book", "remove_book", "search_by_isbn", "search_by_author",
+                     "search_by_year", "search_by_genre"):
+            counted(Library, name)
+        for name in ("checkout", "return_book", "renew", "place_hold", "cancel_hold", "advance"):
+            counted(Circulation, name)
+        
+        path = str(tmp_path / "sim.trace")
+        library = Library("Recorded")
+        with TraceRecorder(library, path) as recorder:
+            for i in range(20):
+                recorder.add_book(Book(f"Book{i}", "Author", 2000, "Fiction", f"ISBN-{i:03d}"))
+            LibrarySimulator(recorder, NullSink()).run_simulation(steps=300, seed=11)
+            with pytest.raises(ValueError):
+                recorder.circulation.advance(-1)
+        recorded = list(executed)
+        assert {"checkout", "renew", "place_hold", "advance"} <= set(recorded)
+        
+        operations = load_trace(path)
+        assert len(operations) == len(recorded)
+        
+        executed.clear()
+        replayed = Library("Replayed")
+        result = TraceReplayer(path).replay(replayed)
+        assert result['operations'] == len(recorded)
+        assert executed == recorded
+        assert replayed.circulation.get_statistics() == library.circulation.get_statistics()
+        assert [b.isbn for b in replayed.books] == [b.isbn for b in library.books]
+    
+    def test_invalid_trace(self, tmp_path):
+        path = tmp_path / "bad.trace"
+        path.write_bytes(b"not a trace")
+        with pytest.raises(ValueError):
+            load_trace(str(path))
+
+
+class TestBatch:
+    
+    @pytest.fixture
+    def catalog(self, tmp_path):
+        path = tmp_path / "books.jsonl"
+        path.write_text(
+            '{"title": "Foundation", "author": "Asimov", "year": 1951, "genre": "Science", "isbn": "ISBN-001"}\n'
+            '\n'
+            '{"title": "I, Robot", "author": "Asimov", "year": 1950, "genre": "Science", "isbn": "ISBN-002"}\n'
+            '{"title": "Dune", "author": "Herbert", "year": 1965, "genre": "Science", "isbn": "ISBN-003"}\n',
+            encoding="utf-8")
+        return str(path)
+    
+    def test_load_catalog(self, catalog):
+        library = Library("Batch")
+        result = load_catalog(catalog, library)
+        assert result['books'] == 3
+        assert len(library.books) == 3
+        assert library.search_by_isbn("ISBN-003").title == "Dune"
+    
+    def test_load_skips_duplicates(self, catalog, tmp_path):
+        library = Library("Batch")
+        library.add_book(Book("Dune", "Herbert", 1965, "Science", "ISBN-003"))
+        path = tmp_path / "dups.jsonl"
+        with open(catalog, encoding="utf-8") as f:
+            lines = f.read()
+        path.write_text(lines + lines, encoding="utf-8")
+        
+        result = load_catalog(str(path), library)
+        assert result['books'] == 2
+        assert result['duplicates'] == 4
+        assert len(library.books) == 3
+    
+    def test_load_invalid_record_rolls_back(self, tmp_path):
+        path = tmp_path / "bad.jsonl"
+        path.write_text('{"title": "Dune", "author": "Herbert", "year": 1965, "genre": "Science", "isbn": "ISBN-003"}\n'
+                        '{"title": "No author"}\n', encoding="utf-8")
+        library = Library("Batch")
+        with pytest.raises(ValueError):
+            load_catalog(str(path), library)
+        assert len(library.books) == 0
+    
+    def test_run_queries(self, catalog):
+        import io
+        import json
+        library = Library("Batch")
+        load_catalog(catalog, library)
+        library.enable_completions()
+        queries = [
+            {"op": "author", "value": "Asimov", "id": "q1"},
+            {"op": "isbn", "value": "ISBN-404"},
+            {"op": "suggest", "value": "dun"},
+            {"op": "unknown", "value": 1},
+            {"op": "authors", "value": ["Asimov", "Nobody"]},
+            {"op": "years", "value": "1965"},
+        ]
+        output = io.StringIO()
+        summary = run_queries(library, queries, output)
+        
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [r["query"] for r in records] == ["q1", 2, 3, 4, 5, 6]
+        assert records[0]["isbns"] == ["ISBN-001", "ISBN-002"]
+        assert records[1]["count"] == 0
+        assert records[2]["suggestions"] == [["Dune", 1]]
+        assert "error" in records[3]
+        assert records[4]["results"] == {"Asimov": ["ISBN-001", "ISBN-002"], "Nobody": []}
+        assert records[4]["count"] == 2
+        assert "error" in records[5]
+        assert summary['queries'] == 6
+        assert summary['errors'] == 2
+        assert summary['p50_us'] <= summary['max_us']
+    
+    def test_queries_are_streamed(self, catalog, tmp_path):
+        import io
+        import time
+        library = Library("Batch")
+        load_catalog(catalog, library)
+        output = io.StringIO()
+        
+        def slow_queries():
+            for i in range(5):
+                # Предыдущий результат уже записан: запросы не собираются в список
+                assert output.getvalue().count("\n") == i
+                time.sleep(0.02)
+                yield {"op": "author", "value": "Asimov"}
+        
+        summary = run_queries(library, slow_queries(), output)
+        assert summary['queries'] == 5
+        # Ожидание следующего запроса не входит в замер
+        assert summary['elapsed'] < 0.05
+        
+        path = tmp_path / "queries.jsonl"
+        path.write_text('{"op": "isbn", "value": "ISBN-001"}\n\n{"op": "year", "value": 1965}\n',
+                        encoding="utf-8")
+        output = io.StringIO()
+        summary = run_query_file(str(path), library, output)
+        assert summary['queries'] == 2
+        assert '"isbns": ["ISBN-003"]' in output.getvalue()
+
+
+class TestColumnar:
+    
+    @pytest.fixture
+    def books(self):
+        books = [Book(f"Title {i % 7}", f"Author {i % 3}", 1950 + i % 40, "Science", f"ISBN-{i:06d}")
+                 for i in range(250)]
+        books.append(Book("Odd", "Nobody", 2001, "Fiction", "no-digits"))
+        books.append(Book("Real", "Someone", 1990, "Fiction", "978-0-306-40615-7"))
+        return books
+    
+    @pytest.mark.parametrize("codec", ["zlib", "lzma"])
+    def test_round_trip(self, books, tmp_path, codec):
+        path = str(tmp_path / "catalog.lcol")
+        result = export_columnar(books, path, codec=codec, block_size=100)
+        assert result['blocks'] == 3
+        
+        blocks = list(iter_columnar(path))
+        assert [len(block) for block in blocks] == [100, 100, 52]
+        restored = [book for block in blocks for book in block]
+        assert ([(b.title, b.author, b.year, b.genre, b.isbn) for b in restored] ==
+                [(b.title, b.author, b.year, b.genre, b.isbn) for b in books])
+    
+    def test_non_ascii_digits_stored_verbatim(self, tmp_path):
+        # Цифры других письменностей int() принимает, но "ISBN-123" — другая книга
+        isbns = ["ISBN-١٢٣", "ISBN-１２３", "ISBN-12\n", "ISBN-\n12", "ISBN-123"]
+        books = [Book("Title", "Author", 2000, "Fiction", isbn) for isbn in isbns]
+        path = str(tmp_path / "catalog.lcol")
+        export_columnar(books, path)
+        restored = [book.isbn for block in iter_columnar(path) for book in block]
+        assert restored == isbns
+    
+    def test_import_into_library(self, books, tmp_path):
+        path = str(tmp_path / "catalog.lcol")
+        export_columnar(books + books[:10], path, block_size=64)
+        library = Library("Imported")
+        result = import_columnar(path, library)
+        assert result['books'] == len(books)
+        assert result['duplicates'] == 10
+        assert library.search_by_isbn("ISBN-000042").year == 1950 + 42 % 40
+    
+    def test_corrupt_file(self, books, tmp_path):
+        path = tmp_path / "catalog.lcol"
+        export_columnar(books, str(path))
+        data = path.read_bytes()
+        path.write_bytes(data[:-20])
+        with pytest.raises(ValueError):
+            list(iter_columnar(str(path)))
+        path.write_bytes(b"JSON" + data[4:])
+        with pytest.raises(ValueError):
+            list(iter_columnar(str(path)))
+
+
+class TestCatalogGenerator:
+    
+    def test_deterministic_and_unique(self):
+        first = [(b.title, b.author, b.year, b.genre, b.isbn) for b in CatalogGenerator(seed=5).books(2000)]
+        second = [(b.title, b.author, b.year, b.genre, b.isbn) for b in CatalogGenerator(seed=5).books(2000)]
+        other = [(b.title, b.author, b.year, b.genre, b.isbn) for b in CatalogGenerator(seed=6).books(2000)]
+        assert first == second
+        assert first != other
+        assert len({isbn for *_, isbn in first}) == 2000
+        assert all(isbn_key(isbn) == int(isbn) for *_, isbn in first[:50])
+    
+    def test_distributions(self):
+        generator = CatalogGenerator(seed=1, author_count=1000, min_year=1950, max_year=2024,
+                                     genre_weights={"Fiction": 3, "Science": 1})
+        library = Library("Generated")
+        with library.transaction():
+            for book in generator.books(5000):
+                library.add_book(book)
+        
+        authors = sorted(library.aggregate("author").values(), reverse=True)
+        assert authors[0] > 10 * authors[len(authors) // 2]  # Закон Ципфа: длинный хвост
+        decades = library.aggregate("decade")
+        assert min(decades) >= 1950 and max(decades) <= 2020
+        assert decades[2010] > decades[1960]
+        genres = library.aggregate("genre")
+        assert set(genres) == {"Fiction", "Science"}
+        assert genres["Fiction"] > 2 * genres["Science"]
+    
+    def test_write_catalog(self, tmp_path):
+        for name in ("books.jsonl", "books.lcol"):
+            path = str(tmp_path / name)
+            write_catalog(path, 300, CatalogGenerator(seed=2))
+            library = Library("Loaded")
+            loader = import_columnar if name.endswith(".lcol") else load_catalog
+            assert loader(path, library)['books'] == 300
+        with pytest.raises(ValueError):
+            CatalogGenerator(zipf_exponent=0)
+
+
+def _shared_lookup(name: str, author: str) -> tuple:
+    # Выполняется в дочернем процессе: подключение к блоку по имени
+    catalog = SharedCatalog.attach(name)
+    try:
+        return (sorted(book.isbn for book in catalog.search_by_author(author)),
+                catalog.search_by_isbn("ISBN-000007").title)
+    finally:
+        catalog.close()
+
+
+class TestSharedCatalog:
+    
+    @pytest.fixture
+    def library(self):
+        books = [(f"Title {i}", f"Author {i % 5}", 1990 + i % 7,
+                  "Science" if i % 2 else "Fiction", f"ISBN-{i:06d}") for i in range(120)]
+        books.append(("Odd", "Ёжик", 2001, "Fiction", "no-digits"))
+        books.append(("Real", "Someone", 1990, "Fiction", "978-0-306-40615-7"))
+        library = make_library(books, "Shared")
+        library.remove_book("ISBN-000003")
+        return library
+    
+    def test_queries_match_library(self, library):
+        with SharedCatalog.create(library.books) as catalog:
+            assert len(catalog) == len(library.books)
+            for author in ("Author 3", "Ёжик", "Missing"):
+                assert catalog.search_by_author(author) == list(library.search_by_author(author))
+            for year in (1990, 1996, 1800):
+                assert catalog.search_by_year(year) == list(library.search_by_year(year))
+            assert catalog.search_by_genre("Science") == library.search_by_genre("Science")
+            assert catalog.search_by_isbn("9780306406157").title == "Real"
+            assert catalog.search_by_isbn("no-digits").author == "Ёжик"
+            assert catalog.search_by_isbn("ISBN-000003") is None
+            assert catalog.get_statistics()['authors'] == 7
+            assert (catalog.search_many_authors(["Author 1", "Missing"]) ==
+                    {author: list(books) for author, books in
+                     library.search_many_authors(["Author 1", "Missing"]).items()})
+    
+    def test_worker_processes(self, library):
+        import multiprocessing
+        with SharedCatalog.create(library.books) as catalog:
+            expected = sorted(book.isbn for book in library.search_by_author("Author 2"))
+            with multiprocessing.Pool(2) as pool:
+                results = pool.starmap(_shared_lookup, [(catalog.name, "Author 2")] * 4)
+            assert results == [(expected, "Title 7")] * 4
+            worker = SharedCatalog.attach(catalog.name)
+            with pytest.raises(ValueError):
+                worker.unlink()
+            worker.close()
+
+
+class TestOutputSinks:
+    
+    def test_buffered_stdout(self, capsys):
+        sink = StdoutSink(buffer_size=1 << 20, flush_interval=None)
+        for step in range(100):
+            sink.write_step({"step": step, "message": f"line {step}"})
+        assert capsys.readouterr().out == ""
+        sink.close()
+        assert capsys.readouterr().out.splitlines()[-1] == "line 99"
+        assert sink.get_statistics() == {'records': 100, 'flushes': 1, 'buffered': 0}
+    
+    def test_jsonl_sink(self, tmp_path):
+        import json
+        path = tmp_path / "steps.jsonl"
+        library = Library("Sink")
+        with JsonlSink(str(path), buffer_size=0) as sink:
+            simulator = LibrarySimulator(library, sink)
+            simulator.run_simulation(steps=20, seed=1)
+            assert sink.flushes == 20
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [r["step"] for r in records] == list(range(1, 21))
+        assert records[0]["message"].startswith("[Step 1]")
+        assert records[0]["event"] in {e.__name__[len("event_"):] for e in simulator.events}
+    
+    def test_rotating_sink(self, tmp_path):
+        path = str(tmp_path / "steps.log")
+        with RotatingFileSink(path, max_bytes=100, backup_count=2, buffer_size=0) as sink:
+            for step in range(30):
+                sink.write_step({"message": f"step {step:04d}"})
+        assert sink.get_statistics()['rotations'] == 2
+        files = sorted(p.name for p in tmp_path.iterdir())
+        assert files == ["steps.log", "steps.log.1", "steps.log.2"]
+        assert (tmp_path / "steps.log").read_text().splitlines()[-1] == "step 0029"
+        assert all((tmp_path / name).stat().st_size <= 100 for name in files)
+    
+    def test_rotating_sink_requires_backup(self, tmp_path):
+        # Ротация без копий обрезала бы файл и теряла записанные шаги
+        path = tmp_path / "steps.log"
+        for backup_count in (0, -1):
+            with pytest.raises(ValueError):
+                RotatingFileSink(str(path), max_bytes=100, backup_count=backup_count)
+        assert not path.exists()
+        with RotatingFileSink(str(path), max_bytes=100, backup_count=1, buffer_size=0) as sink:
+            for step in range(25):
+                sink.write_step({"message": f"step {step:04d}"})
+        # Файл по 10 шагов: самая старая копия удалена, остальное сохранено
+        kept = (tmp_path / "steps.log.1").read_text().splitlines() + path.read_text().splitlines()
+        assert kept == [f"step {step:04d}" for step in range(10, 25)]
+    
+    def test_open_sink(self, tmp_path):
+        assert isinstance(open_sink("null"), NullSink)
+        sink = open_sink(f"rotate:{tmp_path / 'r.jsonl'}")
+        assert isinstance(sink, RotatingFileSink)
+        sink.close()
+        for spec in ("bogus", "jsonl", "null:path"):
+            with pytest.raises(ValueError):
+                open_sink(spec)
+    
+    def test_incomplete_sink_rejected(self):
+        class Silent(OutputSink):
+            pass
+        
+        class Unwritten(BufferedSink):
+            pass
+        
+        # Без write_step или _write приёмник не создаётся
+        for sink_class in (OutputSink, BufferedSink, Silent, Unwritten):
+            with pytest.raises(TypeError):
+                sink_class()